@@ -0,0 +1,310 @@
+"""Read-only JSON Catalog API
+
+Plain HTTP endpoints for apps and partners that have no use for the live
+NiceGUI storefront and should not cost a client each. Every response is
+tagged with a strong ETag derived from the catalog version, so a client or
+a CDN revalidating with If-None-Match gets a 304 without the catalog being
+touched. Bodies are rendered and compressed (gzip, and brotli when the
+package is installed) once per catalog version and URL.
+"""
+
+import base64
+import gzip
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.config import settings
+from core.catalog_sync import catalog_sync
+from models.schemas import CategoryFacet, Product, ProductSummary
+from services.product_service import ProductService, SORT_OPTIONS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ProductSummary._fields
+PRODUCT_FIELDS = tuple(Product.model_fields)
+# Below this, compression costs more than it saves (same as GZipMiddleware)
+MIN_COMPRESS_SIZE = 500
+# Bodies are compressed once per version, so favour ratio over speed
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+def encode_cursor(cursor: Optional[tuple]) -> Optional[str]:
+    """Opaque URL-safe form of a keyset cursor"""
+    if cursor is None:
+        return None
+    key, product_id = cursor
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([key, product_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(sort: str, token: Optional[str]) -> Optional[tuple]:
+    """Keyset cursor for sort from its opaque form; ValueError if malformed"""
+    if not token:
+        return None
+    try:
+        key, product_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if sort == 'newest':
+            key = datetime.fromisoformat(key)
+        elif sort == 'in_stock':
+            key = bool(key)
+        elif sort == 'featured':
+            key = int(key)
+        else:
+            key = float(key)
+        return (key, int(product_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def select_fields(fields: Optional[str], allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Requested response fields in request order; all of them by default"""
+    if not fields:
+        return allowed
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return selected or allowed
+
+def _project(record: Dict, fields: Tuple[str, ...]) -> Dict:
+    return {name: record[name] for name in fields}
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Best content coding the client accepts: br, gzip or identity"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return 'identity'
+
+class CachedResponse:
+    """One rendered JSON body and its compressed variants"""
+
+    def __init__(self, version: int, status_code: int, body: bytes):
+        self.version = version
+        self.status_code = status_code
+        self.bodies = {'identity': body}
+
+    def coding(self, encoding: str) -> str:
+        """Encoding actually served when the client asks for encoding"""
+        return 'identity' if len(self.bodies['identity']) < MIN_COMPRESS_SIZE else encoding
+
+    def encoded(self, encoding: str) -> Tuple[str, bytes]:
+        """(encoding actually used, body), compressing at most once per encoding"""
+        encoding = self.coding(encoding)
+        if encoding == 'identity':
+            return encoding, self.bodies['identity']
+        if encoding not in self.bodies:
+            if encoding == 'br':
+                self.bodies[encoding] = brotli.compress(self.bodies['identity'], quality=BROTLI_QUALITY)
+            else:
+                self.bodies[encoding] = gzip.compress(self.bodies['identity'], compresslevel=GZIP_LEVEL)
+        return encoding, self.bodies[encoding]
+
+class CatalogAPI:
+    """JSON catalog responses cached per catalog version"""
+
+    def __init__(self, product_service: ProductService, max_entries: int = 1024):
+        self.product_service = product_service
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_sent: Dict[str, int] = {'identity': 0, 'gzip': 0, 'br': 0}
+        catalog_sync.subscribe(self._on_catalog_changed)
+
+    def _on_catalog_changed(self, version: int):
+        """Responses of older versions can never be served again"""
+        self._cache.clear()
+
+    @staticmethod
+    def etag(version: int, encoding: str) -> str:
+        return f'"v{version}"' if encoding == 'identity' else f'"v{version}-{encoding}"'
+
+    @staticmethod
+    def _matches(if_none_match: str, version: int) -> bool:
+        """Whether any tag the client holds is of this version, in any encoding"""
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            tag = tag[2:] if tag.startswith('W/') else tag
+            if tag.strip('"').split('-')[0] == f'v{version}':
+                return True
+        return False
+
+    def _headers(self, version: int, encoding: str) -> Dict[str, str]:
+        headers = {
+            'ETag': self.etag(version, encoding),
+            'Cache-Control': f'public, max-age={settings.API_MAX_AGE}, must-revalidate',
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return headers
+
+    async def respond(self, request: Request, key: tuple, render: Callable) -> Response:
+        """Serve the response for key: 304, cached body, or render it
+
+        ``render`` is an async callable returning (status code, JSON payload).
+        """
+        version = catalog_sync.version
+        encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+        cached = self._cache.get(key)
+        if self._matches(request.headers.get('if-none-match', ''), version):
+            self.not_modified += 1
+            if cached is not None:
+                encoding = cached.coding(encoding)
+            headers = self._headers(version, encoding)
+            headers.pop('Content-Encoding', None)
+            return Response(status_code=304, headers=headers)
+
+        if cached is not None and cached.version == version:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            try:
+                status_code, payload = await render()
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Error rendering catalog API response {key}: {e}")
+                raise
+            payload = {'version': version, **payload}
+            cached = CachedResponse(version, status_code, json.dumps(payload, separators=(',', ':')).encode())
+            if catalog_sync.version == version:
+                # Not kept if the catalog changed mid-render
+                self._cache[key] = cached
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        encoding, body = cached.encoded(encoding)
+        self.bytes_sent[encoding] += len(body)
+        return Response(
+            content=body, status_code=cached.status_code, media_type='application/json',
+            headers=self._headers(version, encoding)
+        )
+
+    async def products(
+        self, category: Optional[str], min_price: Optional[float], max_price: Optional[float],
+        sort: str, limit: int, cursor: Optional[str], fields: Tuple[str, ...]
+    ) -> Tuple[int, Dict]:
+        try:
+            position = decode_cursor(sort, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page = await self.product_service.browse_products(
+            category=category, min_price=min_price, max_price=max_price,
+            sort=sort, limit=limit, cursor=position
+        )
+        return 200, {
+            'items': [_project(item._asdict(), fields) for item in page.items],
+            'next_cursor': encode_cursor(page.next_cursor),
+        }
+
+    async def product(self, product_id: int, fields: Tuple[str, ...]) -> Tuple[int, Dict]:
+        product = await self.product_service.get_product_by_id(product_id)
+        if product is None:
+            return 404, {'detail': f"Product {product_id} not found"}
+        return 200, {'product': _project(product.model_dump(mode='json'), fields)}
+
+    async def categories(self) -> Tuple[int, Dict]:
+        facets: List[CategoryFacet] = await self.product_service.facets.get_facets()
+        return 200, {'categories': [facet._asdict() for facet in facets]}
+
+    async def search(self, query: str, limit: int, offset: int, fields: Tuple[str, ...]) -> Tuple[int, Dict]:
+        matches = await self.product_service.search_storefront_products(query, limit=limit, offset=offset)
+        if offset == 0 and len(matches) < limit:
+            total = len(matches)
+        else:
+            total = await self.product_service.count_storefront_matches(query)
+        return 200, {
+            'query': query,
+            'total': total,
+            'items': [_project(item._asdict(), fields) for item in matches],
+            'next_offset': offset + limit if offset + limit < total else None,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'cached_responses': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'bytes_sent': dict(self.bytes_sent),
+            'brotli': brotli is not None,
+        }
+
+def catalog_router(api: CatalogAPI) -> APIRouter:
+    """Routes for the JSON catalog API"""
+    router = APIRouter(prefix='/api', tags=['catalog'])
+    page_size = Query(settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE)
+
+    @router.get('/products')
+    async def list_products(
+        request: Request,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: str = 'featured',
+        limit: int = page_size,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        """Filtered, sorted product summaries; follow next_cursor for the next page"""
+        if sort not in SORT_OPTIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}; allowed: {', '.join(SORT_OPTIONS)}")
+        selected = select_fields(fields, SUMMARY_FIELDS)
+        key = ('products', category, min_price, max_price, sort, limit, cursor, selected)
+        return await api.respond(request, key, lambda: api.products(
+            category, min_price, max_price, sort, limit, cursor, selected
+        ))
+
+    @router.get('/products/{product_id}')
+    async def get_product(request: Request, product_id: int, fields: Optional[str] = None):
+        """One product with all its attributes"""
+        selected = select_fields(fields, PRODUCT_FIELDS)
+        return await api.respond(request, ('product', product_id, selected), lambda: api.product(product_id, selected))
+
+    @router.get('/categories')
+    async def list_categories(request: Request):
+        """Categories with product counts and price ranges"""
+        return await api.respond(request, ('categories',), api.categories)
+
+    @router.get('/search')
+    async def search_products(
+        request: Request,
+        q: str = Query(..., min_length=1, max_length=100),
+        limit: int = page_size,
+        offset: int = Query(0, ge=0),
+        fields: Optional[str] = None,
+    ):
+        """Products whose name or description contains q"""
+        selected = select_fields(fields, SUMMARY_FIELDS)
+        key = ('search', q, limit, offset, selected)
+        return await api.respond(request, key, lambda: api.search(q, limit, offset, selected))
+
+    return router
\ No newline at end of file
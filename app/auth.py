@@ -0,0 +1,27 @@
+"""Admin Credentials for Operator Endpoints
+
+HTTP Basic check against ADMIN_USERNAME and ADMIN_PASSWORD, used as a
+FastAPI dependency on endpoints that expose worker internals.
+"""
+
+import secrets
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+
+from app.config import settings
+
+_basic = HTTPBasic(realm="Apple Store admin")
+
+def require_admin(credentials: HTTPBasicCredentials = Depends(_basic)) -> str:
+    """Reject the request unless it carries the admin username and password"""
+    # Compare both in constant time so neither leaks through timing
+    username_ok = secrets.compare_digest(credentials.username.encode(), settings.ADMIN_USERNAME.encode())
+    password_ok = secrets.compare_digest(credentials.password.encode(), settings.ADMIN_PASSWORD.encode())
+    if not (username_ok and password_ok):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return credentials.username
@@ -3,14 +3,18 @@
 from nicegui import ui
 from services.product_service import ProductService
 from models.schemas import ProductCreate
-from typing import Optional
+from services.facet_service import DEFAULT_CATEGORIES
+from core.tracing import traced_action
+from app.config import settings
+from typing import Dict, Optional
 import os
 
 class AdminPanel:
     """Admin panel for managing products"""
     
-    def __init__(self, product_service: ProductService):
+    def __init__(self, product_service: ProductService, category_options: Optional[Dict[str, str]] = None):
         self.product_service = product_service
+        self.category_options = category_options or {c: c for c in DEFAULT_CATEGORIES}
         self.products = []
         self.render()
     
@@ -30,11 +34,17 @@ class AdminPanel:
                 
                 with ui.column().classes('flex-1'):
                     category_input = ui.select(
-                        ['iPhone', 'iPad', 'Mac', 'Watch', 'AirPods', 'Accessories'],
+                        self.category_options,
                         label='Category'
                     ).classes('w-full')
                     stock_input = ui.number('Stock', value=0).classes('w-full')
                     image_input = ui.input('Image URL').classes('w-full')
+                    ui.upload(
+                        label='Or upload an image',
+                        auto_upload=True,
+                        max_file_size=settings.MAX_FILE_SIZE,
+                        on_upload=lambda e: self.upload_image(e, image_input)
+                    ).props('accept=image/*').classes('w-full')
             
             ui.button(
                 'Add Product',
@@ -81,6 +91,7 @@ class AdminPanel:
         except Exception as e:
             ui.notify(f'Error loading products: {str(e)}', type='negative')
     
+    @traced_action
     async def add_product(self, name: str, description: str, price: float, category: str, stock: int, image_url: str):
         """Add a new product"""
         try:
@@ -104,10 +115,21 @@ class AdminPanel:
         except Exception as e:
             ui.notify(f'Error adding product: {str(e)}', type='negative')
     
+    @traced_action
+    async def upload_image(self, event, image_input):
+        """Store an uploaded image and put its URL in the form"""
+        try:
+            image_url, _ = await self.product_service.images.save_upload(event.content.read())
+            image_input.value = image_url
+            ui.notify('Image uploaded', type='positive')
+        except Exception as e:
+            ui.notify(f'Error uploading image: {str(e)}', type='negative')
+    
     def edit_product(self, product):
         """Edit product (placeholder)"""
         ui.notify(f'Edit functionality for {product.name} coming soon!', type='info')
     
+    @traced_action
     async def delete_product(self, product_id: int):
         """Delete a product"""
         try:
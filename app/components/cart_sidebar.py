@@ -1,16 +1,25 @@
 """Cart Sidebar Component"""
 
-from nicegui import ui
-from models.schemas import CartItem
+from nicegui import context, ui
+from models.schemas import CartItem, CartLine, ProductSummary
 from services.cart_service import CartService
-from typing import List
+from services.checkout_service import CheckoutService, CheckoutError
+from core.admission import AdmissionRejected
+from core.unit_of_work import unit_of_work
+from core.tracing import traced_action
+from core.analytics import analytics, ADD_TO_CART, REMOVE_FROM_CART
+from typing import List, Optional, Union
 
 class CartSidebar:
     """Shopping cart sidebar component"""
     
-    def __init__(self, cart_items: List[CartItem], cart_service: CartService):
+    def __init__(self, cart_items: List[Union[CartItem, CartLine]], cart_service: CartService,
+                 checkout_service: Optional[CheckoutService] = None,
+                 recommendations: Optional[List[ProductSummary]] = None):
         self.cart_items = cart_items
         self.cart_service = cart_service
+        self.checkout_service = checkout_service or CheckoutService()
+        self.recommendations = recommendations or []
         self.render()
     
     def render(self):
@@ -64,6 +73,16 @@ class CartSidebar:
                     
                     total += item.price * item.quantity
                 
+                # Frequently Bought Together
+                if self.recommendations:
+                    ui.label('Frequently bought together').classes('text-sm font-semibold text-gray-600 mt-2 mb-2')
+                    for product in self.recommendations:
+                        with ui.row().classes('w-full items-center justify-between mb-2'):
+                            with ui.column().classes('gap-0'):
+                                ui.label(product.name).classes('text-sm')
+                                ui.label(f'${product.price:.2f}').classes('text-xs text-blue-600')
+                            ui.button(icon='add', on_click=lambda p=product: self.add_recommendation(p)).props('flat round size=sm')
+                
                 # Cart Summary
                 ui.separator().classes('my-6')
                 
@@ -91,26 +110,104 @@ class CartSidebar:
         # This would typically update the parent component state
         ui.notify('Cart closed', type='info')
     
-    async def update_quantity(self, item: CartItem, change: int):
+    @traced_action
+    @unit_of_work
+    async def update_quantity(self, item: Union[CartItem, CartLine], change: int):
         """Update item quantity"""
         try:
             new_quantity = max(0, item.quantity + change)
             if new_quantity == 0:
-                await self.cart_service.remove_from_cart(item.product_id)
+                await self.cart_service.remove_from_cart(item.product_id, admission_key=context.client.id)
             else:
-                await self.cart_service.update_quantity(item.product_id, new_quantity)
+                await self.cart_service.update_quantity(item.product_id, new_quantity, admission_key=context.client.id)
+            if new_quantity != item.quantity:
+                kind = ADD_TO_CART if new_quantity > item.quantity else REMOVE_FROM_CART
+                analytics.track(kind, item.product_id, self.cart_service.session_id,
+                                quantity=abs(new_quantity - item.quantity), source='cart')
             ui.notify('Cart updated', type='positive')
+        except AdmissionRejected as e:
+            ui.notify(str(e), type='warning')
         except Exception as e:
             ui.notify(f'Error updating cart: {str(e)}', type='negative')
     
-    async def remove_item(self, item: CartItem):
+    @traced_action
+    @unit_of_work
+    async def add_recommendation(self, product: ProductSummary):
+        """Add a recommended product to the cart"""
+        try:
+            await self.cart_service.add_to_cart(product.id, 1, admission_key=context.client.id)
+            analytics.track(ADD_TO_CART, product.id, self.cart_service.session_id, source='recommendation')
+            ui.notify(f'Added {product.name} to cart!', type='positive')
+        except AdmissionRejected as e:
+            ui.notify(str(e), type='warning')
+        except Exception as e:
+            ui.notify(f'Error adding to cart: {str(e)}', type='negative')
+    
+    @traced_action
+    @unit_of_work
+    async def remove_item(self, item: Union[CartItem, CartLine]):
         """Remove item from cart"""
         try:
-            await self.cart_service.remove_from_cart(item.product_id)
+            await self.cart_service.remove_from_cart(item.product_id, admission_key=context.client.id)
+            analytics.track(REMOVE_FROM_CART, item.product_id, self.cart_service.session_id,
+                            quantity=item.quantity, source='cart')
             ui.notify('Item removed from cart', type='positive')
+        except AdmissionRejected as e:
+            ui.notify(str(e), type='warning')
         except Exception as e:
             ui.notify(f'Error removing item: {str(e)}', type='negative')
     
-    def checkout(self):
-        """Process checkout"""
-        ui.notify('Checkout functionality coming soon!', type='info')
\ No newline at end of file
+    @traced_action
+    @unit_of_work
+    async def checkout(self):
+        """Reserve stock for the cart and ask the shopper to confirm"""
+        try:
+            reservation = await self.checkout_service.reserve_cart(self.cart_service.session_id, admission_key=context.client.id)
+        except (CheckoutError, AdmissionRejected) as e:
+            ui.notify(str(e), type='warning')
+            return
+        except Exception as e:
+            ui.notify(f'Error during checkout: {str(e)}', type='negative')
+            return
+        
+        # Persistent: Esc or a click outside must not leave the stock held
+        with ui.dialog().props('persistent') as dialog, ui.card().style('min-width: 360px;'):
+            ui.label('Confirm Order').classes('text-xl font-bold mb-2')
+            for line in reservation.items:
+                with ui.row().classes('w-full justify-between'):
+                    ui.label(f'{line.product_name} × {line.quantity}')
+                    ui.label(f'${line.price * line.quantity:.2f}')
+            ui.separator().classes('my-2')
+            with ui.row().classes('w-full justify-between'):
+                ui.label('Total:').classes('font-bold')
+                ui.label(f'${reservation.total:.2f}').classes('font-bold text-blue-600')
+            ui.label('Items are held for you for a few minutes.').classes('text-xs text-gray-500 mt-2')
+            with ui.row().classes('w-full justify-end gap-2 mt-4'):
+                ui.button('Cancel', on_click=lambda: self.cancel_checkout(dialog, reservation.reservation_id)).props('flat')
+                ui.button('Place Order', on_click=lambda: self.confirm_checkout(dialog, reservation.reservation_id)).classes('apple-button')
+        dialog.open()
+    
+    @traced_action
+    @unit_of_work
+    async def confirm_checkout(self, dialog, reservation_id: str):
+        """Turn the held stock into an order"""
+        try:
+            order = await self.checkout_service.confirm(reservation_id)
+            ui.notify(f'Order #{order.id} placed!', type='positive')
+        except CheckoutError as e:
+            ui.notify(str(e), type='warning')
+        except Exception as e:
+            ui.notify(f'Error placing order: {str(e)}', type='negative')
+        finally:
+            dialog.close()
+    
+    @traced_action
+    @unit_of_work
+    async def cancel_checkout(self, dialog, reservation_id: str):
+        """Return the held stock"""
+        try:
+            await self.checkout_service.release(reservation_id)
+        except Exception as e:
+            ui.notify(f'Error cancelling checkout: {str(e)}', type='negative')
+        finally:
+            dialog.close()
\ No newline at end of file
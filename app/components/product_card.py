@@ -1,16 +1,25 @@
 """Product Card Component"""
 
 from nicegui import ui
-from models.schemas import Product
-from typing import Callable, Awaitable
+from models.schemas import Product, ProductSummary
+from core.analytics import analytics, PRODUCT_VIEW
+from services.image_service import card_image
+from typing import Callable, Awaitable, List, Optional, Union
 
 class ProductCard:
     """Apple-inspired product card component"""
     
-    def __init__(self, product: Product, add_to_cart_callback: Callable[[Product], Awaitable[None]]):
+    def __init__(self, product: Union[Product, ProductSummary], add_to_cart_callback: Callable[[ProductSummary], Awaitable[None]],
+                 related: Optional[List[ProductSummary]] = None, session_id: Optional[str] = None,
+                 eager_image: bool = False):
         self.product = product
         self.add_to_cart = add_to_cart_callback
+        self.related = related or []
+        # Only cards above the fold fetch their image for the first paint
+        self.eager_image = eager_image
         self.render()
+        if session_id is not None:
+            analytics.track(PRODUCT_VIEW, product.id, session_id)
     
     def render(self):
         """Render the product card"""
@@ -18,7 +27,13 @@ class ProductCard:
             # Product Image
             with ui.element('div').style('height: 200px; background: #f8f9fa; display: flex; align-items: center; justify-content: center;'):
                 if self.product.image_url:
-                    ui.image(self.product.image_url).style('max-width: 100%; max-height: 100%; object-fit: contain;')
+                    attributes, color = card_image(
+                        self.product.image_url, self.product.name, self.product.image_placeholder, self.eager_image
+                    )
+                    image = ui.element('img').style('max-width: 100%; max-height: 100%; object-fit: contain;')
+                    image.props.update(attributes)
+                    if color:
+                        image.style(f'background-color: {color};')
                 else:
                     # Placeholder with Apple product icon
                     ui.icon('devices', size='4rem').style('color: #ccc;')
@@ -42,6 +57,12 @@ class ProductCard:
                 else:
                     ui.label('Out of stock').classes('text-xs text-red-600 mb-3')
                 
+                # Frequently Bought Together
+                if self.related:
+                    ui.label(
+                        'Often bought with ' + ', '.join(product.name for product in self.related)
+                    ).classes('text-xs text-gray-500 mb-2').style('white-space: nowrap; overflow: hidden; text-overflow: ellipsis;')
+                
                 # Add to Cart Button
                 ui.button(
                     'Add to Cart',
@@ -1,7 +1,7 @@
 """Application Configuration"""
 
 import os
-from typing import Optional
+from typing import List, Optional
 
 class Settings:
     """Application settings from environment variables"""
@@ -15,8 +15,35 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     
+    # Workers (multi-process serving behind PORT)
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    WORKER_BASE_PORT: int = int(os.getenv("WORKER_BASE_PORT", "8100"))
+    WORKER_ID: int = int(os.getenv("WORKER_ID", "0"))
+    CATALOG_SYNC_INTERVAL: float = float(os.getenv("CATALOG_SYNC_INTERVAL", "1.0"))
+    
+    # Storefront: with PRERENDER_STOREFRONT, "/" serves a static snapshot and
+    # the interactive NiceGUI storefront moves to STOREFRONT_PATH
+    PRERENDER_STOREFRONT: bool = os.getenv("PRERENDER_STOREFRONT", "false").lower() == "true"
+    STOREFRONT_PATH: str = os.getenv("STOREFRONT_PATH", "/store" if PRERENDER_STOREFRONT else "/")
+    SNAPSHOT_PRODUCTS: int = int(os.getenv("SNAPSHOT_PRODUCTS", "24"))
+    SNAPSHOT_MAX_AGE: int = int(os.getenv("SNAPSHOT_MAX_AGE", "30"))
+    
+    # Read-only JSON catalog API under /api, cacheable per catalog version
+    API_ENABLED: bool = os.getenv("API_ENABLED", "true").lower() == "true"
+    API_MAX_AGE: int = int(os.getenv("API_MAX_AGE", "30"))
+    API_PAGE_SIZE: int = int(os.getenv("API_PAGE_SIZE", "24"))
+    API_MAX_PAGE_SIZE: int = int(os.getenv("API_MAX_PAGE_SIZE", "100"))
+    API_CACHE_ENTRIES: int = int(os.getenv("API_CACHE_ENTRIES", "1024"))
+    
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./apple_store.db")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    
+    # Optional read replicas for catalog reads (comma-separated URLs)
+    READ_REPLICA_URLS: List[str] = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+    # Catalog versions a replica may trail the primary by and still serve reads
+    REPLICA_MAX_LAG: int = int(os.getenv("REPLICA_MAX_LAG", "0"))
+    REPLICA_CHECK_INTERVAL: float = float(os.getenv("REPLICA_CHECK_INTERVAL", "1.0"))
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-this")
@@ -27,11 +54,94 @@ class Settings:
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "static/images/products")
     
+    # Product images: the first ABOVE_FOLD_IMAGES cards load eagerly, the rest
+    # lazily over a dominant-color placeholder computed when the image is saved;
+    # products saved without one are filled in by a background job
+    ABOVE_FOLD_IMAGES: int = int(os.getenv("ABOVE_FOLD_IMAGES", "4"))
+    IMAGE_MAX_DIMENSION: int = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+    IMAGE_FETCH_TIMEOUT: float = float(os.getenv("IMAGE_FETCH_TIMEOUT", "5.0"))
+    IMAGE_BACKFILL_INTERVAL: float = float(os.getenv("IMAGE_BACKFILL_INTERVAL", "600"))
+    IMAGE_BACKFILL_BUDGET_MS: int = int(os.getenv("IMAGE_BACKFILL_BUDGET_MS", "10000"))
+    IMAGE_BACKFILL_BATCH_SIZE: int = int(os.getenv("IMAGE_BACKFILL_BATCH_SIZE", "50"))
+    
     # Store Settings
     STORE_NAME: str = os.getenv("STORE_NAME", "Apple Store")
     STORE_TAGLINE: str = os.getenv("STORE_TAGLINE", "Think Different")
     CURRENCY: str = os.getenv("CURRENCY", "USD")
     TAX_RATE: float = float(os.getenv("TAX_RATE", "0.08"))
+    
+    # Admission control for cart writes
+    CART_RATE_PER_SECOND: float = float(os.getenv("CART_RATE_PER_SECOND", "5"))
+    CART_RATE_BURST: int = int(os.getenv("CART_RATE_BURST", "10"))
+    MAX_INFLIGHT_WRITES: int = int(os.getenv("MAX_INFLIGHT_WRITES", "32"))
+    ADMISSION_MAX_LOOP_LAG_MS: float = float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", "250"))
+    ADMISSION_MAX_SESSIONS: int = int(os.getenv("ADMISSION_MAX_SESSIONS", "10000"))
+    
+    # Checkout
+    RESERVATION_TTL_SECONDS: int = int(os.getenv("RESERVATION_TTL_SECONDS", "600"))
+    CHECKOUT_BUSY_TIMEOUT_MS: int = int(os.getenv("CHECKOUT_BUSY_TIMEOUT_MS", "50"))
+    CHECKOUT_MAX_RETRIES: int = int(os.getenv("CHECKOUT_MAX_RETRIES", "20"))
+    CHECKOUT_RETRY_BASE_DELAY: float = float(os.getenv("CHECKOUT_RETRY_BASE_DELAY", "0.005"))
+    CHECKOUT_RETRY_MAX_DELAY: float = float(os.getenv("CHECKOUT_RETRY_MAX_DELAY", "0.05"))
+    
+    # Background maintenance (intervals in seconds)
+    MAINTENANCE_ENABLED: bool = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+    MAINTENANCE_JOB_BUDGET_MS: int = int(os.getenv("MAINTENANCE_JOB_BUDGET_MS", "200"))
+    MAINTENANCE_JITTER: float = float(os.getenv("MAINTENANCE_JITTER", "0.1"))
+    MAINTENANCE_BUSY_INFLIGHT: int = int(os.getenv("MAINTENANCE_BUSY_INFLIGHT", "4"))
+    OPTIMIZE_INTERVAL: float = float(os.getenv("OPTIMIZE_INTERVAL", "3600"))
+    WAL_CHECKPOINT_INTERVAL: float = float(os.getenv("WAL_CHECKPOINT_INTERVAL", "300"))
+    VACUUM_INTERVAL: float = float(os.getenv("VACUUM_INTERVAL", "3600"))
+    CART_PURGE_INTERVAL: float = float(os.getenv("CART_PURGE_INTERVAL", "900"))
+    RESERVATION_SWEEP_INTERVAL: float = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "60"))
+    CACHE_WARM_INTERVAL: float = float(os.getenv("CACHE_WARM_INTERVAL", "300"))
+    CART_TTL_DAYS: int = int(os.getenv("CART_TTL_DAYS", "30"))
+    PURGE_BATCH_SIZE: int = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+    
+    # "Frequently bought together" recommendations
+    RECOMMENDATIONS_ENABLED: bool = os.getenv("RECOMMENDATIONS_ENABLED", "true").lower() == "true"
+    RECOMMENDATION_REFRESH_INTERVAL: float = float(os.getenv("RECOMMENDATION_REFRESH_INTERVAL", "600"))
+    RECOMMENDATION_TOP_K: int = int(os.getenv("RECOMMENDATION_TOP_K", "8"))
+    RECOMMENDATION_MIN_COUNT: int = int(os.getenv("RECOMMENDATION_MIN_COUNT", "2"))
+    RECOMMENDATION_MAX_BASKET: int = int(os.getenv("RECOMMENDATION_MAX_BASKET", "50"))
+    RECOMMENDATION_BUDGET_MS: int = int(os.getenv("RECOMMENDATION_BUDGET_MS", "5000"))
+    
+    # Columnar in-memory catalog for storefront listings
+    CATALOG_ENGINE_ENABLED: bool = os.getenv("CATALOG_ENGINE_ENABLED", "true").lower() == "true"
+    # Workers map a shared snapshot of the columns (defaults to <sqlite file>.catalog)
+    CATALOG_SNAPSHOT_ENABLED: bool = os.getenv("CATALOG_SNAPSHOT_ENABLED", "true").lower() == "true"
+    CATALOG_SNAPSHOT_PATH: str = os.getenv("CATALOG_SNAPSHOT_PATH", "")
+    CATALOG_SNAPSHOT_GRACE: float = float(os.getenv("CATALOG_SNAPSHOT_GRACE", "2.0"))
+    
+    # Buffered analytics events (product views, cart adds and removes);
+    # ANALYTICS_SINK is "database" (analytics_events table) or "jsonl"
+    ANALYTICS_ENABLED: bool = os.getenv("ANALYTICS_ENABLED", "true").lower() == "true"
+    ANALYTICS_SINK: str = os.getenv("ANALYTICS_SINK", "database")
+    ANALYTICS_DIR: str = os.getenv("ANALYTICS_DIR", "analytics")
+    ANALYTICS_ROTATE_MB: int = int(os.getenv("ANALYTICS_ROTATE_MB", "64"))
+    ANALYTICS_BUFFER_SIZE: int = int(os.getenv("ANALYTICS_BUFFER_SIZE", "100000"))
+    ANALYTICS_BATCH_SIZE: int = int(os.getenv("ANALYTICS_BATCH_SIZE", "1000"))
+    ANALYTICS_FLUSH_INTERVAL: float = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "2.0"))
+    
+    # Span tracing from page handlers and UI callbacks down to SQL; a sampled
+    # share of actions is recorded, slow ones are logged with their span tree
+    # and all recorded ones are appended to TRACING_EXPORT_DIR as Chrome trace
+    # events (open in Perfetto or speedscope); empty dir disables the export
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "0.1"))
+    TRACING_SLOW_MS: float = float(os.getenv("TRACING_SLOW_MS", "250"))
+    TRACING_EXPORT_DIR: str = os.getenv("TRACING_EXPORT_DIR", "traces")
+    
+    # Search autocomplete index
+    AUTOCOMPLETE_MAX_ENTRIES: int = int(os.getenv("AUTOCOMPLETE_MAX_ENTRIES", "1000000"))
+    
+    # UI memory diagnostics (per-process budgets, checked every interval)
+    UI_DIAGNOSTICS_INTERVAL: float = float(os.getenv("UI_DIAGNOSTICS_INTERVAL", "60"))
+    UI_DIAGNOSTICS_SAMPLE: int = int(os.getenv("UI_DIAGNOSTICS_SAMPLE", "20"))
+    UI_CLIENT_ELEMENT_BUDGET: int = int(os.getenv("UI_CLIENT_ELEMENT_BUDGET", "1500"))
+    UI_CLIENT_BYTES_BUDGET: int = int(os.getenv("UI_CLIENT_BYTES_BUDGET", "1048576"))
+    UI_TOTAL_BYTES_BUDGET: int = int(os.getenv("UI_TOTAL_BYTES_BUDGET", "268435456"))
+    INSTANCE_MEMORY_MB: int = int(os.getenv("INSTANCE_MEMORY_MB", "512"))
 
 settings = Settings()
 
@@ -0,0 +1,265 @@
+"""Per-Client UI Memory Diagnostics
+
+Every open storefront tab keeps its NiceGUI element tree, and the event
+handlers attached to it, in server memory until the client is pruned. This
+module reports live clients, elements per client and an approximate byte
+cost per client, and logs a warning when a client or the whole process goes
+over its configured budget. Budgets are checked on a fixed interval; the last
+report is kept for the diagnostics endpoint, so polling it changes nothing.
+
+Byte sizes are estimates: ``sys.getsizeof`` over each element's own state
+(props, classes, style, text, values) plus whatever its event handlers close
+over. Services and other shared objects reached through a handler are
+counted shallowly, so the number tracks per-client cost rather than the
+whole heap.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import os
+import random
+import sys
+import time
+import types
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+from nicegui import Client
+from nicegui.element import Element
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Element attributes that point back into the tree or at shared state
+_SKIP_ATTRIBUTES = {'client', 'parent_slot', 'slots', 'default_slot', 'tailwind'}
+_MAX_DEPTH = 6
+
+def _size_of(obj: Any, seen: Set[int], depth: int = 0) -> int:
+    """Approximate retained size of per-client data reachable from obj"""
+    if id(obj) in seen or depth > _MAX_DEPTH:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    depth += 1
+    if isinstance(obj, dict):
+        size += sum(_size_of(k, seen, depth) + _size_of(v, seen, depth) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_size_of(item, seen, depth) for item in obj)
+    elif isinstance(obj, BaseModel):
+        size += _size_of(obj.__dict__, seen, depth)
+    elif isinstance(obj, types.MethodType):
+        # The bound instance is usually a shared service or component
+        size += _size_of(obj.__func__, seen, depth)
+    elif isinstance(obj, types.FunctionType):
+        for cell in obj.__closure__ or ():
+            try:
+                size += _size_of(cell.cell_contents, seen, depth)
+            except ValueError:
+                pass
+        size += sum(_size_of(d, seen, depth) for d in obj.__defaults__ or ())
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        size += sum(_size_of(getattr(obj, f.name, None), seen, depth) for f in dataclasses.fields(obj))
+    return size
+
+def element_size(element: Element, seen: Set[int]) -> int:
+    """Approximate bytes held by one element and its event handlers"""
+    size = sys.getsizeof(element)
+    for name, value in vars(element).items():
+        if name in _SKIP_ATTRIBUTES or isinstance(value, (Element, Client)):
+            continue
+        size += _size_of(value, seen)
+    return size
+
+def client_size(client: Client) -> int:
+    """Approximate bytes held by a client's element tree"""
+    seen: Set[int] = set()
+    return sum(element_size(element, seen) for element in list(client.elements.values()))
+
+def _children(element: Element) -> List[Element]:
+    return [child for slot in element.slots.values() for child in slot.children]
+
+def largest_trees(client: Client, limit: int) -> List[Dict[str, Any]]:
+    """The element subtrees with the most descendants below the page content"""
+    sizes: Dict[int, int] = {}
+
+    def count(element: Element) -> int:
+        total = 1 + sum(count(child) for child in _children(element))
+        sizes[element.id] = total
+        return total
+
+    count(client.content)
+    ranked = sorted(
+        (element_id for element_id in sizes if element_id != client.content.id),
+        key=sizes.get, reverse=True
+    )[:limit]
+    return [
+        {
+            'id': element_id,
+            'type': type(client.elements[element_id]).__name__,
+            'tag': client.elements[element_id].tag,
+            'elements': sizes[element_id],
+        }
+        for element_id in ranked if element_id in client.elements
+    ]
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, where the OS reports it"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+class UIDiagnostics:
+    """Reports and budgets the memory held by connected NiceGUI clients
+
+    Element counts are cheap and taken for every client; byte sizes walk
+    each element, so they are measured for a random sample of clients (plus
+    every client over its element budget) and extrapolated from the average
+    bytes per element.
+    """
+
+    def __init__(self, element_budget: int, client_bytes_budget: int, total_bytes_budget: int,
+                 memory_limit_bytes: int, sample_size: int = 20, trees: int = 5):
+        self.element_budget = element_budget
+        self.client_bytes_budget = client_bytes_budget
+        self.total_bytes_budget = total_bytes_budget
+        self.memory_limit_bytes = memory_limit_bytes
+        self.sample_size = sample_size
+        self.trees = trees
+        self.over_budget = 0
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._warned: Set[str] = set()
+        self._task = None
+
+    @staticmethod
+    def _clients() -> List[Client]:
+        return [client for client in list(Client.instances.values()) if not client.shared]
+
+    def measure(self, sample_size: Optional[int] = None, trees: int = 0) -> Dict[str, Any]:
+        """Element counts for every client and byte sizes for a sample"""
+        clients = self._clients()
+        counts = {client.id: len(client.elements) for client in clients}
+        sample_size = self.sample_size if sample_size is None else sample_size
+        sampled = random.sample(clients, min(sample_size, len(clients)))
+        sampled += [client for client in clients
+                    if counts[client.id] > self.element_budget and client not in sampled]
+
+        start = time.perf_counter()
+        measured = {client.id: client_size(client) for client in sampled}
+        measure_ms = (time.perf_counter() - start) * 1000
+        measured_elements = sum(counts[client_id] for client_id in measured)
+        bytes_per_element = sum(measured.values()) / measured_elements if measured_elements else 0.0
+
+        now = time.time()
+        per_client = []
+        for client in clients:
+            estimated = client.id not in measured
+            entry = {
+                'id': client.id,
+                'path': client.page.path,
+                'connected': client.has_socket_connection,
+                'age_s': round(now - client.created, 1),
+                'elements': counts[client.id],
+                'bytes': measured.get(client.id, round(counts[client.id] * bytes_per_element)),
+                'bytes_estimated': estimated,
+            }
+            if trees and not estimated:
+                entry['types'] = dict(Counter(
+                    type(element).__name__ for element in client.elements.values()
+                ).most_common(10))
+                entry['largest_trees'] = largest_trees(client, trees)
+            per_client.append(entry)
+        per_client.sort(key=lambda entry: entry['bytes'], reverse=True)
+
+        total_bytes = sum(entry['bytes'] for entry in per_client)
+        average_bytes = total_bytes / len(per_client) if per_client else 0.0
+        rss = process_rss()
+        report = {
+            'clients': len(per_client),
+            'connected': sum(1 for entry in per_client if entry['connected']),
+            'elements': sum(counts.values()),
+            'max_elements_per_client': max(counts.values(), default=0),
+            'avg_elements_per_client': round(sum(counts.values()) / len(counts), 1) if counts else 0.0,
+            'bytes_per_element': round(bytes_per_element, 1),
+            'avg_bytes_per_client': round(average_bytes),
+            'total_client_bytes': total_bytes,
+            'measured_clients': len(measured),
+            'measure_ms': round(measure_ms, 1),
+            'rss_bytes': rss,
+            'budgets': {
+                'elements_per_client': self.element_budget,
+                'bytes_per_client': self.client_bytes_budget,
+                'total_client_bytes': self.total_bytes_budget,
+                'memory_limit_bytes': self.memory_limit_bytes,
+            },
+            'over_budget': self.over_budget,
+            'per_client': per_client,
+        }
+        if rss is not None and average_bytes:
+            # Headroom left under the instance limit, in average clients
+            report['estimated_additional_clients'] = max(0, int((self.memory_limit_bytes - rss) / average_bytes))
+        return report
+
+    def check_budgets(self, report: Dict[str, Any]) -> List[str]:
+        """Log a warning for each budget exceeded; each client is reported once"""
+        warnings = []
+        live = set()
+        for entry in report['per_client']:
+            live.add(entry['id'])
+            problems = []
+            if entry['elements'] > self.element_budget:
+                problems.append(f"{entry['elements']} elements (budget {self.element_budget})")
+            if entry['bytes'] > self.client_bytes_budget:
+                problems.append(f"~{entry['bytes']} bytes (budget {self.client_bytes_budget})")
+            if problems and entry['id'] not in self._warned:
+                self._warned.add(entry['id'])
+                warnings.append(f"UI client {entry['id']} on {entry['path']} holds {', '.join(problems)}")
+        self._warned &= live
+
+        if report['total_client_bytes'] > self.total_bytes_budget:
+            warnings.append(
+                f"UI clients hold ~{report['total_client_bytes']} bytes across {report['clients']} clients "
+                f"(budget {self.total_bytes_budget})"
+            )
+        if report['rss_bytes'] is not None and report['rss_bytes'] > self.memory_limit_bytes * 0.8:
+            warnings.append(
+                f"Process RSS {report['rss_bytes']} bytes is over 80% of the "
+                f"{self.memory_limit_bytes} byte instance limit"
+            )
+
+        self.over_budget += len(warnings)
+        for warning in warnings:
+            logger.warning(warning)
+        return warnings
+
+    def check(self) -> Dict[str, Any]:
+        """Measure, check budgets and keep the report as last_report"""
+        report = self.measure(trees=self.trees)
+        report['warnings'] = self.check_budgets(report)
+        report['checked_at'] = time.time()
+        self.last_report = report
+        return report
+
+    async def run(self, interval: float):
+        """Periodic budget check, starting with one right away"""
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error measuring UI clients: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float):
+        """Start periodic budget checks on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(interval))
+
+    def stop(self):
+        """Stop periodic budget checks"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
\ No newline at end of file
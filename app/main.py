@@ -3,210 +3,269 @@ Apple Store - Main Application
 Beautiful e-commerce interface with Apple-inspired design
 """
 
-from nicegui import ui, app
+from nicegui import ui, app, context
+from fastapi import Depends, HTTPException
 import asyncio
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, Optional, Set
 import os
 
 from core.database import init_database, get_session
-from models.schemas import Product, CartItem
+from core.catalog_sync import catalog_sync
+from core.replicas import replica_router
+from core.unit_of_work import unit_of_work, unit_of_work_stats
+from core.analytics import analytics, ADD_TO_CART
+from core.tracing import traced_action, tracer
+from core.admission import cart_admission, AdmissionRejected
+from core.scheduler import MaintenanceScheduler
+from core import maintenance
+from models.schemas import Product, CartItem, ProductSummary, CartLine, CategoryFacet, Suggestion
 from services.product_service import ProductService
 from services.cart_service import CartService
+from services.checkout_service import CheckoutService
+from services.recommendation_service import RecommendationService
+from services.image_service import UPLOAD_ROUTE
 from app.components.product_card import ProductCard
 from app.components.cart_sidebar import CartSidebar
 from app.components.admin_panel import AdminPanel
 from app.config import settings
+from app.theme import APPLE_STYLES
+from app.diagnostics import UIDiagnostics
+from app.auth import require_admin
 
 # Global services
 product_service = ProductService()
 cart_service = CartService()
+checkout_service = CheckoutService(product_service)
+recommendation_service = RecommendationService(
+    top_k=settings.RECOMMENDATION_TOP_K,
+    min_count=settings.RECOMMENDATION_MIN_COUNT,
+    max_basket=settings.RECOMMENDATION_MAX_BASKET
+)
 
 # Add custom CSS for Apple-inspired design
-ui.add_head_html('''
-<style>
-    :root {
-        --apple-blue: #007AFF;
-        --apple-gray: #8E8E93;
-        --apple-light-gray: #F2F2F7;
-        --apple-dark: #1C1C1E;
-        --apple-white: #FFFFFF;
-    }
-    
-    body {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        margin: 0;
-        padding: 0;
-    }
-    
-    .apple-header {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-bottom: 1px solid rgba(0, 0, 0, 0.1);
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
-    }
-    
-    .apple-card {
-        background: white;
-        border-radius: 12px;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
-        transition: all 0.3s ease;
-        border: none;
-    }
-    
-    .apple-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 30px rgba(0, 0, 0, 0.15);
-    }
-    
-    .apple-button {
-        background: var(--apple-blue);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 12px 24px;
-        font-weight: 600;
-        transition: all 0.2s ease;
-        cursor: pointer;
-    }
-    
-    .apple-button:hover {
-        background: #0056CC;
-        transform: scale(1.02);
-    }
-    
-    .apple-button-secondary {
-        background: var(--apple-light-gray);
-        color: var(--apple-dark);
-        border: 1px solid var(--apple-gray);
-    }
-    
-    .apple-button-secondary:hover {
-        background: #E5E5EA;
-    }
-    
-    .product-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-        gap: 24px;
-        padding: 24px;
-    }
-    
-    .hero-section {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        text-align: center;
-        padding: 80px 20px;
-        margin-bottom: 40px;
-    }
-    
-    .cart-badge {
-        background: #FF3B30;
-        color: white;
-        border-radius: 50%;
-        width: 20px;
-        height: 20px;
-        font-size: 12px;
-        font-weight: bold;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        position: absolute;
-        top: -8px;
-        right: -8px;
-    }
-    
-    .price-tag {
-        font-size: 24px;
-        font-weight: 700;
-        color: var(--apple-blue);
-    }
-    
-    .category-nav {
-        background: white;
-        border-radius: 12px;
-        padding: 16px;
-        margin: 20px;
-        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-    }
-    
-    .loading-spinner {
-        border: 3px solid var(--apple-light-gray);
-        border-top: 3px solid var(--apple-blue);
-        border-radius: 50%;
-        width: 30px;
-        height: 30px;
-        animation: spin 1s linear infinite;
-        margin: 20px auto;
-    }
-    
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-    
-    .error-message {
-        background: #FF3B30;
-        color: white;
-        padding: 12px 20px;
-        border-radius: 8px;
-        margin: 10px;
-        text-align: center;
-    }
-    
-    .success-message {
-        background: #34C759;
-        color: white;
-        padding: 12px 20px;
-        border-radius: 8px;
-        margin: 10px;
-        text-align: center;
-    }
-</style>
-''')
+ui.add_head_html(APPLE_STYLES)
 
 class AppleStore:
     def __init__(self):
         self.current_category = "All"
         self.cart_visible = False
-        self.products: List[Product] = []
-        self.cart_items: List[CartItem] = []
+        self.products: List[ProductSummary] = []
+        self.cart_items: List[CartLine] = []
+        self.facets: List[CategoryFacet] = []
+        self.min_price: Optional[float] = None
+        self.max_price: Optional[float] = None
+        self.sort = "featured"
+        self.next_cursor: Optional[tuple] = None
+        self.related: Dict[int, List[ProductSummary]] = {}
+        self.cart_recommendations: List[ProductSummary] = []
+        self.suggestions: List[Suggestion] = []
+        self.viewed: Set[int] = set()
         self.loading = False
         
     async def load_products(self):
         """Load products from database"""
         try:
             self.loading = True
-            self.products = await product_service.get_all_products()
-            self.cart_items = await cart_service.get_cart_items()
+            await self.browse()
+            self.cart_items = await cart_service.get_cart_lines()
+            await self.load_cart_recommendations()
+            self.facets = await product_service.facets.get_facets()
         except Exception as e:
             ui.notify(f"Error loading products: {str(e)}", type='negative')
         finally:
             self.loading = False
 
-    async def add_to_cart(self, product: Product):
+    @traced_action
+    @unit_of_work
+    async def add_to_cart(self, product: ProductSummary, source: str = 'grid'):
         """Add product to cart"""
         try:
-            await cart_service.add_to_cart(product.id, 1)
-            self.cart_items = await cart_service.get_cart_items()
+            await cart_service.add_to_cart(product.id, 1, admission_key=context.client.id)
+            analytics.track(ADD_TO_CART, product.id, cart_service.session_id, source=source)
+            self.cart_items = await cart_service.get_cart_lines()
+            await self.load_cart_recommendations()
             ui.notify(f"Added {product.name} to cart!", type='positive')
+        except AdmissionRejected as e:
+            ui.notify(str(e), type='warning')
         except Exception as e:
             ui.notify(f"Error adding to cart: {str(e)}", type='negative')
 
+    @traced_action
+    async def suggest(self, query: str):
+        """Update search suggestions from the in-memory autocomplete index"""
+        try:
+            self.suggestions = await product_service.autocomplete.suggest(query or '')
+        except Exception as e:
+            self.suggestions = []
+            ui.notify(f"Error searching products: {str(e)}", type='negative')
+        self.search_suggestions.refresh()
+
+    @traced_action
+    @unit_of_work
+    async def add_suggestion(self, suggestion: Suggestion):
+        """Add a suggested product to cart"""
+        product = await product_service.get_product_by_id(suggestion.product_id)
+        if product:
+            await self.add_to_cart(product, source='search')
+        self.suggestions = []
+        self.search_suggestions.refresh()
+
+    async def browse(self):
+        """Load the first page for the current filters and sort"""
+        page = await product_service.browse_products(
+            category=self.current_category,
+            min_price=self.min_price,
+            max_price=self.max_price,
+            sort=self.sort
+        )
+        self.products = page.items
+        self.next_cursor = page.next_cursor
+        self.related = {}
+        await self.load_related(page.items)
+
+    async def load_related(self, products: List[ProductSummary]):
+        """Look up precomputed "often bought with" products for the cards"""
+        for product in products:
+            related = recommendation_service.recommend(product.id, 3)
+            if related:
+                self.related[product.id] = await product_service.get_storefront_products_by_ids(related)
+
+    async def load_cart_recommendations(self):
+        """Look up products frequently bought together with the cart"""
+        self.cart_recommendations = await product_service.get_storefront_products_by_ids(
+            recommendation_service.recommend_for_cart([line.product_id for line in self.cart_items])
+        )
+
+    @traced_action
+    @unit_of_work
+    async def load_more(self):
+        """Append the next page for the current filters and sort"""
+        if self.next_cursor is None:
+            return
+        try:
+            page = await product_service.browse_products(
+                category=self.current_category,
+                min_price=self.min_price,
+                max_price=self.max_price,
+                sort=self.sort,
+                cursor=self.next_cursor
+            )
+            self.products = self.products + page.items
+            self.next_cursor = page.next_cursor
+            await self.load_related(page.items)
+            self.product_grid.refresh()
+        except Exception as e:
+            ui.notify(f"Error loading products: {str(e)}", type='negative')
+
+    @traced_action
+    @unit_of_work
     async def filter_by_category(self, category: str):
         """Filter products by category"""
         self.current_category = category
-        if category == "All":
-            self.products = await product_service.get_all_products()
-        else:
-            self.products = await product_service.get_products_by_category(category)
+        await self.apply_filters()
+
+    @traced_action
+    @unit_of_work
+    async def filter_by_price(self, min_price: Optional[float], max_price: Optional[float]):
+        """Filter products by price range"""
+        self.min_price = min_price
+        self.max_price = max_price
+        await self.apply_filters()
+
+    @traced_action
+    @unit_of_work
+    async def sort_by(self, sort: str):
+        """Change the product sort order"""
+        self.sort = sort
+        await self.apply_filters()
+
+    async def apply_filters(self):
+        """Reload the product grid for the current filters"""
+        try:
+            await self.browse()
+            self.product_grid.refresh()
+        except Exception as e:
+            ui.notify(f"Error filtering products: {str(e)}", type='negative')
+
+    def category_labels(self) -> Dict[str, str]:
+        """Category navigation labels with product counts"""
+        labels = {"All": f"All ({sum(facet.count for facet in self.facets)})"}
+        for facet in self.facets:
+            labels[facet.category] = f"{facet.category} ({facet.count})"
+        return labels
+
+    def first_view(self, product_id: int) -> bool:
+        """Whether the product is shown for the first time on this page
+
+        The grid is rebuilt on Load More and on every filter change, so views
+        are counted once per page rather than once per render.
+        """
+        if product_id in self.viewed:
+            return False
+        self.viewed.add(product_id)
+        return True
 
-store = AppleStore()
+    @ui.refreshable
+    def product_grid(self):
+        """Products grid for the current filters"""
+        with ui.element('div').classes('product-grid'):
+            for index, product in enumerate(self.products):
+                session_id = cart_service.session_id if self.first_view(product.id) else None
+                ProductCard(product, self.add_to_cart, self.related.get(product.id), session_id=session_id,
+                            eager_image=index < settings.ABOVE_FOLD_IMAGES)
+    
+        if self.next_cursor is not None:
+            with ui.row().classes('w-full justify-center'):
+                ui.button('Load More', on_click=self.load_more).classes('apple-button-secondary')
+
+    @ui.refreshable
+    def search_suggestions(self):
+        """Autocomplete suggestions under the header search box"""
+        if not self.suggestions:
+            return
+        with ui.card().classes('w-full').style('position: absolute; top: 100%; z-index: 200; padding: 4px;'):
+            for suggestion in self.suggestions:
+                with ui.row().classes('w-full items-center justify-between cursor-pointer').on(
+                    'click', lambda s=suggestion: self.add_suggestion(s)
+                ):
+                    ui.label(suggestion.name)
+                    ui.label(f"${suggestion.price:.2f}" if suggestion.stock > 0 else 'Out of stock').classes('text-gray-500')
+
+SORT_LABELS = {
+    'featured': 'Featured',
+    'price_asc': 'Price: Low to High',
+    'price_desc': 'Price: High to Low',
+    'newest': 'Newest',
+    'in_stock': 'In Stock First',
+}
 
-@ui.page('/')
-async def index():
-    """Main store page"""
+@ui.page(settings.STOREFRONT_PATH)
+@traced_action
+async def index(add: Optional[str] = None, cart: bool = False, category: Optional[str] = None, more: bool = False):
+    """Main store page
+    
+    The query parameters carry the interaction that upgraded a visitor from
+    the prerendered snapshot (add to cart, open cart, filter, load more).
+    An add is only applied for a token issued by the snapshot's POST form.
+    Every page gets its own store, so filters, paging and refreshes only
+    touch the client that made them.
+    """
+    store = AppleStore()
+    if category:
+        store.current_category = category
     await store.load_products()
+    if more:
+        await store.load_more()
+    if add is not None and settings.PRERENDER_STOREFRONT:
+        product_id = pending_adds.redeem(add)
+        product = await product_service.get_product_by_id(product_id) if product_id is not None else None
+        if product:
+            await store.add_to_cart(product, source='snapshot')
+        # Don't repeat the add when the page is reloaded
+        ui.add_head_html(f"<script>history.replaceState(null, '', '{settings.STOREFRONT_PATH}')</script>")
+    if cart:
+        store.cart_visible = True
     
     # Header
     with ui.row().classes('w-full apple-header').style('position: sticky; top: 0; z-index: 100; padding: 16px 24px;'):
@@ -216,11 +275,19 @@ async def index():
                 ui.icon('apple', size='2rem').style('color: #000;')
                 ui.label('Apple Store').classes('text-2xl font-bold')
             
+            # Search
+            with ui.element('div').style('position: relative; min-width: 280px;'):
+                ui.input(
+                    placeholder='Search products',
+                    on_change=lambda e: store.suggest(e.value)
+                ).props('dense outlined clearable debounce=100').classes('w-full')
+                store.search_suggestions()
+            
             # Navigation
             with ui.row().classes('items-center gap-6'):
-                for category in ['All', 'iPhone', 'iPad', 'Mac', 'Watch', 'AirPods']:
+                for category, label in store.category_labels().items():
                     ui.button(
-                        category, 
+                        label, 
                         on_click=lambda cat=category: store.filter_by_category(cat)
                     ).props('flat').classes('text-gray-700 hover:text-blue-600')
                 
@@ -233,7 +300,7 @@ async def index():
                     
                     # Cart badge
                     if len(store.cart_items) > 0:
-                        ui.element('div').classes('cart-badge').text(str(len(store.cart_items)))
+                        ui.label(str(len(store.cart_items))).classes('cart-badge')
                 
                 # Admin button
                 ui.button('Admin', on_click=lambda: ui.navigate.to('/admin')).props('outline')
@@ -246,11 +313,26 @@ async def index():
     # Category Navigation
     with ui.element('div').classes('category-nav'):
         with ui.row().classes('w-full justify-center gap-4'):
-            for category in ['All', 'iPhone', 'iPad', 'Mac', 'Watch', 'AirPods', 'Accessories']:
+            for category, label in store.category_labels().items():
                 ui.button(
-                    category,
+                    label,
                     on_click=lambda cat=category: store.filter_by_category(cat)
                 ).classes('apple-button-secondary' if category != store.current_category else 'apple-button')
+        
+        # Price Range and Sort
+        with ui.row().classes('w-full justify-center items-end gap-4 mt-4'):
+            min_price_input = ui.number('Min price', value=store.min_price, min=0, format='%.2f')
+            max_price_input = ui.number('Max price', value=store.max_price, min=0, format='%.2f')
+            ui.button(
+                'Apply',
+                on_click=lambda: store.filter_by_price(min_price_input.value, max_price_input.value)
+            ).classes('apple-button-secondary')
+            ui.select(
+                SORT_LABELS,
+                value=store.sort,
+                label='Sort by',
+                on_change=lambda e: store.sort_by(e.value)
+            ).style('min-width: 200px;')
 
     # Loading indicator
     if store.loading:
@@ -258,34 +340,228 @@ async def index():
             pass
 
     # Products Grid
-    with ui.element('div').classes('product-grid'):
-        for product in store.products:
-            ProductCard(product, store.add_to_cart)
+    store.product_grid()
 
     # Cart Sidebar
     if store.cart_visible:
-        CartSidebar(store.cart_items, cart_service)
+        CartSidebar(store.cart_items, cart_service, checkout_service, store.cart_recommendations)
 
     # Footer
     with ui.element('footer').style('background: #1C1C1E; color: white; padding: 40px 20px; margin-top: 60px;'):
         with ui.row().classes('w-full justify-center'):
             ui.label('© 2024 Apple Store. All rights reserved.').classes('text-center')
 
+if settings.PRERENDER_STOREFRONT:
+    from fastapi import Request, Response
+    from fastapi.responses import RedirectResponse
+    from app.snapshot import PendingAdds, StorefrontSnapshot
+    
+    storefront_snapshot = StorefrontSnapshot(product_service)
+    pending_adds = PendingAdds()
+    
+    # Replace NiceGUI's built-in auto-index route
+    app.remove_route('/')
+    
+    @app.get('/', include_in_schema=False)
+    async def storefront(request: Request):
+        """Prerendered anonymous storefront with conditional GET"""
+        body, etag = await storefront_snapshot.get()
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={settings.SNAPSHOT_MAX_AGE}, must-revalidate',
+            'Vary': 'Accept-Encoding',
+        }
+        if etag in request.headers.get('if-none-match', ''):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type='text/html; charset=utf-8', headers=headers)
+    
+    @app.post(f"{settings.STOREFRONT_PATH.rstrip('/')}/add/{{product_id}}", include_in_schema=False)
+    async def snapshot_add_to_cart(product_id: int):
+        """Add to Cart from the snapshot: redirect into the store with a single-use token"""
+        token = pending_adds.issue(product_id)
+        return RedirectResponse(f"{settings.STOREFRONT_PATH}?add={token}", status_code=303)
+    
+    @app.get('/metrics/snapshot')
+    async def snapshot_metrics():
+        """Snapshot adds issued, redeemed and rejected"""
+        return {'renders': storefront_snapshot.renders, 'adds': pending_adds.stats()}
+
+# Uploaded product images; content-addressed file names never change content
+app.add_static_files(UPLOAD_ROUTE, settings.UPLOAD_DIR)
+
+if settings.API_ENABLED:
+    from app.api import CatalogAPI, catalog_router
+    
+    catalog_api = CatalogAPI(product_service, max_entries=settings.API_CACHE_ENTRIES)
+    app.include_router(catalog_router(catalog_api))
+    
+    @app.get('/metrics/api')
+    async def api_metrics():
+        """JSON catalog API cache hits, 304s and bytes sent per encoding"""
+        return catalog_api.stats()
+
 @ui.page('/admin')
+@traced_action
 async def admin():
     """Admin panel for managing products"""
-    AdminPanel(product_service)
+    AdminPanel(product_service, await product_service.facets.get_category_options())
 
 @ui.page('/health')
 async def health():
     """Health check endpoint"""
     return {"status": "healthy", "service": "Apple Store"}
 
+@app.get('/metrics/admission')
+async def admission_metrics():
+    """Admission control counters for cart writes"""
+    return cart_admission.stats()
+
+def store_is_busy() -> bool:
+    """Defer maintenance while shoppers are writing or the event loop lags"""
+    return (cart_admission.inflight >= settings.MAINTENANCE_BUSY_INFLIGHT
+            or cart_admission.loop_lag > cart_admission.max_loop_lag / 2)
+
+async def sweep_reservations(deadline: float) -> Dict:
+    """Return stock held by expired reservations"""
+    released = 0
+    while time.monotonic() < deadline:
+        batch = await checkout_service.release_expired()
+        released += batch
+        if batch == 0:
+            break
+    return {"released": released}
+
+async def warm_catalog_caches(deadline: float) -> Dict:
+    """Rebuild catalog caches off the request path"""
+    await product_service.get_storefront_products()
+    await product_service.facets.get_facets()
+    await product_service.autocomplete.ensure_built()
+    if product_service.catalog is not None:
+        await product_service.catalog.columns()
+    if settings.PRERENDER_STOREFRONT:
+        await storefront_snapshot.get()
+    return {"catalog_version": catalog_sync.version}
+
+maintenance_scheduler = MaintenanceScheduler(jitter=settings.MAINTENANCE_JITTER, is_busy=store_is_busy)
+budget = settings.MAINTENANCE_JOB_BUDGET_MS / 1000
+maintenance_scheduler.add_job('optimize', maintenance.optimize, settings.OPTIMIZE_INTERVAL, budget)
+maintenance_scheduler.add_job('wal_checkpoint', maintenance.wal_checkpoint, settings.WAL_CHECKPOINT_INTERVAL, budget)
+maintenance_scheduler.add_job('incremental_vacuum', maintenance.incremental_vacuum, settings.VACUUM_INTERVAL, budget)
+maintenance_scheduler.add_job(
+    'purge_expired_carts',
+    lambda deadline: maintenance.purge_expired_carts(deadline, settings.CART_TTL_DAYS, settings.PURGE_BATCH_SIZE),
+    settings.CART_PURGE_INTERVAL, budget
+)
+maintenance_scheduler.add_job('sweep_reservations', sweep_reservations, settings.RESERVATION_SWEEP_INTERVAL, budget)
+maintenance_scheduler.add_job('warm_catalog_caches', warm_catalog_caches, settings.CACHE_WARM_INTERVAL, budget,
+                              exclusive=False)
+maintenance_scheduler.add_job(
+    'image_placeholders',
+    lambda deadline: product_service.backfill_image_placeholders(deadline, settings.IMAGE_BACKFILL_BATCH_SIZE),
+    settings.IMAGE_BACKFILL_INTERVAL, settings.IMAGE_BACKFILL_BUDGET_MS / 1000
+)
+if settings.RECOMMENDATIONS_ENABLED:
+    # Every worker keeps its own table; the rebuild is skipped when carts and orders are unchanged
+    maintenance_scheduler.add_job('recommendations', recommendation_service.refresh,
+                                  settings.RECOMMENDATION_REFRESH_INTERVAL,
+                                  settings.RECOMMENDATION_BUDGET_MS / 1000, exclusive=False, initial_delay=0)
+
+@app.get('/metrics/recommendations')
+async def recommendation_metrics():
+    """Recommendation table size and rebuild timings"""
+    return recommendation_service.stats
+
+@app.get('/metrics/catalog')
+async def catalog_metrics():
+    """In-memory catalog column size and rebuilds"""
+    return product_service.catalog.stats() if product_service.catalog is not None else {'enabled': False}
+
+@app.get('/metrics/autocomplete')
+async def autocomplete_metrics():
+    """Autocomplete index size and approximate memory use"""
+    return product_service.autocomplete.stats()
+
+@app.get('/metrics/replicas')
+async def replica_metrics():
+    """Read replica versions, lag and routing counts"""
+    return replica_router.stats()
+
+@app.get('/metrics/unit_of_work')
+async def unit_of_work_metrics():
+    """Sessions and queries per UI event"""
+    return unit_of_work_stats.stats()
+
+@app.get('/metrics/analytics')
+async def analytics_metrics():
+    """Buffered analytics events, batches written and overflow"""
+    return analytics.stats()
+
+@app.get('/metrics/images')
+async def image_metrics():
+    """Image uploads and placeholders computed, failed and cached"""
+    return product_service.images.stats()
+
+@app.get('/metrics/tracing')
+async def tracing_metrics():
+    """Recorded and sampled-out actions, recent slow actions and the trace file"""
+    return tracer.stats()
+
+@app.get('/metrics/maintenance')
+async def maintenance_metrics():
+    """Per-job maintenance metrics"""
+    return maintenance_scheduler.stats()
+
+ui_diagnostics = UIDiagnostics(
+    element_budget=settings.UI_CLIENT_ELEMENT_BUDGET,
+    client_bytes_budget=settings.UI_CLIENT_BYTES_BUDGET,
+    total_bytes_budget=settings.UI_TOTAL_BYTES_BUDGET,
+    memory_limit_bytes=settings.INSTANCE_MEMORY_MB * 1024 * 1024,
+    sample_size=settings.UI_DIAGNOSTICS_SAMPLE
+)
+
+@app.get('/diagnostics/ui', dependencies=[Depends(require_admin)])
+async def ui_diagnostics_report(clients: int = 20):
+    """Live clients, elements and approximate bytes per client in this worker, as of the last periodic check"""
+    report = ui_diagnostics.last_report
+    if report is None:
+        raise HTTPException(status_code=503, detail="UI diagnostics have not run yet")
+    return dict(report, per_client=report['per_client'][:clients])
+
+async def start_background_tasks():
+    """Follow catalog changes from other workers and replicas, watch event loop lag and UI memory, run upkeep"""
+    catalog_sync.start(settings.CATALOG_SYNC_INTERVAL)
+    analytics.start(settings.ANALYTICS_FLUSH_INTERVAL)
+    replica_router.start(settings.REPLICA_CHECK_INTERVAL)
+    await product_service.autocomplete.ensure_built()
+    cart_admission.start()
+    if settings.MAINTENANCE_ENABLED:
+        maintenance_scheduler.start()
+    ui_diagnostics.start(settings.UI_DIAGNOSTICS_INTERVAL)
+
+async def stop_background_tasks():
+    """Stop background tasks"""
+    analytics.stop()
+    tracer.close()
+    maintenance_scheduler.stop()
+    ui_diagnostics.stop()
+    replica_router.stop()
+    catalog_sync.stop()
+    cart_admission.stop()
+
+app.on_startup(start_background_tasks)
+app.on_shutdown(stop_background_tasks)
+
 def main():
     """Main application entry point"""
     # Initialize database
     init_database()
     
+    # Several workers: supervise them behind a sticky proxy on PORT
+    if settings.WORKERS > 1:
+        from core.workers import run_workers
+        run_workers()
+        return
+    
     # Configure NiceGUI
     ui.run(
         host=settings.HOST,
@@ -0,0 +1,223 @@
+"""Prerendered Anonymous Storefront Snapshot
+
+Renders the default catalog view to static HTML once per catalog version.
+Every interactive control is a plain link into the NiceGUI storefront, so a
+visitor only gets a live client once they add to cart, open the cart or
+filter. Add to Cart is a POST form: the endpoint hands out a single-use
+token and redirects into the store, which applies the add for that token
+only, so crawlers and link prefetchers never change a cart.
+"""
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from html import escape
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.config import settings
+from app.theme import APPLE_STYLES
+from core.catalog_sync import catalog_sync
+from models.schemas import CategoryFacet, ProductSummary
+from services.product_service import ProductService
+from services.image_service import card_image
+
+logger = logging.getLogger(__name__)
+
+# Plain CSS standing in for the Tailwind utility classes used by the live page
+SNAPSHOT_STYLES = '''
+<style>
+    .header-row { display: flex; align-items: center; justify-content: space-between; flex-wrap: wrap; gap: 16px; }
+    .nav { display: flex; flex-wrap: wrap; gap: 12px; justify-content: center; align-items: center; }
+    .nav a, .link-button { text-decoration: none; display: inline-block; }
+    .nav-link { color: #3a3a3c; padding: 6px 10px; }
+    .apple-card { display: flex; flex-direction: column; width: 300px; height: 400px; overflow: hidden; }
+    .card-image { height: 200px; background: #f8f9fa; display: flex; align-items: center; justify-content: center; }
+    .card-image img { max-width: 100%; max-height: 100%; object-fit: contain; }
+    .card-body { padding: 20px; display: flex; flex-direction: column; flex: 1; }
+    .card-name { font-size: 1.125rem; font-weight: 600; margin: 0 0 8px; color: #1C1C1E; }
+    .card-description { font-size: 0.875rem; color: #4b5563; line-height: 1.4; height: 40px; overflow: hidden; margin: 0 0 16px; }
+    .card-meta { display: flex; justify-content: space-between; align-items: center; margin-bottom: 16px; }
+    .chip { border: 1px solid #d1d5db; border-radius: 16px; padding: 2px 10px; font-size: 0.75rem; }
+    .stock { font-size: 0.75rem; margin-bottom: 12px; }
+    .in-stock { color: #16a34a; }
+    .out-of-stock { color: #dc2626; }
+    .card-body .card-action { margin: auto 0 0; }
+    .card-action .apple-button { width: 100%; border: none; cursor: pointer; font: inherit; }
+    footer { background: #1C1C1E; color: white; padding: 40px 20px; margin-top: 60px; text-align: center; }
+</style>
+'''
+
+def _store_link(**params) -> str:
+    """Link into the interactive storefront"""
+    query = urlencode({k: v for k, v in params.items() if v is not None})
+    return f"{settings.STOREFRONT_PATH}?{query}" if query else settings.STOREFRONT_PATH
+
+def add_to_cart_path(product_id: int) -> str:
+    """Form action of a snapshot Add to Cart button"""
+    return f"{settings.STOREFRONT_PATH.rstrip('/')}/add/{product_id}"
+
+def _product_card(product: ProductSummary, eager_image: bool) -> str:
+    if product.image_url:
+        attributes, color = card_image(product.image_url, product.name, product.image_placeholder, eager_image)
+        rendered = ''.join(f' {name}="{escape(value)}"' for name, value in attributes.items())
+        style = f' style="background-color: {escape(color)};"' if color else ''
+        image = f'<img{rendered}{style}>'
+    else:
+        image = '<span style="font-size: 4rem; color: #ccc;">&#128241;</span>'
+    if (product.stock or 0) > 0:
+        stock = f'<div class="stock in-stock">{product.stock} in stock</div>'
+    else:
+        stock = '<div class="stock out-of-stock">Out of stock</div>'
+    return f'''
+        <div class="apple-card">
+            <div class="card-image">{image}</div>
+            <div class="card-body">
+                <h2 class="card-name">{escape(product.name)}</h2>
+                <p class="card-description">{escape(product.description or '')}</p>
+                <div class="card-meta">
+                    <span class="price-tag">${product.price:.2f}</span>
+                    <span class="chip">{escape(product.category)}</span>
+                </div>
+                {stock}
+                <form class="card-action" method="post" action="{escape(add_to_cart_path(product.id))}">
+                    <button class="apple-button" type="submit">Add to Cart</button>
+                </form>
+            </div>
+        </div>'''
+
+def render_storefront(products: List[ProductSummary], facets: List[CategoryFacet], more: bool) -> str:
+    """Render the anonymous catalog view as a complete HTML document"""
+    total = sum(facet.count for facet in facets)
+    categories = [('All', f'All ({total})')] + [
+        (facet.category, f'{facet.category} ({facet.count})') for facet in facets
+    ]
+    nav = ''.join(
+        f'<a class="{"apple-button" if category == "All" else "apple-button-secondary"}" '
+        f'href="{escape(_store_link(category=None if category == "All" else category))}">{escape(label)}</a>'
+        for category, label in categories
+    )
+    cards = ''.join(
+        _product_card(product, index < settings.ABOVE_FOLD_IMAGES) for index, product in enumerate(products)
+    )
+    load_more = (
+        f'<div class="nav" style="margin-bottom: 24px;"><a class="apple-button-secondary" '
+        f'href="{escape(_store_link(more=1))}">Load More</a></div>' if more else ''
+    )
+    store_name = escape(settings.STORE_NAME)
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <title>{store_name}</title>
+    {APPLE_STYLES}
+    {SNAPSHOT_STYLES}
+</head>
+<body>
+    <header class="apple-header" style="position: sticky; top: 0; z-index: 100; padding: 16px 24px;">
+        <div class="header-row">
+            <strong style="font-size: 1.5rem;">&#63743; {store_name}</strong>
+            <nav class="nav">
+                <a class="apple-button link-button" rel="nofollow" href="{escape(_store_link(cart=1))}">Cart</a>
+                <a class="nav-link" rel="nofollow" href="/admin">Admin</a>
+            </nav>
+        </div>
+    </header>
+    <section class="hero-section">
+        <h1 style="font-size: 3rem; font-weight: 700; margin: 0 0 16px;">{escape(settings.STORE_TAGLINE)}</h1>
+        <p style="font-size: 1.25rem; opacity: 0.9; margin: 0;">Discover the latest Apple products with innovative technology</p>
+    </section>
+    <nav class="category-nav nav">{nav}</nav>
+    <main class="product-grid">{cards}
+    </main>
+    {load_more}
+    <footer>&copy; 2024 {store_name}. All rights reserved.</footer>
+</body>
+</html>'''
+
+class PendingAdds:
+    """Single-use tokens for adds submitted from the snapshot
+
+    The store page is a GET, so it must not add to the cart for a bare
+    product id in its URL. The snapshot's POST stores the product under a
+    random token that the store page redeems once; unredeemed tokens expire.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Token -> (product id, expiry)
+        self._pending: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.issued = 0
+        self.redeemed = 0
+        self.rejected = 0
+
+    def issue(self, product_id: int) -> str:
+        now = time.monotonic()
+        while self._pending and (len(self._pending) >= self.max_entries or next(iter(self._pending.values()))[1] < now):
+            self._pending.popitem(last=False)
+        token = secrets.token_urlsafe(16)
+        self._pending[token] = (product_id, now + self.ttl)
+        self.issued += 1
+        return token
+
+    def redeem(self, token: str) -> Optional[int]:
+        """Product id of an unexpired token, at most once; None otherwise"""
+        product_id, expires = self._pending.pop(token, (None, 0.0))
+        if product_id is None or expires < time.monotonic():
+            self.rejected += 1
+            return None
+        self.redeemed += 1
+        return product_id
+
+    def stats(self) -> Dict:
+        return {
+            'issued': self.issued,
+            'redeemed': self.redeemed,
+            'rejected': self.rejected,
+            'pending': len(self._pending),
+        }
+
+class StorefrontSnapshot:
+    """Static storefront HTML cached per catalog version"""
+
+    def __init__(self, product_service: ProductService):
+        self.product_service = product_service
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._generation = 0
+        self.renders = 0
+        catalog_sync.subscribe(self._on_catalog_changed)
+
+    def _on_catalog_changed(self, version: int):
+        """Regenerate on the next request after any catalog change"""
+        self._generation += 1
+        self._body = None
+
+    async def get(self) -> Tuple[bytes, str]:
+        """Return (html, strong etag), rendering at most once per change"""
+        if self._body is not None:
+            return self._body, self._etag
+        async with self._lock:
+            if self._body is None:
+                generation = self._generation
+                try:
+                    page = await self.product_service.browse_products(limit=settings.SNAPSHOT_PRODUCTS)
+                    facets = await self.product_service.facets.get_facets()
+                    body = render_storefront(page.items, facets, page.next_cursor is not None).encode()
+                except Exception as e:
+                    logger.error(f"Error rendering storefront snapshot: {e}")
+                    raise
+                digest = hashlib.sha256(body).hexdigest()[:16]
+                etag = f'"v{catalog_sync.version}-{digest}"'
+                self.renders += 1
+                if generation != self._generation:
+                    # The catalog changed mid-render; serve it once, don't keep it
+                    return body, etag
+                self._body, self._etag = body, etag
+        return self._body, self._etag
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Apple-Inspired Theme Styles"""
+
+# Shared by the interactive NiceGUI pages and the prerendered storefront
+APPLE_STYLES = '''
+<style>
+    :root {
+        --apple-blue: #007AFF;
+        --apple-gray: #8E8E93;
+        --apple-light-gray: #F2F2F7;
+        --apple-dark: #1C1C1E;
+        --apple-white: #FFFFFF;
+    }
+    
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+        margin: 0;
+        padding: 0;
+    }
+    
+    .apple-header {
+        background: rgba(255, 255, 255, 0.95);
+        backdrop-filter: blur(20px);
+        border-bottom: 1px solid rgba(0, 0, 0, 0.1);
+        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
+    }
+    
+    .apple-card {
+        background: white;
+        border-radius: 12px;
+        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
+        transition: all 0.3s ease;
+        border: none;
+    }
+    
+    .apple-card:hover {
+        transform: translateY(-5px);
+        box-shadow: 0 8px 30px rgba(0, 0, 0, 0.15);
+    }
+    
+    .apple-button {
+        background: var(--apple-blue);
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 12px 24px;
+        font-weight: 600;
+        transition: all 0.2s ease;
+        cursor: pointer;
+    }
+    
+    .apple-button:hover {
+        background: #0056CC;
+        transform: scale(1.02);
+    }
+    
+    .apple-button-secondary {
+        background: var(--apple-light-gray);
+        color: var(--apple-dark);
+        border: 1px solid var(--apple-gray);
+    }
+    
+    .apple-button-secondary:hover {
+        background: #E5E5EA;
+    }
+    
+    .product-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+        gap: 24px;
+        padding: 24px;
+    }
+    
+    .hero-section {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        text-align: center;
+        padding: 80px 20px;
+        margin-bottom: 40px;
+    }
+    
+    .cart-badge {
+        background: #FF3B30;
+        color: white;
+        border-radius: 50%;
+        width: 20px;
+        height: 20px;
+        font-size: 12px;
+        font-weight: bold;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        position: absolute;
+        top: -8px;
+        right: -8px;
+    }
+    
+    .price-tag {
+        font-size: 24px;
+        font-weight: 700;
+        color: var(--apple-blue);
+    }
+    
+    .category-nav {
+        background: white;
+        border-radius: 12px;
+        padding: 16px;
+        margin: 20px;
+        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
+    }
+    
+    .loading-spinner {
+        border: 3px solid var(--apple-light-gray);
+        border-top: 3px solid var(--apple-blue);
+        border-radius: 50%;
+        width: 30px;
+        height: 30px;
+        animation: spin 1s linear infinite;
+        margin: 20px auto;
+    }
+    
+    @keyframes spin {
+        0% { transform: rotate(0deg); }
+        100% { transform: rotate(360deg); }
+    }
+    
+    .error-message {
+        background: #FF3B30;
+        color: white;
+        padding: 12px 20px;
+        border-radius: 8px;
+        margin: 10px;
+        text-align: center;
+    }
+    
+    .success-message {
+        background: #34C759;
+        color: white;
+        padding: 12px 20px;
+        border-radius: 8px;
+        margin: 10px;
+        text-align: center;
+    }
+</style>
+'''
\ No newline at end of file
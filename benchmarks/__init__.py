@@ -0,0 +1 @@
+"""Benchmarks Package"""
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Cart Admission Benchmark
+Times admission control on cart writes and checks that the rate limit is
+per shopper: every client of a worker shares one CartService, as the
+storefront does, and each must still get the full rate
+
+Run: python -m benchmarks.admission [writes]
+     python -m benchmarks.admission --verify
+With --verify, two clients each add to the cart at the full burst and rate
+while a third exceeds it; exits non-zero if the first two are limited or
+the third is not, or if the third's limit also holds back another
+client's checkout.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_admission_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "admission.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from core.admission import AdmissionRejected, cart_admission
+from core.database import init_database
+from services.cart_service import CartService
+from services.checkout_service import CheckoutError, CheckoutService
+
+async def add(cart: CartService, client: str) -> bool:
+    try:
+        await cart.add_to_cart(1, 1, admission_key=client)
+        return True
+    except AdmissionRejected:
+        return False
+
+async def reserve(checkout: CheckoutService, cart: CartService, client: str) -> bool:
+    """Whether a checkout is admitted; an empty or short cart still counts"""
+    try:
+        await checkout.reserve_cart(cart.session_id, admission_key=client)
+    except AdmissionRejected:
+        return False
+    except CheckoutError:
+        pass
+    return True
+
+async def verify() -> int:
+    init_database()
+    cart = CartService()
+    rate, burst = cart_admission.rate, int(cart_admission.burst)
+    seconds = 2.0
+    admitted = {"client-a": 0, "client-b": 0}
+    attempts = {"client-a": 0, "client-b": 0}
+
+    # The burst at once, then one write per token for `seconds`
+    for client in admitted:
+        for _ in range(burst):
+            attempts[client] += 1
+            admitted[client] += await add(cart, client)
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        await asyncio.sleep(1.05 / rate)
+        for client in admitted:
+            attempts[client] += 1
+            admitted[client] += await add(cart, client)
+
+    noisy = [await add(cart, "client-c") for _ in range(burst + 5)]
+    failures = 0
+    for client in admitted:
+        if admitted[client] != attempts[client]:
+            failures += 1
+            print(f"FAIL: {client} admitted {admitted[client]} of {attempts[client]} at the allowed rate")
+    if noisy.count(True) != burst:
+        failures += 1
+        print(f"FAIL: over-rate client admitted {noisy.count(True)} of {len(noisy)}, expected {burst}")
+
+    # Checkout draws from the same per-client buckets, not the worker's session
+    checkout = CheckoutService()
+    if await reserve(checkout, cart, "client-c"):
+        failures += 1
+        print("FAIL: over-rate client's checkout was admitted")
+    if not await reserve(checkout, cart, "client-d"):
+        failures += 1
+        print("FAIL: checkout of another client was limited by the over-rate client")
+    print(f"{'FAILED' if failures else 'Each client keeps its own rate'}; "
+          f"admitted {admitted}, over-rate client {noisy.count(True)}/{len(noisy)}; {cart_admission.stats()}")
+    return 1 if failures else 0
+
+async def benchmark(writes: int):
+    init_database()
+    cart = CartService()
+    cart_admission.rate = cart_admission.burst = float(writes)
+    start = time.perf_counter()
+    for i in range(writes):
+        await cart.add_to_cart(i % 8 + 1, 1, admission_key=f"client-{i % 100}")
+    admitted_ms = (time.perf_counter() - start) * 1000 / writes
+
+    start = time.perf_counter()
+    for i in range(writes):
+        async with cart_admission.admit(f"client-{i % 100}"):
+            pass
+    admit_us = (time.perf_counter() - start) * 1e6 / writes
+    print(f"{writes} cart writes: {admitted_ms:.2f} ms per write, admission itself {admit_us:.1f} us")
+
+def main():
+    if "--verify" in sys.argv:
+        sys.exit(asyncio.run(verify()))
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
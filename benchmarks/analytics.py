@@ -0,0 +1,107 @@
+"""
+Analytics Pipeline Benchmark
+Compares writing one analytics row per event in the request path with the
+buffered pipeline, and checks overflow accounting and the shutdown flush.
+The median event loop stall while the flusher drains shows that batches are
+written off the loop
+
+Run: python -m benchmarks.analytics [events]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_analytics_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "analytics.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from core.analytics import AnalyticsPipeline, DatabaseEventSink, JsonlEventSink, PRODUCT_VIEW, ADD_TO_CART
+from core.database import get_session, init_database
+from models.schemas import AnalyticsEventDB
+
+def stored() -> int:
+    session = get_session()
+    try:
+        return session.query(AnalyticsEventDB).count()
+    finally:
+        session.close()
+
+def per_event(events: int) -> float:
+    """One row and one commit per event, as a handler writing inline would"""
+    start = time.perf_counter()
+    for i in range(events):
+        session = get_session()
+        try:
+            session.add(AnalyticsEventDB(kind=PRODUCT_VIEW, product_id=i % 500 + 1, session_id="bench",
+                                         quantity=1, created_at=datetime.utcnow()))
+            session.commit()
+        finally:
+            session.close()
+    return time.perf_counter() - start
+
+async def buffered(events: int) -> tuple:
+    """Tracking cost in the handler, total time until the flusher has written
+    everything, and the median event loop stall while it drains"""
+    pipeline = AnalyticsPipeline(DatabaseEventSink(), capacity=events, batch_size=1000)
+    pipeline.start(0.05)
+    start = time.perf_counter()
+    for i in range(events):
+        pipeline.track(ADD_TO_CART if i % 10 == 0 else PRODUCT_VIEW, i % 500 + 1, "bench")
+    tracked = time.perf_counter() - start
+    stalls = []
+    while pipeline.written < events:
+        before = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - before - 0.001)
+    drained = time.perf_counter() - start
+    pipeline.stop()
+    return tracked, drained, statistics.median(stalls), pipeline.stats()
+
+def overflow_and_shutdown() -> dict:
+    """Fill a small buffer past capacity with no flusher running, then stop it"""
+    pipeline = AnalyticsPipeline(DatabaseEventSink(), capacity=1000, batch_size=300)
+    for i in range(5000):
+        pipeline.track(PRODUCT_VIEW, i, "overflow")
+    before = stored()
+    pipeline.stop()
+    stats = pipeline.stats()
+    stats["stored"] = stored() - before
+    return stats
+
+def jsonl(events: int) -> tuple:
+    directory = tempfile.mkdtemp(prefix="apple_store_events_")
+    pipeline = AnalyticsPipeline(JsonlEventSink(directory, rotate_bytes=1024 * 1024), capacity=events, batch_size=1000)
+    for i in range(events):
+        pipeline.track(PRODUCT_VIEW, i % 500 + 1, "bench")
+    start = time.perf_counter()
+    pipeline.stop()
+    lines = sum(sum(1 for _ in open(os.path.join(directory, name))) for name in os.listdir(directory))
+    return time.perf_counter() - start, len(os.listdir(directory)), lines
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    init_database()
+
+    inline = per_event(events)
+    print(f"one row per event:  {events / inline:10,.0f} events/s ({inline / events * 1e6:.0f} us in the handler)")
+    tracked, drained, stall, stats = asyncio.run(buffered(events))
+    print(f"buffered pipeline:  {events / drained:10,.0f} events/s ({tracked / events * 1e6:.2f} us in the handler,"
+          f" {stats['batches']} batches, median loop stall {stall * 1000:.2f} ms)")
+    print(f"rows stored: {stored()} (expected {2 * events})")
+
+    stats = overflow_and_shutdown()
+    print(f"overflow: tracked {stats['tracked']}, dropped {stats['dropped']}, "
+          f"flushed on stop {stats['written']}, stored {stats['stored']}, left {stats['buffered']}")
+
+    seconds, files, lines = jsonl(events)
+    print(f"jsonl sink: {lines} lines in {files} rotated files, {lines / seconds:,.0f} events/s")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
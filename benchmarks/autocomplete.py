@@ -0,0 +1,66 @@
+"""
+Autocomplete Benchmark
+Builds the prefix index over a synthetic catalog and times suggestions
+
+Run: python -m benchmarks.autocomplete [products]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_autocomplete_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "autocomplete.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from sqlalchemy import insert
+from models.schemas import ProductDB
+from core.database import engine, init_database
+from services.autocomplete_service import AutocompleteService
+
+CATEGORIES = ["iPhone", "Mac", "iPad", "Watch", "AirPods", "Accessories"]
+MODELS = ["Pro", "Max", "Air", "Mini", "Ultra", "SE", "Studio", "Plus"]
+PREFIXES = ["i", "ip", "iph", "iphone 1", "mac", "pro", "15 p", "air", "watch ultra", "zz"]
+
+def populate(products: int):
+    init_database()
+    with engine.begin() as connection:
+        connection.execute(insert(ProductDB), [
+            {
+                "name": f"{CATEGORIES[i % 6]} {i % 17} {MODELS[i % 8]} {MODELS[(i // 8) % 8]} Edition {i}",
+                "description": "Synthetic product",
+                "price": 99.0 + i % 1500,
+                "category": CATEGORIES[i % 6],
+                "stock": i % 40,
+            }
+            for i in range(products)
+        ])
+
+async def run(products: int):
+    index = AutocompleteService()
+    start = time.perf_counter()
+    await index.ensure_built()
+    print(f"build: {time.perf_counter() - start:.2f}s for {products} products")
+    print(index.stats())
+
+    for prefix in PREFIXES:
+        start = time.perf_counter()
+        cold = await index.suggest(prefix)
+        cold_us = (time.perf_counter() - start) * 1e6
+        start = time.perf_counter()
+        for _ in range(1000):
+            await index.suggest(prefix)
+        warm_us = (time.perf_counter() - start) * 1e3
+        print(f"{prefix!r:>14}: cold {cold_us:8.0f} us, memoised {warm_us:5.1f} us, {len(cold)} results")
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    populate(products)
+    asyncio.run(run(products))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Columnar Catalog Benchmark
+Times storefront listings and facets from the in-memory columns on a
+synthetic catalog
+
+Run: python -m benchmarks.catalog_engine [products]
+     python -m benchmarks.catalog_engine --verify
+With --verify, every filter/sort combination is paged through on a
+populated database and compared with the SQL browse path; exits non-zero
+on any difference. A change made by another worker must not block reads
+while the columns are rebuilt.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_columns_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "columns.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+import numpy as np
+from sqlalchemy import insert
+
+from models.schemas import ProductDB, ProductSummary, ProductCreate, ProductUpdate
+from core.catalog_sync import catalog_sync, bump_catalog_version
+from core.database import engine, get_session, init_database
+from services.catalog_engine import CatalogColumns
+from services.product_service import ProductService, SORT_OPTIONS
+
+CATEGORIES = ["iPhone", "Mac", "iPad", "Watch", "AirPods", "Accessories"]
+BROWSES = [
+    ("featured, all", {}),
+    ("featured, category", {"category": "Mac"}),
+    ("price_asc, category", {"category": "iPad", "sort": "price_asc"}),
+    ("price_desc, price range", {"min_price": 500, "max_price": 900, "sort": "price_desc"}),
+    ("newest, category + price", {"category": "Watch", "min_price": 200, "max_price": 400, "sort": "newest"}),
+    ("in_stock, category", {"category": "AirPods", "sort": "in_stock"}),
+    ("featured, narrow price", {"min_price": 1000, "max_price": 1001}),
+]
+
+def synthetic_columns(products: int) -> CatalogColumns:
+    rng = np.random.default_rng(7)
+    prices = np.round(rng.uniform(19, 2500, products), 2)
+    stock = rng.integers(0, 50, products)
+    records = [
+        ProductSummary(i + 1, f"Product {i + 1}", None, float(prices[i]), CATEGORIES[i % 6], int(stock[i]), None)
+        for i in range(products)
+    ]
+    created = 1.7e15 + rng.permutation(products).astype(np.float64) * 1e6
+    return CatalogColumns.from_records(records, created)
+
+def timed(label: str, run, repeat: int = 200):
+    run()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    print(f"{label:>34}: {(time.perf_counter() - start) / repeat * 1e6:8.1f} us")
+    return result
+
+def benchmark(products: int):
+    start = time.perf_counter()
+    columns = synthetic_columns(products)
+    print(f"build: {time.perf_counter() - start:.2f}s for {products} products, "
+          f"{columns.memory_bytes() / 1e6:.0f} MB of columns and indexes")
+
+    for label, filters in BROWSES:
+        page = timed(f"browse {label}", lambda: columns.browse(**filters))
+        if page.next_cursor is not None:
+            timed(f"  next page", lambda: columns.browse(cursor=page.next_cursor, **filters))
+    timed("facets", lambda: columns.facets(), repeat=20)
+    timed("facets in price range", lambda: columns.facets(500, 900), repeat=20)
+
+    record = columns.record(products // 2)
+    start = time.perf_counter()
+    columns.update(record._replace(price=record.price + 1, stock=0))
+    print(f"{'patch one product':>34}: {(time.perf_counter() - start) * 1e6:8.1f} us")
+
+def populate(products: int):
+    init_database()
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(ProductDB), [
+            {
+                "name": f"Product {i}",
+                "description": f"Description for product {i}",
+                "price": 19.0 + (i * 37) % 2500,
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "stock": 0 if i % 7 == 0 else i % 50,
+                "created_at": now - timedelta(seconds=i * 7 % 1000),
+            }
+            for i in range(products)
+        ])
+
+async def walk(browse, filters) -> list:
+    ids, cursor = [], None
+    while True:
+        page = await browse(limit=50, cursor=cursor, **filters)
+        ids.extend(item.id for item in page.items)
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+async def verify() -> int:
+    populate(3000)
+    service = ProductService()
+    columns = service.catalog
+    sql = ProductService()
+    sql.catalog = None
+
+    async def compare(stage: str) -> int:
+        failures = 0
+        for sort in SORT_OPTIONS:
+            for category in (None, "Mac", "Missing"):
+                for prices in ((None, None), (400.0, None), (None, 800.0), (400.0, 800.0)):
+                    filters = {"category": category, "min_price": prices[0], "max_price": prices[1], "sort": sort}
+                    if await walk(service.browse_products, filters) != await walk(sql.browse_products, filters):
+                        failures += 1
+                        print(f"FAIL {stage}: {filters}")
+        facets = await columns.facets()
+        expected = await sql.facets.get_facets()
+        if sorted(facets) != sorted(expected):
+            failures += 1
+            print(f"FAIL {stage}: facets {facets} != {expected}")
+        return failures
+
+    failures = await compare("built")
+    created = await service.create_product(ProductCreate(
+        name="Patched", description="Patched product", price=650.0, category="Mac", stock=3
+    ))
+    await service.update_product(2, ProductUpdate(price=777.0, stock=0, category="Mac"))
+    await service.delete_product(5)
+    await service.update_product(created.id, ProductUpdate(category="Vision"))
+    failures += await compare("patched")
+
+    # A change from another worker: reads keep the current columns while
+    # the rebuild runs in a thread
+    current = await columns.columns()
+    session = get_session()
+    try:
+        session.query(ProductDB).filter(ProductDB.id == 3).update({ProductDB.price: 1.0})
+        version = bump_catalog_version(session)
+        session.commit()
+    finally:
+        session.close()
+    catalog_sync.mark_changed(version)
+    start = time.perf_counter()
+    if await columns.columns() is not current:
+        failures += 1
+        print("FAIL: a read waited for the rebuild")
+    blocked_ms = (time.perf_counter() - start) * 1000
+    deadline = time.monotonic() + 30
+    while columns.stats()["version"] != version and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        await columns.columns()
+    print(f"read during rebuild: {blocked_ms:.2f} ms")
+    failures += await compare("rebuilt")
+    print(f"{'FAILED' if failures else 'Engine pages and facets match SQL'}; {columns.stats()}")
+    return 1 if failures else 0
+
+def main():
+    if "--verify" in sys.argv:
+        sys.exit(asyncio.run(verify()))
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Catalog Snapshot Benchmark
+Publishes the columnar catalog as a snapshot file and measures what worker
+processes pay to map it, compared with building their own copy
+
+Run: python -m benchmarks.catalog_snapshot [products] [workers]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.catalog_engine import synthetic_columns
+from services.catalog_engine import CatalogColumns
+from services.catalog_snapshot import map_snapshot, write_snapshot
+
+def memory() -> dict:
+    """Private and shared resident memory of this process, in MB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+def exercise(columns: CatalogColumns) -> int:
+    """Touch what a storefront worker touches: pages in every order, and facets"""
+    pages = 0
+    for sort in CatalogColumns.SORTS:
+        page = columns.browse(sort=sort)
+        columns.browse(sort=sort, cursor=page.next_cursor, category="Mac")
+        pages += 2
+    columns.facets()
+    return pages
+
+def worker(mode: str, path: str, products: int):
+    before = memory()
+    start = time.perf_counter()
+    if mode == "map":
+        meta, arrays = map_snapshot(path)
+        columns = CatalogColumns.from_arrays(meta["categories"], arrays)
+    else:
+        columns = synthetic_columns(products)
+    ready = time.perf_counter() - start
+    exercise(columns)
+    after = memory()
+    print(f"  {mode:>5}: ready in {ready * 1000:8.1f} ms, private +{after['private'] - before['private']:6.1f} MB, "
+          f"shared +{after['shared'] - before['shared']:6.1f} MB")
+
+def main():
+    if sys.argv[1:2] == ["--worker"]:
+        worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    path = os.path.join(tempfile.mkdtemp(prefix="apple_store_snapshot_"), "catalog.snapshot")
+
+    columns = synthetic_columns(products)
+    start = time.perf_counter()
+    size = write_snapshot(path, {"version": 1, "source": "benchmark", "categories": columns.categories},
+                          columns.arrays())
+    print(f"snapshot: {size / 1e6:.0f} MB for {products} products, written in {time.perf_counter() - start:.2f}s")
+
+    meta, arrays = map_snapshot(path)
+    mapped = CatalogColumns.from_arrays(meta["categories"], arrays)
+    same = all(mapped.browse(sort=sort) == columns.browse(sort=sort) for sort in CatalogColumns.SORTS)
+    print(f"mapped pages match the in-memory columns: {same}")
+
+    for mode in ("map", "build"):
+        print(f"{workers} workers, {mode}:")
+        for _ in range(workers):
+            subprocess.run([sys.executable, "-m", "benchmarks.catalog_snapshot", "--worker", mode, path, str(products)],
+                           check=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
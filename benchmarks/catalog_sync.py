@@ -0,0 +1,160 @@
+"""
+Cross-Worker Stock Propagation Benchmark
+Times how long a worker's event loop spends catching up with a checkout
+placed by another worker, on a synthetic catalog
+
+Run: python -m benchmarks.catalog_sync [products]
+     python -m benchmarks.catalog_sync --verify
+A second process checks out, reserves and releases stock; this process then
+polls the catalog version once. With --verify, the facets, autocomplete
+index, columnar catalog and storefront records must be patched from the
+stock log rather than rebuilt, and match a fresh build; a price change in
+the other process must still invalidate them. Exits non-zero on failure.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_sync_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "sync.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from models.schemas import ProductUpdate
+from core.catalog_sync import catalog_sync
+from services.cart_service import CartService
+from services.checkout_service import CheckoutService
+from services.product_service import ProductService, SORT_OPTIONS
+from benchmarks.catalog_engine import populate, walk
+
+# Products the other worker buys; stock i % 50, so product 3 sells out
+BOUGHT = {3: 3, 10: 1, 11: 2}
+QUERIES = ["product", "product 1", "mac", "iphone product 3", "accessories"]
+
+async def other_worker(action: str):
+    """Run in a second process: change the catalog the way another worker would"""
+    products = ProductService()
+    if action == "price":
+        await products.update_product(12, ProductUpdate(price=1.0))
+        return
+    cart = CartService()
+    checkout = CheckoutService(products)
+    for product_id, quantity in BOUGHT.items():
+        await cart.add_to_cart(product_id, quantity)
+    await checkout.checkout(cart.session_id)
+    await cart.add_to_cart(20, 1)
+    reservation = await checkout.reserve_cart(cart.session_id)
+    await checkout.release(reservation.reservation_id)
+
+def in_other_worker(action: str):
+    subprocess.run([sys.executable, "-m", "benchmarks.catalog_sync", "--worker", action], check=True)
+
+async def build(service: ProductService):
+    await service.facets.get_facets()
+    await service.autocomplete.ensure_built()
+    await service.catalog.columns()
+    await service.get_storefront_products_by_ids([1])
+
+def versions(service: ProductService) -> dict:
+    return {
+        "facets": service.facets._version,
+        "autocomplete": service.autocomplete._version,
+        "catalog": service.catalog.stats()["version"],
+        "storefront": service._storefront_version,
+    }
+
+async def compare(service: ProductService, stage: str) -> int:
+    fresh = ProductService()
+    fresh.catalog = None
+    failures = 0
+    if await service.facets.get_facets() != await fresh.facets.get_facets():
+        failures += 1
+        print(f"FAIL {stage}: facets differ from a fresh build")
+    for query in QUERIES:
+        if await service.autocomplete.suggest(query) != await fresh.autocomplete.suggest(query):
+            failures += 1
+            print(f"FAIL {stage}: suggestions for {query!r} differ")
+    for sort in SORT_OPTIONS:
+        for category in (None, "Mac"):
+            filters = {"category": category, "sort": sort}
+            if await walk(service.browse_products, filters) != await walk(fresh.browse_products, filters):
+                failures += 1
+                print(f"FAIL {stage}: columnar browse {filters} differs from SQL")
+    ids = list(BOUGHT) + [20]
+    if await service.get_storefront_products_by_ids(ids) != await fresh.get_storefront_products_by_ids(ids):
+        failures += 1
+        print(f"FAIL {stage}: storefront records differ")
+    return failures
+
+async def verify() -> int:
+    populate(3000)
+    service = ProductService()
+    catalog_sync.check()
+    await build(service)
+
+    in_other_worker("checkout")
+    start = time.perf_counter()
+    catalog_sync.check()
+    poll_ms = (time.perf_counter() - start) * 1000
+    failures = 0
+    expected = {name: catalog_sync.version for name in ("facets", "autocomplete", "catalog", "storefront")}
+    if versions(service) != expected:
+        failures += 1
+        print(f"FAIL: caches went stale instead of being patched: {versions(service)}, expected {expected}")
+    failures += await compare(service, "patched")
+
+    # Anything but a stock change still invalidates
+    in_other_worker("price")
+    catalog_sync.check()
+    if any(version is not None for name, version in versions(service).items() if name != "catalog"):
+        failures += 1
+        print(f"FAIL: a price change was not invalidated: {versions(service)}")
+    deadline = time.monotonic() + 30
+    while service.catalog.stats()["version"] != catalog_sync.version and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        await service.catalog.columns()
+    failures += await compare(service, "rebuilt")
+
+    print(f"{'FAILED' if failures else 'Other workers patch their caches for checkouts'}; "
+          f"poll {poll_ms:.1f} ms, {catalog_sync.stock_patches} versions patched")
+    return 1 if failures else 0
+
+async def benchmark(products: int):
+    populate(products)
+    service = ProductService()
+    catalog_sync.check()
+    start = time.perf_counter()
+    await build(service)
+    print(f"{products} products: caches built in {time.perf_counter() - start:.2f}s")
+
+    in_other_worker("checkout")
+    start = time.perf_counter()
+    catalog_sync.check()
+    await service.autocomplete.suggest("product 1")
+    await service.facets.get_facets()
+    await service.get_storefront_products_by_ids(list(BOUGHT))
+    print(f"catch up with a checkout in another worker: {(time.perf_counter() - start) * 1000:.1f} ms on the loop")
+
+    in_other_worker("price")
+    start = time.perf_counter()
+    catalog_sync.check()
+    await service.autocomplete.suggest("product 1")
+    await service.facets.get_facets()
+    await service.get_storefront_products_by_ids(list(BOUGHT))
+    print(f"catch up with a price change (rebuild): {(time.perf_counter() - start) * 1000:.1f} ms on the loop")
+
+def main():
+    if "--worker" in sys.argv:
+        asyncio.run(other_worker(sys.argv[-1]))
+    elif "--verify" in sys.argv:
+        sys.exit(asyncio.run(verify()))
+    else:
+        asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Checkout Stress Test
+Hundreds of concurrent checkouts on one SKU across several processes
+
+Run: python -m benchmarks.checkout_stress [checkouts] [stock] [processes]
+Exits non-zero if stock is oversold or accounting does not add up, or if a
+cart that starts checkout twice holds its stock twice.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_bench_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "stress.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from sqlalchemy import func, insert
+from models.schemas import Base, ProductDB, CartItemDB, OrderItemDB
+from core.database import engine, get_session, init_database
+from services.checkout_service import CheckoutService, OutOfStockError
+from core.admission import AdmissionRejected
+
+def setup(checkouts: int, stock: int) -> int:
+    """Create one SKU and one single-line cart per checkout"""
+    Base.metadata.create_all(bind=engine)
+    init_database()
+    session = get_session()
+    try:
+        product = ProductDB(name="Launch Day Phone", description="Flash sale", price=999.0,
+                            category="iPhone", stock=stock)
+        session.add(product)
+        session.flush()
+        session.execute(insert(CartItemDB), [
+            {"product_id": product.id, "quantity": 1, "session_id": f"stress-{i}"}
+            for i in range(checkouts)
+        ])
+        session.commit()
+        return product.id
+    finally:
+        session.close()
+
+def worker(session_ids, results):
+    """Run this process's share of checkouts concurrently"""
+    service = CheckoutService()
+
+    async def one(session_id):
+        start = time.perf_counter()
+        try:
+            await service.checkout(session_id)
+            outcome = "ok"
+        except OutOfStockError:
+            outcome = "out_of_stock"
+        except AdmissionRejected:
+            outcome = "shed"
+        return outcome, time.perf_counter() - start
+
+    async def run():
+        return await asyncio.gather(*(one(s) for s in session_ids))
+
+    results.extend(asyncio.run(run()))
+
+def repeated_reservation() -> str:
+    """Reserve one cart twice, then cancel; returns an error or ''"""
+    session = get_session()
+    try:
+        product = ProductDB(name="Held Twice", description="Reservation check", price=99.0,
+                            category="iPhone", stock=5)
+        session.add(product)
+        session.flush()
+        session.add(CartItemDB(product_id=product.id, quantity=2, session_id="repeat"))
+        session.commit()
+        product_id = product.id
+    finally:
+        session.close()
+
+    def stock() -> int:
+        session = get_session()
+        try:
+            return session.query(ProductDB.stock).filter(ProductDB.id == product_id).scalar()
+        finally:
+            session.close()
+
+    async def run() -> list:
+        service = CheckoutService()
+        await service.reserve_cart("repeat")
+        reservation = await service.reserve_cart("repeat")
+        held = stock()
+        await service.release(reservation.reservation_id)
+        return [held, stock()]
+
+    held, released = asyncio.run(run())
+    if (held, released) != (3, 5):
+        return f"repeated checkout left stock {held} held, {released} after cancel (expected 3, 5)"
+    return ""
+
+def main():
+    checkouts = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    product_id = setup(checkouts, stock)
+    session_ids = [f"stress-{i}" for i in range(checkouts)]
+
+    with multiprocessing.Manager() as manager:
+        results = manager.list()
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=worker, args=(session_ids[i::processes], results))
+            for i in range(processes)
+        ]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - start
+        results = list(results)
+
+    session = get_session()
+    try:
+        remaining = session.query(ProductDB.stock).filter(ProductDB.id == product_id).scalar()
+        ordered = session.query(func.coalesce(func.sum(OrderItemDB.quantity), 0)).scalar()
+    finally:
+        session.close()
+
+    succeeded = sum(1 for outcome, _ in results if outcome == "ok")
+    shed = sum(1 for outcome, _ in results if outcome == "shed")
+    latencies = sorted(latency for _, latency in results)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+
+    print(f"{checkouts} checkouts on one SKU (stock {stock}) across {processes} processes in {elapsed:.2f}s")
+    print(f"succeeded={succeeded} shed={shed} ordered={ordered} remaining={remaining}")
+    print(f"latency p50={p50:.1f} ms p99={p99:.1f} ms max={latencies[-1] * 1000:.1f} ms")
+
+    errors = []
+    if len(results) != checkouts:
+        errors.append(f"only {len(results)} of {checkouts} checkouts finished")
+    if remaining < 0:
+        errors.append(f"oversold: stock is {remaining}")
+    # Shed checkouts never touched stock; everyone else competed for it
+    expected = min(stock, checkouts - shed)
+    if succeeded != expected:
+        errors.append(f"expected {expected} successful checkouts, got {succeeded}")
+    if ordered != succeeded or stock - remaining != succeeded:
+        errors.append("stock, orders and successful checkouts do not add up")
+    error = repeated_reservation()
+    if error:
+        errors.append(error)
+    if errors:
+        print("FAILED: " + "; ".join(errors))
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
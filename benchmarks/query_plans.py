@@ -0,0 +1,263 @@
+"""
+Query Plan Regression Check
+Runs EXPLAIN QUERY PLAN for every statement ProductService and CartService
+issue against a populated database, for the stock log that checkout
+writes and other workers read, and for the image placeholder backfill
+
+Run: python -m benchmarks.query_plans [-v]
+Exits non-zero if a statement does a full table scan or builds a temp
+B-tree where an index is expected.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, FrozenSet, List, NamedTuple, Tuple
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_plans_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "plans.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+os.environ["UPLOAD_DIR"] = os.path.join(os.path.dirname(os.environ["APPLE_STORE_BENCH_DB"]), "images")
+# Check the SQL browse path that the in-memory catalog engine stands in for
+os.environ["CATALOG_ENGINE_ENABLED"] = "false"
+
+from PIL import Image
+from sqlalchemy import event, insert
+from app.config import settings
+from models.schemas import ProductDB, CartItemDB, ProductCreate, ProductUpdate, StockChange
+from core.catalog_sync import bump_catalog_version, log_stock_changes, read_stock_changes
+from core.database import engine, get_session, init_database
+from services.product_service import ProductService, SORT_OPTIONS
+from services.cart_service import CartService
+from services.image_service import UPLOAD_ROUTE
+
+PRODUCTS = 5000
+CART_SESSIONS = 500
+LINES_PER_CART = 4
+CATEGORIES = ["iPhone", "Mac", "iPad", "Watch", "AirPods", "Accessories"]
+# Every IMAGE_EVERY-th product shows one of IMAGES uploaded images, saved
+# without a placeholder; the rest have one already or no image at all
+IMAGES = 6
+IMAGE_EVERY = 25
+
+class Scenario(NamedTuple):
+    name: str
+    run: Callable
+    # Tables a full scan is the intended plan for (whole-catalog reads, LIKE '%q%')
+    allow_scan: FrozenSet[str] = frozenset()
+    # No single index serves both the filter and the order
+    allow_temp_btree: bool = False
+    # Plan text that must appear, e.g. an index matching every equality column
+    expect: Tuple[str, ...] = ()
+
+class Finding(NamedTuple):
+    scenario: str
+    statement: str
+    plan: List[str]
+    problems: List[str]
+
+def populate():
+    """Fill the catalog and carts, then gather planner statistics"""
+    init_database()
+    for n in range(IMAGES):
+        Image.new("RGB", (40, 30), (20 * n, 90, 160)).save(os.path.join(settings.UPLOAD_DIR, f"plan-{n}.png"))
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(ProductDB), [
+            {
+                "name": f"Product {i}",
+                "description": f"Description for product {i}",
+                "price": 19.0 + (i * 37) % 2500,
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "stock": 0 if i % 7 == 0 else i % 50,
+                "created_at": now - timedelta(minutes=i),
+                "image_url": f"{UPLOAD_ROUTE}/plan-{i % IMAGES}.png" if i % 5 == 0 else None,
+                "image_placeholder": None if i % IMAGE_EVERY == 0 else "40x30 #14285a",
+            }
+            for i in range(PRODUCTS)
+        ])
+        connection.execute(insert(CartItemDB), [
+            {"product_id": 1 + (s * 13 + line) % PRODUCTS, "quantity": 1, "session_id": f"plan-{s}"}
+            for s in range(CART_SESSIONS)
+            for line in range(LINES_PER_CART)
+        ])
+        # Production databases get statistics from the PRAGMA optimize job
+        connection.exec_driver_sql("ANALYZE")
+
+@contextmanager
+def capture() -> List[Tuple[str, tuple]]:
+    """Record every statement sent to the database"""
+    statements: List[Tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+def explain(statement: str, parameters) -> List[str]:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        connection.rollback()
+    return [row[3] for row in rows]
+
+def problems_in(plan: List[str], scenario: Scenario) -> List[str]:
+    problems = []
+    for detail in plan:
+        words = detail.split()
+        if words[0] == "SCAN" and "USING" not in words and words[1] != "CONSTANT":
+            if words[1] not in scenario.allow_scan:
+                problems.append(f"full table scan of {words[1]}")
+        if detail.startswith("USE TEMP B-TREE") and not scenario.allow_temp_btree:
+            problems.append(detail.lower())
+    return problems
+
+def missing_in(plans: List[List[str]], scenario: Scenario) -> List[str]:
+    details = [detail for plan in plans for detail in plan]
+    return [f"expected plan step '{expected}' not found" for expected in scenario.expect
+            if not any(expected in detail for detail in details)]
+
+def cart(session_id: str) -> CartService:
+    service = CartService()
+    service.session_id = session_id
+    return service
+
+async def stock_log():
+    """Log one checkout's stock and read it back as another worker would"""
+    session = get_session()
+    try:
+        version = bump_catalog_version(session)
+        log_stock_changes(session, version, [StockChange(1, "Mac", 19.0, 2, 1)])
+        session.commit()
+        read_stock_changes(session, version - 1, version)
+    finally:
+        session.close()
+
+def scenarios() -> List[Scenario]:
+    products = ProductService
+    whole_catalog = frozenset({"products"})
+    sample_id = PRODUCTS // 2
+    cart_line = ("USING INDEX ix_cart_items_session_product (session_id=? AND product_id=?)",)
+
+    result = [
+        Scenario("get_storefront_products", lambda: products().get_storefront_products(), whole_catalog),
+        Scenario("get_storefront_products_by_category",
+                 lambda: products().get_storefront_products_by_category("Mac")),
+        Scenario("search_storefront_products", lambda: products().search_storefront_products("Product 12"),
+                 whole_catalog),
+        Scenario("search_storefront_products page",
+                 lambda: products().search_storefront_products("Product 12", limit=20, offset=20), whole_catalog),
+        Scenario("count_storefront_matches", lambda: products().count_storefront_matches("Product 12"),
+                 whole_catalog),
+        Scenario("get_all_products", lambda: products().get_all_products(), whole_catalog),
+        Scenario("get_product_by_id", lambda: products().get_product_by_id(sample_id)),
+        Scenario("get_products_by_category", lambda: products().get_products_by_category("iPad")),
+        Scenario("search_products", lambda: products().search_products("Product 12"), whole_catalog),
+        Scenario("facets.get_facets", lambda: products().facets.get_facets(), whole_catalog),
+        Scenario("create_product", lambda: products().create_product(ProductCreate(
+            name="Plan Check", description="Plan check product", price=10.0, category="Mac", stock=1))),
+        Scenario("update_product", lambda: products().update_product(sample_id, ProductUpdate(stock=3))),
+        Scenario("delete_product", lambda: products().delete_product(sample_id + 1)),
+        Scenario("catalog stock log", stock_log, expect=("USING INDEX ix_catalog_stock_changes_version",)),
+        Scenario("backfill_image_placeholders",
+                 lambda: products().backfill_image_placeholders(time.monotonic() + 30, batch_size=2),
+                 expect=("USING INDEX ix_products_image_url_missing_placeholder",)),
+
+        Scenario("get_cart_items", lambda: cart("plan-1").get_cart_items()),
+        Scenario("get_cart_lines", lambda: cart("plan-1").get_cart_lines()),
+        Scenario("get_cart_summary", lambda: cart("plan-1").get_cart_summary()),
+        Scenario("add_to_cart (existing line)", lambda: cart("plan-2").add_to_cart(1 + (2 * 13) % PRODUCTS),
+                 expect=cart_line),
+        Scenario("add_to_cart (new line)", lambda: cart("plan-2").add_to_cart(sample_id), expect=cart_line),
+        Scenario("update_quantity", lambda: cart("plan-3").update_quantity(1 + (3 * 13) % PRODUCTS, 2),
+                 expect=cart_line),
+        Scenario("remove_from_cart", lambda: cart("plan-4").remove_from_cart(1 + (4 * 13) % PRODUCTS),
+                 expect=cart_line),
+        Scenario("clear_cart", lambda: cart("plan-5").clear_cart()),
+        Scenario("add_items", lambda: cart("plan-6").add_items({1 + (6 * 13) % PRODUCTS: 1, sample_id: 2}),
+                 expect=cart_line),
+        Scenario("set_quantities", lambda: cart("plan-7").set_quantities({1 + (7 * 13) % PRODUCTS: 3, 2: 0}),
+                 expect=cart_line),
+        Scenario("remove_items", lambda: cart("plan-8").remove_items([1 + (8 * 13) % PRODUCTS, 2]),
+                 expect=cart_line),
+    ]
+
+    # Every browse filter/sort combination, first page and a keyset page.
+    # A price range combined with a non-price sort cannot be served by one
+    # index, so the planner may pick the range index and sort the matches.
+    # "featured" across all categories walks the table in id order, which is
+    # the primary key itself, and stops at the page limit.
+    for category in (None, "Mac"):
+        for price_filter in ("none", "min", "range"):
+            for sort in SORT_OPTIONS:
+                for page in ("first", "next"):
+                    prices = {"none": (None, None), "min": (500.0, None), "range": (500.0, 900.0)}[price_filter]
+                    cursor = None
+                    if page == "next":
+                        key_value = {"featured": 10, "price_asc": 500.0, "price_desc": 2000.0,
+                                     "newest": datetime.utcnow() - timedelta(minutes=100),
+                                     "in_stock": True}[sort]
+                        cursor = (key_value, 10)
+                    result.append(Scenario(
+                        f"browse_products(category={category}, price={price_filter}, sort={sort}, page={page})",
+                        lambda c=category, p=prices, s=sort, k=cursor: products().browse_products(
+                            category=c, min_price=p[0], max_price=p[1], sort=s, cursor=k
+                        ),
+                        allow_scan=whole_catalog if sort == "featured" and category is None else frozenset(),
+                        allow_temp_btree=price_filter != "none" and not sort.startswith("price")
+                    ))
+    return result
+
+async def check(verbose: bool) -> List[Finding]:
+    findings = []
+    for scenario in scenarios():
+        with capture() as statements:
+            await scenario.run()
+        plans = []
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            plan = explain(statement, parameters)
+            plans.append(plan)
+            problems = problems_in(plan, scenario)
+            if problems:
+                findings.append(Finding(scenario.name, statement, plan, problems))
+            if verbose:
+                print(f"{scenario.name}:\n  {' '.join(statement.split())}")
+                for detail in plan:
+                    print(f"    {detail}")
+        if not plans:
+            findings.append(Finding(scenario.name, "", [], ["issued no statements to check"]))
+        missing = missing_in(plans, scenario)
+        if missing:
+            findings.append(Finding(scenario.name, "", [], missing))
+    return findings
+
+def main():
+    verbose = "-v" in sys.argv[1:]
+    populate()
+    findings = asyncio.run(check(verbose))
+
+    total = len(scenarios())
+    print(f"Checked {total} service calls against {PRODUCTS} products and {CART_SESSIONS * LINES_PER_CART} cart lines")
+    for finding in findings:
+        print(f"\nFAIL {finding.scenario}: {', '.join(finding.problems)}")
+        if finding.statement:
+            print(f"  {' '.join(finding.statement.split())}")
+        for detail in finding.plan:
+            print(f"    {detail}")
+    if findings:
+        sys.exit(1)
+    print("All query plans use indexes as expected")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
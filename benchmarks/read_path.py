@@ -0,0 +1,75 @@
+"""
+Read-Path Benchmark
+Compares per-row cost of Product.from_orm against lean ProductSummary records
+
+Run: python -m benchmarks.read_path [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+_tmpdir = tempfile.mkdtemp(prefix="apple_store_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import insert
+from models.schemas import Base, Product, ProductDB, ProductSummary
+from core.database import engine, get_session
+from services.product_service import SUMMARY_COLUMNS
+
+def populate(rows: int):
+    """Insert synthetic products"""
+    Base.metadata.create_all(bind=engine)
+    session = get_session()
+    try:
+        session.execute(insert(ProductDB), [
+            {
+                "name": f"Product {i}",
+                "description": f"Description for product {i}",
+                "price": 10.0 + i % 1000,
+                "category": ("iPhone", "iPad", "Mac", "Watch", "AirPods", "Accessories")[i % 6],
+                "stock": i % 50,
+                "image_url": f"https://example.com/{i}.png",
+            }
+            for i in range(rows)
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+def bench(label: str, fn, rows: int, repeat: int = 5):
+    """Run fn repeatedly and print the best per-row time"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:8.2f} ms  {best / rows * 1e6:6.2f} us/row")
+    return best
+
+def full_models():
+    session = get_session()
+    try:
+        return [Product.from_orm(p) for p in session.query(ProductDB).all()]
+    finally:
+        session.close()
+
+def lean_records():
+    session = get_session()
+    try:
+        return [ProductSummary._make(row) for row in session.query(*SUMMARY_COLUMNS).all()]
+    finally:
+        session.close()
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    populate(rows)
+    print(f"Read path over {rows} products")
+    full = bench("ORM entity + Product.from_orm", full_models, rows)
+    lean = bench("Column select + ProductSummary", lean_records, rows)
+    print(f"Speedup: {full / lean:.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Recommendation Rebuild Benchmark
+Times the co-occurrence top-k rebuild on synthetic cart lines
+
+Run: python -m benchmarks.recommendations [lines] [products] [avg_basket]
+     python -m benchmarks.recommendations --verify
+With --verify, synthetic carts and orders are written to a throwaway
+database and the service is refreshed with an already passed deadline
+until it builds; exits non-zero unless each run read one chunk and the
+table matches an unbudgeted rebuild.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_recommendations_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "recommendations.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+
+from sqlalchemy import insert
+
+from core.database import get_session, init_database
+from models.schemas import CartItemDB, OrderDB, OrderItemDB
+from services.recommendation_service import RecommendationService, co_occurrence_top_k
+
+def synthetic_lines(lines: int, products: int, avg_basket: float, seed: int = 7):
+    """Baskets with geometric sizes and Zipf-like product popularity"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.geometric(1 / avg_basket, size=int(lines / avg_basket) + 1)
+    sizes = sizes[np.cumsum(sizes) <= lines]
+    baskets = np.repeat(np.arange(len(sizes)), sizes)
+    popularity = 1 / np.arange(1, products + 1) ** 0.8
+    chosen = rng.choice(products, size=len(baskets), p=popularity / popularity.sum())
+    return baskets, chosen + 1
+
+def write_baskets(lines: int, products: int):
+    """Synthetic baskets as cart lines, every third basket as an order instead"""
+    baskets, product_ids = synthetic_lines(lines, products, 3.0)
+    carts, orders, order_lines = [], [], []
+    for basket, product_id in zip(baskets.tolist(), product_ids.tolist()):
+        if basket % 3:
+            carts.append({'session_id': f'bench-{basket}', 'product_id': product_id, 'quantity': 1})
+        else:
+            if not orders or orders[-1]['id'] != basket + 1:
+                orders.append({'id': basket + 1, 'session_id': f'bench-{basket}', 'subtotal': 0.0, 'tax': 0.0, 'total': 0.0})
+            order_lines.append({'order_id': basket + 1, 'product_id': product_id, 'product_name': '',
+                                'price': 0.0, 'quantity': 1})
+    session = get_session()
+    try:
+        session.execute(insert(CartItemDB), carts)
+        session.execute(insert(OrderDB), orders)
+        session.execute(insert(OrderItemDB), order_lines)
+        session.commit()
+    finally:
+        session.close()
+    return len(carts) + len(order_lines)
+
+async def verify() -> int:
+    init_database()
+    chunk = 1000
+    total = write_baskets(20_000, 500)
+    budgeted = RecommendationService(chunk_size=chunk)
+    failures = 0
+
+    # Every run starts past its deadline, so it may read only one chunk
+    progress, result = [], {}
+    for _ in range(total // chunk + 10):
+        result = await budgeted.refresh(deadline=time.monotonic() - 1)
+        if result['rebuilt']:
+            break
+        progress.append(result['lines'])
+    steps = np.diff([0] + progress)
+    if not result['rebuilt'] or len(progress) < total // chunk:
+        failures += 1
+        print(f"FAIL: rebuilt={result['rebuilt']} after {len(progress)} partial runs over {total} lines")
+    elif steps.min() < 1 or steps.max() > chunk:
+        failures += 1
+        print(f"FAIL: partial runs read {steps.min()} to {steps.max()} lines, expected 1 to {chunk}")
+
+    full = RecommendationService(chunk_size=chunk)
+    await full.refresh()
+    if budgeted._neighbors != full._neighbors or not full._neighbors:
+        failures += 1
+        print(f"FAIL: resumed table ({len(budgeted._neighbors)} products) differs from "
+              f"a full rebuild ({len(full._neighbors)} products)")
+    again = await budgeted.refresh(deadline=time.monotonic() - 1)
+    if again != {'rebuilt': False}:
+        failures += 1
+        print(f"FAIL: unchanged baskets refreshed again: {again}")
+
+    print(f"{'FAILED' if failures else 'Past-deadline refreshes resume and match a full rebuild'}; "
+          f"{len(progress)} partial runs over {total} lines, {budgeted.stats}")
+    return 1 if failures else 0
+
+def main():
+    if "--verify" in sys.argv:
+        sys.exit(asyncio.run(verify()))
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    avg_basket = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+
+    baskets, product_ids = synthetic_lines(lines, products, avg_basket)
+    print(f"{len(baskets)} lines in {baskets[-1] + 1} baskets over {products} products")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    neighbors = co_occurrence_top_k(baskets, product_ids, top_k=8, min_count=2)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    served = sum(len(related) for related in neighbors.values())
+    print(f"rebuild: {elapsed:.2f}s ({len(baskets) / elapsed / 1e6:.2f}M lines/s), "
+          f"peak {peak / 1e6:.0f} MB")
+    print(f"table: {len(neighbors)} products, {served} neighbours")
+
+    sample = list(neighbors)[:10000]
+    start = time.perf_counter()
+    for product_id in sample:
+        neighbors.get(product_id, ())
+    print(f"lookup: {(time.perf_counter() - start) / max(len(sample), 1) * 1e9:.0f} ns")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Read-Replica Routing Check
+Runs ProductService against a primary SQLite file and a replica copy, and
+checks that reads follow replica lag and read-your-writes
+
+Run: python -m benchmarks.replica_routing [--read-only]
+
+With --read-only the "replica" is a second, read-only connection to the
+primary file instead of a copy, so it never lags.
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Point the app at throwaway databases before anything imports the engine
+_tmpdir = tempfile.mkdtemp(prefix="apple_store_replicas_")
+PRIMARY = os.path.join(_tmpdir, "primary.db")
+REPLICA = os.path.join(_tmpdir, "replica.db")
+READ_ONLY = "--read-only" in sys.argv
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["READ_REPLICA_URLS"] = (
+    f"sqlite:///file:{PRIMARY}?mode=ro&uri=true" if READ_ONLY else f"sqlite:///{REPLICA}"
+)
+
+from core.database import engine, init_database
+from core.catalog_sync import catalog_sync
+from core.replicas import replica_router
+from models.schemas import ProductCreate
+from services.product_service import ProductService
+
+def replicate():
+    """Copy the primary into the replica file (stands in for replication)"""
+    if READ_ONLY:
+        return
+    source = sqlite3.connect(PRIMARY)
+    target = sqlite3.connect(REPLICA)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    # Drop the replica's shared connection so it sees the new file contents
+    replica_router.replicas[0].engine.dispose()
+
+def reads() -> tuple:
+    return replica_router.replicas[0].reads, replica_router.fallbacks
+
+async def run() -> int:
+    failures = []
+
+    def expect(label: str, condition: bool):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}")
+        if not condition:
+            failures.append(label)
+
+    init_database()
+    replicate()
+    service = ProductService()
+    catalog_sync.check()
+    replica_router.check()
+
+    before = reads()
+    await service.get_products_by_category("iPhone")
+    expect("caught-up replica serves reads", reads()[0] == before[0] + 1)
+
+    created = await service.create_product(ProductCreate(
+        name="Replica Check", description="Routing check product", price=1.0, category="Accessories", stock=1
+    ))
+    replica_router.check()
+    before = reads()
+    found = await service.get_product_by_id(created.id)
+    expect("read after own write sees the new product", found is not None)
+    if READ_ONLY:
+        expect("read-only connection is never behind", reads()[0] == before[0] + 1)
+    else:
+        expect("lagging replica falls back to the primary", reads()[1] == before[1] + 1)
+
+        replicate()
+        replica_router.check()
+        before = reads()
+        await service.search_products("Replica")
+        expect("replica serves reads again once caught up", reads()[0] == before[0] + 1)
+
+    replica_router.max_lag = 5
+    replica_router.written_version = 0
+    replica_router.replicas[0].version = catalog_sync.version - 1
+    before = reads()
+    await service.get_products_by_category("Mac")
+    expect("lag within REPLICA_MAX_LAG is tolerated", reads()[0] == before[0] + 1)
+    await service.get_all_products()
+    expect("cached reads require a caught-up replica", reads()[1] == before[1] + 1)
+
+    replica_router.replicas[0].version = None
+    before = reads()
+    await service.get_products_by_category("Mac")
+    expect("unavailable replica falls back to the primary", reads()[1] == before[1] + 1)
+
+    print(replica_router.stats())
+    engine.dispose()
+    return 1 if failures else 0
+
+def main():
+    sys.exit(asyncio.run(run()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Tracing Overhead Benchmark
+Times a storefront add-to-cart action with tracing disabled, enabled but
+sampled out, and recording every action; prints one recorded span tree and
+checks the exported trace file loads
+
+Run: python -m benchmarks.tracing [actions]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = [
+    ("disabled", {"TRACING_ENABLED": "false"}),
+    ("enabled, sampled out", {"TRACING_ENABLED": "true", "TRACING_SAMPLE_RATE": "0"}),
+    ("enabled, every action", {"TRACING_ENABLED": "true", "TRACING_SAMPLE_RATE": "1"}),
+]
+
+def worker(actions: int):
+    from core.database import init_database
+    from core.tracing import format_tree, traced_action, tracer
+    from core.unit_of_work import unit_of_work
+    from services.cart_service import CartService
+    from services.product_service import ProductService
+
+    init_database()
+    products = ProductService()
+    cart = CartService()
+
+    class Handlers:
+        """The calls AppleStore.add_to_cart makes, as a decorated UI callback"""
+
+        @traced_action
+        @unit_of_work
+        async def add_to_cart(self, product_id: int):
+            product = await products.get_product_by_id(product_id)
+            await cart.add_to_cart(product.id, 1)
+            await cart.get_cart_lines()
+            await cart.get_cart_items()
+
+    handlers = Handlers()
+
+    async def run():
+        for i in range(20):
+            await handlers.add_to_cart(i % 8 + 1)
+        start = time.perf_counter()
+        for i in range(actions):
+            await handlers.add_to_cart(i % 8 + 1)
+        return (time.perf_counter() - start) / actions
+
+    async def sample_tree() -> str:
+        with tracer.action("sample") as root:
+            await handlers.add_to_cart(1)
+        return format_tree(root) if root is not None else ""
+
+    per_action = asyncio.run(run())
+    stats = tracer.stats()
+    print(json.dumps({"us": per_action * 1e6, "stats": stats, "tree": asyncio.run(sample_tree())}))
+
+def main():
+    if sys.argv[1:2] == ["--worker"]:
+        worker(int(sys.argv[2]))
+        return
+    actions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmpdir = tempfile.mkdtemp(prefix="apple_store_tracing_")
+    baseline = None
+    for label, env in MODES:
+        environment = dict(os.environ, DATABASE_URL=f"sqlite:///{tmpdir}/{len(label)}.db",
+                           TRACING_EXPORT_DIR=os.path.join(tmpdir, "traces"), TRACING_SLOW_MS="1000000",
+                           CART_RATE_PER_SECOND="1000000", CART_RATE_BURST="1000000", **env)
+        output = subprocess.run([sys.executable, "-m", "benchmarks.tracing", "--worker", str(actions)],
+                                env=environment, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result["us"]
+        print(f"{label:>22}: {result['us']:8.1f} us per action ({result['us'] / baseline - 1:+.1%}), "
+              f"recorded {result['stats']['recorded']}")
+        tree = result["tree"]
+    print(f"span tree of one action:\n{tree}")
+
+    traces = os.path.join(tmpdir, "traces")
+    for name in os.listdir(traces):
+        with open(os.path.join(traces, name)) as trace:
+            events = json.loads(trace.read().rstrip().rstrip(",") + "]")
+        print(f"{name}: {len(events)} trace events, {sum(e['cat'] == 'sql' for e in events if 'cat' in e)} SQL spans")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
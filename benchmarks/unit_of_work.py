@@ -0,0 +1,122 @@
+"""
+Unit of Work Benchmark
+Counts transactions, sessions and queries for typical cart events with
+and without a per-event unit of work, and times them
+
+Run: python -m benchmarks.unit_of_work [events]
+     python -m benchmarks.unit_of_work --verify
+With --verify, a unit writes to the cart, reads the storefront through a
+separate session inside the unit, commits, and the cart row must persist;
+exits non-zero otherwise.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything imports the engine
+if "APPLE_STORE_BENCH_DB" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="apple_store_uow_")
+    os.environ["APPLE_STORE_BENCH_DB"] = os.path.join(_tmpdir, "uow.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['APPLE_STORE_BENCH_DB']}"
+# The benchmark is not throttled by cart admission
+os.environ.setdefault("CART_RATE_PER_SECOND", "1000000")
+os.environ.setdefault("CART_RATE_BURST", "1000000")
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from core.database import init_database, get_session
+from core.unit_of_work import unit_of_work_scope, unit_of_work_stats
+from models.schemas import CartItemDB, ProductUpdate
+from services.cart_service import CartService
+from services.product_service import ProductService
+
+class Counter:
+    """Transactions begun and statements executed"""
+
+    def __init__(self):
+        self.queries = 0
+        self.transactions = 0
+        event.listen(Engine, "before_cursor_execute", self._query)
+        event.listen(Session, "after_begin", self._session)
+
+    def _query(self, *args):
+        self.queries += 1
+
+    def _session(self, session, transaction, connection):
+        self.transactions += 1
+
+async def add_to_cart_event(cart: CartService, product_id: int):
+    """What AppleStore.add_to_cart does on one click"""
+    await cart.add_to_cart(product_id, 1)
+    await cart.get_cart_lines()
+    await cart.get_cart_items()
+
+async def update_quantity_event(cart: CartService, product_id: int):
+    """What CartSidebar.update_quantity does, plus the cart reload"""
+    await cart.update_quantity(product_id, 2)
+    await cart.get_cart_items()
+
+EVENTS = [("add_to_cart", add_to_cart_event), ("update_quantity", update_quantity_event)]
+
+async def run(events: int):
+    init_database()
+    counter = Counter()
+
+    for label, handler in EVENTS:
+        cart = CartService()
+        counter.queries, counter.transactions = 0, 0
+        start = time.perf_counter()
+        for i in range(events):
+            await handler(cart, i % 8 + 1)
+        plain_ms = (time.perf_counter() - start) * 1000 / events
+        plain = (counter.transactions / events, counter.queries / events)
+
+        cart = CartService()
+        counter.queries, counter.transactions = 0, 0
+        sessions = unit_of_work_stats.sessions
+        start = time.perf_counter()
+        for i in range(events):
+            async with unit_of_work_scope(label):
+                await handler(cart, i % 8 + 1)
+        unit_ms = (time.perf_counter() - start) * 1000 / events
+        scoped = (counter.transactions / events, counter.queries / events)
+        sessions = (unit_of_work_stats.sessions - sessions) / events
+
+        print(f"{label}: per event")
+        print(f"  separate sessions: {plain[0]:.1f} transactions, {plain[1]:.1f} queries, {plain_ms:.2f} ms")
+        print(f"  unit of work:      {scoped[0]:.1f} transactions, {scoped[1]:.1f} queries, {unit_ms:.2f} ms"
+              f" ({sessions:.1f} sessions)")
+
+async def verify() -> int:
+    init_database()
+    products = ProductService()
+    cart = CartService()
+    # Leaves the storefront cache stale, so the read below queries
+    await products.update_product(1, ProductUpdate(stock=40))
+    async with unit_of_work_scope("verify") as unit:
+        await cart.add_to_cart(1, 1)
+        await products.get_storefront_products_by_ids([1])
+    session = get_session()
+    try:
+        rows = session.query(CartItemDB).filter(CartItemDB.session_id == cart.session_id).count()
+    finally:
+        session.close()
+    summary = unit.summary()
+    if rows != 1:
+        print(f"FAILED: {rows} cart rows after the unit committed; {summary}")
+        return 1
+    print(f"Unit writes persist across other sessions; {summary}")
+    return 0
+
+def main():
+    if "--verify" in sys.argv:
+        sys.exit(asyncio.run(verify()))
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asyncio.run(run(events))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Admission Control for Write Paths"""
+
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """A request was shed instead of queued"""
+
+    def __init__(self, reason: str, message: str):
+        self.reason = reason
+        super().__init__(message)
+
+class TokenBucket:
+    """Classic token bucket refilled lazily on each take"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class AdmissionController:
+    """Per-session rate limiting plus a global cap on in-flight writes
+
+    Requests over a session's token bucket, over the in-flight cap, or
+    arriving while the event loop is lagging are rejected immediately, so
+    overload turns into shed requests rather than a queue that raises
+    latency for everyone.
+    """
+
+    def __init__(self, rate: float, burst: int, max_inflight: int,
+                 max_loop_lag: float, max_sessions: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.max_loop_lag = max_loop_lag
+        self.max_sessions = max_sessions
+        self.inflight = 0
+        self.loop_lag = 0.0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lag_task = None
+        self.counters: Dict[str, int] = {
+            'admitted': 0,
+            'rejected_rate_limited': 0,
+            'rejected_overloaded': 0,
+            'rejected_loop_lag': 0,
+        }
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_sessions:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _reject(self, reason: str, message: str):
+        self.counters[f'rejected_{reason}'] += 1
+        raise AdmissionRejected(reason, message)
+
+    @asynccontextmanager
+    async def admit(self, key: str):
+        """Admit one write for ``key`` or raise AdmissionRejected"""
+        if self.loop_lag > self.max_loop_lag:
+            self._reject('loop_lag', 'The store is busy right now, please try again in a moment')
+        if self.inflight >= self.max_inflight:
+            self._reject('overloaded', 'The store is busy right now, please try again in a moment')
+        if not self._bucket(key).take(time.monotonic()):
+            self._reject('rate_limited', 'Slow down a little, please try again in a moment')
+
+        self.counters['admitted'] += 1
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+
+    async def _monitor_loop_lag(self, interval: float):
+        """Measure how late the event loop wakes us up"""
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, time.monotonic() - start - interval)
+
+    def start(self, interval: float = 0.1):
+        """Start event loop lag monitoring on the running loop"""
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._monitor_loop_lag(interval))
+
+    def stop(self):
+        """Stop event loop lag monitoring"""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    def stats(self) -> Dict[str, float]:
+        """Counters and current load"""
+        return {
+            **self.counters,
+            'inflight': self.inflight,
+            'loop_lag_ms': round(self.loop_lag * 1000, 1),
+            'tracked_sessions': len(self._buckets),
+        }
+
+cart_admission = AdmissionController(
+    rate=settings.CART_RATE_PER_SECOND,
+    burst=settings.CART_RATE_BURST,
+    max_inflight=settings.MAX_INFLIGHT_WRITES,
+    max_loop_lag=settings.ADMISSION_MAX_LOOP_LAG_MS / 1000,
+    max_sessions=settings.ADMISSION_MAX_SESSIONS
+)
+
+def admission_controlled(method):
+    """Run a service write method under cart_admission, one bucket per shopper
+
+    UI callers pass their browser client's id as ``admission_key``; the
+    service object may be shared by every client of a worker, so
+    self.session_id is only the fallback for scripts and benchmarks.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, admission_key: Optional[str] = None, **kwargs):
+        async with cart_admission.admit(admission_key or self.session_id):
+            return await method(self, *args, **kwargs)
+    return wrapper
\ No newline at end of file
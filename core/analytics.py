@@ -0,0 +1,252 @@
+"""Buffered Storefront Analytics Events
+
+UI handlers record product views and cart actions with `analytics.track()`,
+which only appends to a bounded in-memory ring buffer and never touches the
+database. A background task drains the buffer in batches and appends each
+batch, from a worker thread, with one executemany to the `analytics_events`
+table, or to rotated JSONL files. When the buffer is full the oldest event is overwritten and
+counted as dropped, so a slow sink can never grow memory or block a click.
+Stopping the pipeline flushes whatever is still buffered.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.config import settings
+from core.database import get_session
+from models.schemas import AnalyticsEvent, AnalyticsEventDB
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_VIEW = "product_view"
+ADD_TO_CART = "add_to_cart"
+REMOVE_FROM_CART = "remove_from_cart"
+
+class DatabaseEventSink:
+    """Appends batches to the analytics_events table"""
+
+    name = "database"
+
+    def write(self, events: List[AnalyticsEvent]):
+        session = get_session()
+        try:
+            session.execute(insert(AnalyticsEventDB), [event._asdict() for event in events])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error writing {len(events)} analytics events: {e}")
+            raise
+        finally:
+            session.close()
+
+    def close(self):
+        pass
+
+class JsonlEventSink:
+    """Appends batches to JSONL files, starting a new file past rotate_bytes
+
+    Each process writes its own files, named by start time and pid.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, directory: str, rotate_bytes: int):
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.path: Optional[str] = None
+        self._file = None
+        self.rotations = 0
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        self.path = os.path.join(self.directory, f"events-{stamp}-{os.getpid()}.jsonl")
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.rotations += 1
+
+    def write(self, events: List[AnalyticsEvent]):
+        if self._file is None or self._file.tell() >= self.rotate_bytes:
+            self.close()
+            self._open()
+        lines = "".join(
+            json.dumps({**event._asdict(), "created_at": event.created_at.isoformat()}, separators=(",", ":")) + "\n"
+            for event in events
+        )
+        self._file.write(lines)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class AnalyticsPipeline:
+    """Bounded event buffer with batched background flushing"""
+
+    def __init__(self, sink, capacity: int = 100000, batch_size: int = 1000, enabled: bool = True):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self._buffer: deque = deque(maxlen=capacity)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task = None
+        # Serialises sink writes: a batch handed to a worker thread keeps
+        # writing after the flusher is cancelled, and the shutdown flush waits for it
+        self._write_lock = threading.Lock()
+        self.tracked = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.dropped_by_kind: Dict[str, int] = {}
+        self.write_errors = 0
+        self.high_water = 0
+        self.last_flush_ms = 0.0
+
+    def track(self, kind: str, product_id: int, session_id: str, quantity: int = 1, source: Optional[str] = None):
+        """Record an event without waiting; overwrites the oldest one when full"""
+        if not self.enabled:
+            return
+        if len(self._buffer) == self.capacity:
+            oldest = self._buffer[0]
+            self.dropped += 1
+            self.dropped_by_kind[oldest.kind] = self.dropped_by_kind.get(oldest.kind, 0) + 1
+        self._buffer.append(AnalyticsEvent(kind, product_id, session_id, quantity, source, datetime.utcnow()))
+        self.tracked += 1
+        if len(self._buffer) > self.high_water:
+            self.high_water = len(self._buffer)
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _write(self, batch: List[AnalyticsEvent]):
+        with self._write_lock:
+            self.sink.write(batch)
+
+    def _requeue(self, batch: List[AnalyticsEvent], error: Exception) -> int:
+        """Put a failed batch back at the front of the buffer, as far as it still fits"""
+        self.write_errors += 1
+        room = self.capacity - len(self._buffer)
+        lost = batch[:max(0, len(batch) - room)]
+        for event in lost:
+            self.dropped += 1
+            self.dropped_by_kind[event.kind] = self.dropped_by_kind.get(event.kind, 0) + 1
+        self._buffer.extendleft(reversed(batch[len(lost):]))
+        logger.warning(f"Analytics batch of {len(batch)} events requeued ({len(lost)} dropped): {error}")
+        return 0
+
+    def _written(self, batch: List[AnalyticsEvent], start: float) -> int:
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.written += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def flush(self) -> int:
+        """Write up to one batch from the buffer; returns events written
+
+        A failed batch goes back to the front of the buffer, as far as it
+        still fits, for the next flush.
+        """
+        count = min(self.batch_size, len(self._buffer))
+        if not count:
+            return 0
+        batch = [self._buffer.popleft() for _ in range(count)]
+        start = time.perf_counter()
+        try:
+            self._write(batch)
+        except Exception as e:
+            return self._requeue(batch, e)
+        return self._written(batch, start)
+
+    async def flush_in_thread(self) -> int:
+        """Like flush(), with the sink write off the event loop"""
+        count = min(self.batch_size, len(self._buffer))
+        if not count:
+            return 0
+        batch = [self._buffer.popleft() for _ in range(count)]
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            return self._requeue(batch, e)
+        return self._written(batch, start)
+
+    def flush_all(self) -> int:
+        """Flush until the buffer is empty or a write fails"""
+        written = 0
+        while self._buffer:
+            flushed = self.flush()
+            if not flushed:
+                break
+            written += flushed
+        return written
+
+    async def run(self, interval: float):
+        """Flush every interval, or as soon as a full batch is buffered"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # One batch per wakeup: a backlog drains without holding the event loop
+            await self.flush_in_thread()
+            if len(self._buffer) >= self.batch_size:
+                self._wakeup.set()
+                await asyncio.sleep(0)
+
+    def start(self, interval: float):
+        """Start the background flusher on the running event loop"""
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run(interval))
+
+    def stop(self):
+        """Stop the background flusher and write out everything still buffered
+
+        Runs synchronously at shutdown, after a batch already in a worker
+        thread has been written.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._wakeup = None
+        written = self.flush_all()
+        self.sink.close()
+        if written or self._buffer:
+            logger.info(f"Analytics flushed {written} events on shutdown, {len(self._buffer)} left unwritten")
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'sink': self.sink.name,
+            'buffered': len(self._buffer),
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'tracked': self.tracked,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'dropped_by_kind': dict(self.dropped_by_kind),
+            'write_errors': self.write_errors,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+        }
+
+_sink = (
+    JsonlEventSink(settings.ANALYTICS_DIR, settings.ANALYTICS_ROTATE_MB * 1024 * 1024)
+    if settings.ANALYTICS_SINK == "jsonl" else DatabaseEventSink()
+)
+analytics = AnalyticsPipeline(
+    _sink,
+    capacity=settings.ANALYTICS_BUFFER_SIZE,
+    batch_size=settings.ANALYTICS_BATCH_SIZE,
+    enabled=settings.ANALYTICS_ENABLED,
+)
\ No newline at end of file
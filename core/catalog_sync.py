@@ -0,0 +1,148 @@
+"""Cross-Process Catalog Change Propagation"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.orm import Session
+from models.schemas import CatalogStockChangeDB, CatalogVersionDB, StockChange
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_ID = 1
+# Stock changes are kept for this many versions; a worker further behind
+# than that rebuilds its caches instead of patching them
+STOCK_LOG_VERSIONS = 1000
+
+def ensure_catalog_version(session: Session):
+    """Create the single catalog version row if it does not exist yet"""
+    if session.get(CatalogVersionDB, CATALOG_VERSION_ID) is None:
+        session.add(CatalogVersionDB(id=CATALOG_VERSION_ID, version=0))
+        session.commit()
+
+def bump_catalog_version(session: Session) -> int:
+    """Increment the catalog version inside the caller's transaction"""
+    session.execute(
+        text("UPDATE catalog_version SET version = version + 1 WHERE id = :id"),
+        {"id": CATALOG_VERSION_ID}
+    )
+    return read_catalog_version(session)
+
+def log_stock_changes(session: Session, version: int, changes: List[StockChange]):
+    """Record the stock set by a version inside the caller's transaction"""
+    if changes:
+        session.execute(insert(CatalogStockChangeDB),
+                        [dict(change._asdict(), version=version) for change in changes])
+    session.execute(delete(CatalogStockChangeDB).where(CatalogStockChangeDB.version <= version - STOCK_LOG_VERSIONS))
+
+def read_stock_changes(session: Session, after: int, upto: int) -> Optional[Dict[int, List[StockChange]]]:
+    """Stock changes of every version in (after, upto]; None unless all of them are stock-only"""
+    if upto - after > STOCK_LOG_VERSIONS:
+        return None
+    rows = session.query(
+        CatalogStockChangeDB.version, CatalogStockChangeDB.product_id, CatalogStockChangeDB.category,
+        CatalogStockChangeDB.price, CatalogStockChangeDB.old_stock, CatalogStockChangeDB.new_stock
+    ).filter(
+        CatalogStockChangeDB.version > after, CatalogStockChangeDB.version <= upto
+    ).order_by(CatalogStockChangeDB.version, CatalogStockChangeDB.id).all()
+    changes: Dict[int, List[StockChange]] = {}
+    for row in rows:
+        changes.setdefault(row.version, []).append(StockChange(*row[1:]))
+    return changes if len(changes) == upto - after else None
+
+def read_catalog_version(session: Session) -> int:
+    """Read the current catalog version"""
+    version = session.execute(
+        text("SELECT version FROM catalog_version WHERE id = :id"),
+        {"id": CATALOG_VERSION_ID}
+    ).scalar()
+    return version or 0
+
+class CatalogSync:
+    """Keeps per-process catalog state coherent across worker processes
+
+    Every `ProductService` write bumps the version row in the same transaction
+    as the change. The writing process notifies its listeners immediately;
+    other workers pick the change up by polling the version row. Checkout
+    only moves stock and also logs the new levels, so when every version a
+    worker missed is such a change, its stock listeners patch the caches
+    before the version listeners run, and nothing has to be rebuilt.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._listeners: List[Callable[[int], None]] = []
+        self._stock_listeners: List[Callable[[int, List[StockChange]], None]] = []
+        self._task = None
+        self.stock_patches = 0
+
+    def subscribe(self, listener: Callable[[int], None]):
+        """Register a callback invoked with the new version on catalog changes"""
+        self._listeners.append(listener)
+
+    def subscribe_stock(self, listener: Callable[[int, List[StockChange]], None]):
+        """Register a callback invoked with another worker's logged stock changes"""
+        self._stock_listeners.append(listener)
+
+    def mark_changed(self, version: int):
+        """Record a new catalog version and notify listeners if it moved"""
+        if version == self.version:
+            return
+        self.version = version
+        for listener in self._listeners:
+            try:
+                listener(version)
+            except Exception as e:
+                logger.error(f"Error in catalog change listener: {e}")
+
+    def check(self) -> bool:
+        """Poll the version row once; returns True if the catalog changed"""
+        from core.database import get_session
+
+        session = get_session()
+        try:
+            version = read_catalog_version(session)
+            stock = None
+            if version > self.version and self._stock_listeners:
+                stock = read_stock_changes(session, self.version, version)
+        finally:
+            session.close()
+
+        if version == self.version:
+            return False
+        if stock is None:
+            self.mark_changed(version)
+            return True
+        for step in range(self.version + 1, version + 1):
+            for listener in self._stock_listeners:
+                try:
+                    listener(step, stock[step])
+                except Exception as e:
+                    logger.error(f"Error in catalog stock listener: {e}")
+            self.stock_patches += 1
+            self.mark_changed(step)
+        return True
+
+    async def run(self, interval: float):
+        """Poll for changes made by other worker processes"""
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error polling catalog version: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float):
+        """Start the background poller on the running event loop"""
+        if self._task is None:
+            self.check()
+            self._task = asyncio.create_task(self.run(interval))
+
+    def stop(self):
+        """Stop the background poller"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+catalog_sync = CatalogSync()
\ No newline at end of file
@@ -1,24 +1,56 @@
 """Database Configuration and Connection"""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex
 from models.schemas import Base
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Create engine
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        settings.DATABASE_URL,
+def create_database_engine(url: str, read_only: bool = False):
+    """Create an engine; read-only engines are used for replica reads"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=settings.DEBUG)
+
+    # An in-memory database lives in its one connection. A file database gets
+    # a real pool: sessions must not share a connection, or closing one
+    # resets it and rolls back a unit of work's flushed writes.
+    pool_options = {"poolclass": StaticPool} if ":memory:" in url or url in ("sqlite://", "sqlite:///") else {}
+    database_engine = create_engine(
+        url,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=settings.DEBUG
+        echo=settings.DEBUG,
+        **pool_options
     )
-else:
-    engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+
+    @event.listens_for(database_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Allow several worker processes to share the SQLite file"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            # Replicas are never written through this process
+            cursor.execute("PRAGMA query_only=ON")
+        else:
+            # Pooled connections open while another one may hold the write lock,
+            # so persistent settings are only written when they would change
+            # Lets maintenance free pages in small steps; only possible on a new database
+            if cursor.execute("PRAGMA page_count").fetchone()[0] == 0:
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            if ":memory:" not in url:
+                if cursor.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                # WAL stays consistent with NORMAL and skips an fsync per commit
+                cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return database_engine
+
+# Create engine
+engine = create_database_engine(settings.DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -27,8 +59,30 @@ def init_database():
     """Initialize database tables"""
     try:
         Base.metadata.create_all(bind=engine)
+        
+        # create_all skips columns and indexes on tables that already exist;
+        # columns added later are nullable, so they can be added in place
+        with engine.begin() as connection:
+            inspector = inspect(connection)
+            for table in Base.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=connection.dialect)
+                        connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+                        logger.info(f"Added column {table.name}.{column.name}")
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
         logger.info("Database initialized successfully")
         
+        # Seed the catalog change-version row shared by all workers
+        from core.catalog_sync import ensure_catalog_version
+        session = SessionLocal()
+        try:
+            ensure_catalog_version(session)
+        finally:
+            session.close()
+        
         # Add sample data if tables are empty
         add_sample_data()
         
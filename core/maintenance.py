@@ -0,0 +1,83 @@
+"""Database Upkeep Jobs
+
+Each job takes a deadline (``time.monotonic()`` based) and works in bounded
+steps so it never holds the database for longer than its budget.
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import select
+
+from models.schemas import CartItemDB
+from core.database import engine, get_session
+
+logger = logging.getLogger(__name__)
+
+def _is_sqlite() -> bool:
+    return engine.dialect.name == "sqlite"
+
+def optimize(deadline: float) -> Dict:
+    """Refresh planner statistics with a bounded ANALYZE via PRAGMA optimize"""
+    if not _is_sqlite():
+        return {"skipped": "not sqlite"}
+    with engine.connect() as connection:
+        # analysis_limit makes ANALYZE sample each index instead of scanning it
+        connection.exec_driver_sql("PRAGMA analysis_limit=400")
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.commit()
+    return {"optimized": True}
+
+def wal_checkpoint(deadline: float) -> Dict:
+    """Copy WAL frames into the database without waiting on readers or writers"""
+    if not _is_sqlite():
+        return {"skipped": "not sqlite"}
+    with engine.connect() as connection:
+        busy, log_frames, checkpointed = connection.exec_driver_sql(
+            "PRAGMA wal_checkpoint(PASSIVE)"
+        ).one()
+        connection.commit()
+    return {"busy": busy, "log_frames": log_frames, "checkpointed": checkpointed}
+
+def incremental_vacuum(deadline: float, pages_per_step: int = 256) -> Dict:
+    """Return free pages to the filesystem a few at a time"""
+    if not _is_sqlite():
+        return {"skipped": "not sqlite"}
+    freed = 0
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            # Databases created before auto_vacuum=INCREMENTAL need one full VACUUM
+            return {"skipped": "auto_vacuum is not INCREMENTAL"}
+        while time.monotonic() < deadline:
+            free = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if not free:
+                break
+            step = min(free, pages_per_step)
+            connection.exec_driver_sql(f"PRAGMA incremental_vacuum({step})").fetchall()
+            connection.commit()
+            freed += step
+    return {"freed_pages": freed}
+
+def purge_expired_carts(deadline: float, ttl_days: int, batch_size: int) -> Dict:
+    """Delete abandoned cart lines older than ttl_days in bounded batches"""
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    purged = 0
+    while time.monotonic() < deadline:
+        session = get_session()
+        try:
+            batch = select(CartItemDB.id).where(CartItemDB.created_at < cutoff).limit(batch_size)
+            deleted = session.query(CartItemDB).filter(
+                CartItemDB.id.in_(batch)
+            ).delete(synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        purged += deleted
+        if deleted < batch_size:
+            break
+    return {"purged": purged}
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""Read-Replica Routing for Catalog Reads
+
+Catalog reads can be served by read-only replica databases. Replication lag
+is measured in catalog versions: every `ProductService` write bumps the
+version row in the same transaction, so a replica whose version row has
+caught up with the version this process expects has every catalog change
+that version implies. A replica is only used while it is within
+``max_lag`` versions of the primary and has every write made by this
+process; otherwise reads fall back to the primary.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.database import create_database_engine, get_session
+from core.catalog_sync import catalog_sync, read_catalog_version
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    """One read-only database and its last observed catalog version"""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_database_engine(url, read_only=True)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.version: Optional[int] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+
+    def check(self):
+        """Read the replica's catalog version; a failing replica is taken out of rotation"""
+        session = self.sessions()
+        try:
+            self.version = read_catalog_version(session)
+            if self.error is not None:
+                logger.info(f"Read replica {self.name} is back")
+            self.error = None
+        except Exception as e:
+            if self.error is None:
+                logger.warning(f"Read replica {self.name} is unavailable: {e}")
+            self.version = None
+            self.error = str(e)
+        finally:
+            session.close()
+            self.checked_at = time.time()
+
+class ReplicaRouter:
+    """Chooses a replica or the primary for each catalog read session"""
+
+    def __init__(self, urls: List[str], max_lag: int = 0):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.written_version = 0
+        self.fallbacks = 0
+        self._rotation = itertools.cycle(self.replicas)
+        self._task = None
+
+    def record_write(self, version: int):
+        """Remember a catalog version written by this process (read-your-writes)"""
+        self.written_version = max(self.written_version, version)
+
+    def required_version(self, max_lag: Optional[int] = None) -> int:
+        """Lowest replica catalog version allowed to serve a read right now"""
+        max_lag = self.max_lag if max_lag is None else max_lag
+        return max(catalog_sync.version - max_lag, self.written_version)
+
+    def read_session(self, max_lag: Optional[int] = None) -> Session:
+        """Session on the next replica that is fresh enough, else on the primary
+
+        Pass ``max_lag=0`` for reads whose results are cached until the next
+        catalog change, so a lagging replica cannot pin stale data.
+        """
+        if not self.replicas:
+            return get_session()
+
+        required = self.required_version(max_lag)
+        for _ in range(len(self.replicas)):
+            replica = next(self._rotation)
+            if replica.version is not None and replica.version >= required:
+                replica.reads += 1
+                return replica.sessions()
+
+        self.fallbacks += 1
+        return get_session()
+
+    def check(self):
+        """Refresh every replica's catalog version"""
+        for replica in self.replicas:
+            replica.check()
+
+    async def run(self, interval: float):
+        """Poll replica versions"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking read replicas: {e}")
+
+    def start(self, interval: float):
+        """Start polling replica versions on the running event loop"""
+        if self.replicas and self._task is None:
+            self.check()
+            self._task = asyncio.create_task(self.run(interval))
+
+    def stop(self):
+        """Stop polling replica versions"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        """Replica versions, lag and read counts"""
+        return {
+            'primary_version': catalog_sync.version,
+            'written_version': self.written_version,
+            'max_lag': self.max_lag,
+            'fallbacks': self.fallbacks,
+            'replicas': [
+                {
+                    'name': replica.name,
+                    'version': replica.version,
+                    'lag': None if replica.version is None else max(0, catalog_sync.version - replica.version),
+                    'checked_at': replica.checked_at,
+                    'error': replica.error,
+                    'reads': replica.reads,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+replica_router = ReplicaRouter(settings.READ_REPLICA_URLS, settings.REPLICA_MAX_LAG)
\ No newline at end of file
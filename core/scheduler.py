@@ -0,0 +1,191 @@
+"""In-Process Maintenance Scheduler"""
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from models.schemas import MaintenanceLeaseDB
+from core.database import get_session
+
+logger = logging.getLogger(__name__)
+
+# A job receives its deadline (time.monotonic() based) and returns a result
+# summary; it must stop doing work once the deadline has passed.
+JobFunc = Callable[[float], Any]
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+def acquire_lease(name: str, seconds: float) -> bool:
+    """Take or extend the cross-process lease for a job
+
+    The lease is kept after a successful run, so across all worker processes
+    a job runs at most once per lease period.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+    session = get_session()
+    try:
+        result = session.execute(
+            update(MaintenanceLeaseDB)
+            .where(
+                MaintenanceLeaseDB.name == name,
+                (MaintenanceLeaseDB.expires_at < now) | (MaintenanceLeaseDB.owner == OWNER)
+            )
+            .values(owner=OWNER, expires_at=expires_at)
+        )
+        if result.rowcount == 0:
+            session.add(MaintenanceLeaseDB(name=name, owner=OWNER, expires_at=expires_at))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+        return False
+    finally:
+        session.close()
+
+def release_lease(name: str):
+    """Give a lease back early so another process may retry"""
+    session = get_session()
+    try:
+        session.execute(
+            update(MaintenanceLeaseDB)
+            .where(MaintenanceLeaseDB.name == name, MaintenanceLeaseDB.owner == OWNER)
+            .values(expires_at=datetime.utcnow())
+        )
+        session.commit()
+    finally:
+        session.close()
+
+class MaintenanceJob:
+    """A periodic job with its own interval and time budget
+
+    Exclusive jobs (database upkeep) run in one worker process per interval;
+    the others maintain per-process state and run in every worker.
+    """
+
+    def __init__(self, name: str, func: JobFunc, interval: float, budget: float, exclusive: bool = True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.budget = budget
+        self.exclusive = exclusive
+        self.running = False
+        self.next_run = 0.0
+        self.metrics: Dict[str, Any] = {
+            'runs': 0,
+            'failures': 0,
+            'skipped_locked': 0,
+            'deferred_busy': 0,
+            'over_budget': 0,
+            'last_duration_ms': None,
+            'last_run_at': None,
+            'last_result': None,
+            'last_error': None,
+        }
+
+class MaintenanceScheduler:
+    """Runs maintenance jobs with jitter, single-run locking and metrics
+
+    Each job gets a time budget and is deferred while ``is_busy`` reports
+    the process is under load, so upkeep never competes with peak traffic.
+    """
+
+    def __init__(self, jitter: float = 0.1, tick: float = 1.0,
+                 is_busy: Optional[Callable[[], bool]] = None):
+        self.jitter = jitter
+        self.tick = tick
+        self.is_busy = is_busy or (lambda: False)
+        self.jobs: List[MaintenanceJob] = []
+        self._task = None
+
+    def add_job(self, name: str, func: JobFunc, interval: float, budget: float, exclusive: bool = True,
+                initial_delay: Optional[float] = None):
+        """Register a job; the first run happens after initial_delay or one jittered interval"""
+        job = MaintenanceJob(name, func, interval, budget, exclusive)
+        job.next_run = time.monotonic() + (self._jittered(interval) if initial_delay is None else initial_delay)
+        self.jobs.append(job)
+        return job
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run_job(self, job: MaintenanceJob) -> bool:
+        """Run one job now if it is free and the lease can be taken"""
+        if job.running:
+            job.metrics['skipped_locked'] += 1
+            return False
+        if job.exclusive and not acquire_lease(job.name, job.interval):
+            job.metrics['skipped_locked'] += 1
+            return False
+
+        job.running = True
+        start = time.monotonic()
+        try:
+            result = job.func(start + job.budget)
+            if inspect.isawaitable(result):
+                result = await result
+            job.metrics['runs'] += 1
+            job.metrics['last_result'] = result
+            job.metrics['last_error'] = None
+            return True
+        except Exception as e:
+            job.metrics['failures'] += 1
+            job.metrics['last_error'] = str(e)
+            logger.error(f"Maintenance job {job.name} failed: {e}")
+            if job.exclusive:
+                release_lease(job.name)
+            return False
+        finally:
+            duration = time.monotonic() - start
+            job.metrics['last_duration_ms'] = round(duration * 1000, 1)
+            job.metrics['last_run_at'] = datetime.utcnow().isoformat()
+            if duration > job.budget:
+                job.metrics['over_budget'] += 1
+                logger.warning(f"Maintenance job {job.name} took {duration:.3f}s (budget {job.budget:.3f}s)")
+            job.running = False
+
+    async def run(self):
+        """Scheduler loop"""
+        while True:
+            now = time.monotonic()
+            for job in self.jobs:
+                if now < job.next_run:
+                    continue
+                if self.is_busy():
+                    job.metrics['deferred_busy'] += 1
+                    job.next_run = now + self._jittered(min(job.interval, 30.0))
+                    continue
+                job.next_run = now + self._jittered(job.interval)
+                try:
+                    await self.run_job(job)
+                except Exception as e:
+                    logger.error(f"Error scheduling maintenance job {job.name}: {e}")
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        """Start the scheduler on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        """Stop the scheduler"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-job metrics"""
+        return {
+            job.name: {**job.metrics, 'interval_s': job.interval, 'budget_ms': round(job.budget * 1000),
+                       'exclusive': job.exclusive}
+            for job in self.jobs
+        }
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""Bulk Synthetic Catalog and Cart Seeder
+
+Loads a production-sized catalog and open carts into the SQLite database
+for scale testing. Rows are generated with NumPy in fixed blocks, each from
+its own seeded generator, so a seed always produces the same data. Blocks
+go in through raw executemany inside large transactions with syncing
+turned off, and the secondary indexes of the loaded tables are dropped
+first and rebuilt once at the end, which is far cheaper than maintaining
+them row by row.
+
+Run against a stopped app (the indexes are missing during the load):
+    python -m core.seed --products 1000000 --carts 100000 --seed 7
+"""
+
+import argparse
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Table
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from core.catalog_sync import bump_catalog_version
+from core.database import SessionLocal, engine, init_database
+from models.schemas import CartItemDB, ProductDB
+
+logger = logging.getLogger(__name__)
+
+# Rows generated and inserted per executemany call
+BLOCK = 50_000
+# Seeded rows are dated relative to a fixed day, so a seed reproduces them exactly
+ANCHOR = np.datetime64("2024-06-01T12:00:00", "us")
+DAY_US = 86_400 * 1_000_000
+
+# Product lines per category: (name, base price, popularity weight)
+PRODUCT_LINES = {
+    "iPhone": [("iPhone 15 Pro Max", 1199, 3), ("iPhone 15 Pro", 999, 4), ("iPhone 15 Plus", 899, 2),
+               ("iPhone 15", 799, 4), ("iPhone 14", 699, 2), ("iPhone SE", 429, 1)],
+    "Mac": [("MacBook Air 13\"", 1099, 4), ("MacBook Air 15\"", 1299, 3), ("MacBook Pro 14\"", 1599, 3),
+            ("MacBook Pro 16\"", 2499, 2), ("iMac 24\"", 1299, 2), ("Mac mini", 599, 2), ("Mac Studio", 1999, 1)],
+    "iPad": [("iPad Pro 12.9\"", 1099, 2), ("iPad Pro 11\"", 799, 2), ("iPad Air", 599, 3),
+             ("iPad", 449, 3), ("iPad mini", 499, 2)],
+    "Watch": [("Apple Watch Ultra 2", 799, 2), ("Apple Watch Series 9", 399, 4), ("Apple Watch SE", 249, 3)],
+    "AirPods": [("AirPods Pro (2nd gen)", 249, 4), ("AirPods (3rd gen)", 169, 3), ("AirPods Max", 549, 1)],
+    "Accessories": [("Magic Keyboard", 199, 2), ("Magic Mouse", 79, 2), ("Magic Trackpad", 129, 1),
+                    ("MagSafe Charger", 39, 3), ("USB-C Cable", 19, 3), ("Smart Folio", 79, 2),
+                    ("Leather Case", 59, 3), ("AirTag", 29, 3)],
+}
+# Storage options (label, upcharge) for categories sold by capacity
+STORAGE = [("128GB", 0), ("256GB", 100), ("512GB", 300), ("1TB", 500)]
+STORAGE_CATEGORIES = {"iPhone", "Mac", "iPad"}
+COLORS = ["Black", "White", "Silver", "Space Gray", "Midnight", "Starlight", "Blue", "Pink", "Green", "Natural Titanium"]
+FEATURES = [
+    "All-day battery life and a stunning display.",
+    "Designed for Apple Intelligence with the latest Apple silicon.",
+    "Made with recycled materials and built to last.",
+    "Seamless with your other Apple devices.",
+    "Pro performance in a thin and light design.",
+    "Free engraving and carbon neutral shipping.",
+]
+CATEGORY_IMAGES = {
+    "iPhone": "https://images.unsplash.com/photo-1592750475338-74b7b21085ab?w=400",
+    "Mac": "https://images.unsplash.com/photo-1541807084-5c52b6b3adef?w=400",
+    "iPad": "https://images.unsplash.com/photo-1544244015-0df4b3ffc6b0?w=400",
+    "Watch": "https://images.unsplash.com/photo-1434493789847-2f02dc6ca35d?w=400",
+    "AirPods": "https://images.unsplash.com/photo-1606220945770-b5b6c2c55bf1?w=400",
+    "Accessories": "https://images.unsplash.com/photo-1587829741301-dc798b83add3?w=400",
+}
+
+PRODUCT_COLUMNS = ("id", "name", "description", "price", "category", "stock", "image_url", "created_at", "updated_at")
+CART_COLUMNS = ("product_id", "quantity", "session_id", "created_at")
+
+_LINES = [(name, price, weight, category) for category, lines in PRODUCT_LINES.items()
+          for name, price, weight in lines]
+_LINE_NAMES = [line[0] for line in _LINES]
+_LINE_CATEGORIES = [line[3] for line in _LINES]
+_LINE_PRICES = np.array([line[1] for line in _LINES], dtype=np.float64)
+_LINE_WEIGHTS = np.array([line[2] for line in _LINES], dtype=np.float64) / sum(line[2] for line in _LINES)
+_LINE_STORAGE = np.array([line[3] in STORAGE_CATEGORIES for line in _LINES])
+_STORAGE_UPCHARGE = np.array([upcharge for _, upcharge in STORAGE], dtype=np.float64)
+# Every name, description, category and image a row can get, looked up by index
+_NAMES = np.array([
+    [[f"{name} {color}" if option < 0 else f"{name} {STORAGE[option][0]} {color}" for color in COLORS]
+     for option in range(-1, len(STORAGE))]
+    for name in _LINE_NAMES
+], dtype=object)
+_DESCRIPTIONS = np.array([[f"{name}. {feature}" for feature in FEATURES] for name in _LINE_NAMES], dtype=object)
+_CATEGORIES = np.array(_LINE_CATEGORIES, dtype=object)
+_IMAGES = np.array([CATEGORY_IMAGES[category] for category in _LINE_CATEGORIES], dtype=object)
+
+def _timestamps(rng: np.random.Generator, count: int, max_age_days: float) -> List[str]:
+    """Timestamps up to max_age_days before ANCHOR, in the form SQLite DateTime columns store"""
+    ages = (rng.random(count) * max_age_days * DAY_US).astype(np.int64)
+    stamps = np.datetime_as_string(ANCHOR - ages.astype("timedelta64[us]"), unit="us")
+    return np.char.replace(stamps, "T", " ").tolist()
+
+def product_blocks(count: int, first_id: int, seed: int) -> Iterator[List[Tuple]]:
+    """Product rows with ids first_id.. in blocks of BLOCK"""
+    for block, start in enumerate(range(0, count, BLOCK)):
+        size = min(BLOCK, count - start)
+        rng = np.random.default_rng([seed, 1, block])
+        lines = rng.choice(len(_LINES), size=size, p=_LINE_WEIGHTS)
+        storage = np.where(_LINE_STORAGE[lines], rng.integers(0, len(STORAGE), size), -1)
+        colors = rng.integers(0, len(COLORS), size)
+        features = rng.integers(0, len(FEATURES), size)
+        prices = (_LINE_PRICES[lines] + np.where(storage >= 0, _STORAGE_UPCHARGE[storage], 0)) \
+            * rng.uniform(0.85, 1.15, size)
+        prices = np.maximum(np.round(prices) - 0.01, 9.99)
+        # Most listings are in stock, a few sold out, a long tail of deep stock
+        stock = np.where(rng.random(size) < 0.08, 0, np.minimum(rng.geometric(1 / 25, size), 500))
+        created = _timestamps(rng, size, 730)
+
+        names = _NAMES[lines, storage + 1, colors]
+        yield list(zip(
+            range(first_id + start, first_id + start + size), names.tolist(), _DESCRIPTIONS[lines, features].tolist(),
+            prices.tolist(), _CATEGORIES[lines].tolist(), stock.tolist(), _IMAGES[lines].tolist(), created, created
+        ))
+
+def cart_blocks(carts: int, product_ids: np.ndarray, seed: int) -> Iterator[List[Tuple]]:
+    """Open cart lines for carts sessions, in blocks of BLOCK carts
+
+    Each cart holds 1-5 distinct products drawn from a skewed popularity
+    distribution, so a few products appear in many carts.
+    """
+    popularity = np.random.default_rng([seed, 2]).permutation(product_ids)
+    for block, start in enumerate(range(0, carts, BLOCK)):
+        size = min(BLOCK, carts - start)
+        rng = np.random.default_rng([seed, 3, block])
+        lines = rng.integers(1, 6, size)
+        cart_of_line = np.repeat(np.arange(size, dtype=np.int64), lines)
+        products = popularity[(rng.zipf(1.3, len(cart_of_line)) - 1) % len(popularity)].astype(np.int64)
+        # One line per product per cart, as CartService keeps them
+        keys = np.unique(cart_of_line * (int(product_ids.max()) + 1) + products)
+        cart_of_line, products = np.divmod(keys, int(product_ids.max()) + 1)
+        quantities = np.where(rng.random(len(keys)) < 0.85, 1, rng.integers(2, 4, len(keys)))
+        created = _timestamps(rng, len(keys), 14)
+        yield [
+            (int(products[i]), int(quantities[i]), f"seed-{seed}-{start + int(cart_of_line[i]):08d}", created[i])
+            for i in range(len(keys))
+        ]
+
+@contextmanager
+def deferred_indexes(connection, tables: Sequence[Table]) -> Iterator[Dict[str, float]]:
+    """Drop the tables' secondary indexes for the block and rebuild them after
+
+    Yields a dict that receives the rebuild time in seconds.
+    """
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        connection.execute(DropIndex(index, if_exists=True))
+    connection.commit()
+    timing = {}
+    try:
+        yield timing
+    finally:
+        start = time.perf_counter()
+        for index in indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+        connection.commit()
+        timing["seconds"] = time.perf_counter() - start
+
+@contextmanager
+def bulk_load_pragmas(connection, cache_mb: int = 256):
+    """Trade durability for speed while loading; a crash just means reseeding"""
+    connection.exec_driver_sql("PRAGMA synchronous=OFF")
+    connection.exec_driver_sql(f"PRAGMA cache_size=-{cache_mb * 1024}")
+    connection.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    try:
+        yield
+    finally:
+        connection.exec_driver_sql("PRAGMA synchronous=NORMAL")
+        connection.exec_driver_sql("PRAGMA cache_size=-2000")
+        connection.exec_driver_sql("PRAGMA temp_store=DEFAULT")
+
+def load(connection, table: Table, columns: Sequence[str], blocks: Iterator[List[Tuple]],
+         batch_rows: int) -> Tuple[int, float]:
+    """executemany each block, committing every batch_rows rows; returns (rows, seconds)"""
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    rows, pending = 0, 0
+    start = time.perf_counter()
+    for block in blocks:
+        connection.exec_driver_sql(sql, block)
+        rows += len(block)
+        pending += len(block)
+        if pending >= batch_rows:
+            connection.commit()
+            pending = 0
+    connection.commit()
+    return rows, time.perf_counter() - start
+
+def seed(products: int, carts: int, seed: int = 7, batch_rows: int = 500_000) -> Dict:
+    """Append products and cart lines to the database; returns timings"""
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError("The seeder loads the SQLite database only")
+    init_database()
+    report = {"seed": seed}
+    started = time.perf_counter()
+
+    with engine.connect() as connection, bulk_load_pragmas(connection):
+        tables = [ProductDB.__table__, CartItemDB.__table__]
+        with deferred_indexes(connection, tables) as indexes:
+            first_id = (connection.exec_driver_sql("SELECT MAX(id) FROM products").scalar() or 0) + 1
+            rows, seconds = load(connection, ProductDB.__table__, PRODUCT_COLUMNS,
+                                 product_blocks(products, first_id, seed), batch_rows)
+            report["products"] = (rows, seconds)
+
+            if carts:
+                product_ids = np.array(
+                    [row[0] for row in connection.exec_driver_sql("SELECT id FROM products")], dtype=np.int64
+                )
+                rows, seconds = load(connection, CartItemDB.__table__, CART_COLUMNS,
+                                     cart_blocks(carts, product_ids, seed), batch_rows)
+                report["cart_lines"] = (rows, seconds)
+        report["index_seconds"] = indexes["seconds"]
+
+        start = time.perf_counter()
+        connection.exec_driver_sql("ANALYZE")
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.commit()
+        report["analyze_seconds"] = time.perf_counter() - start
+
+    # Running workers and their caches pick the new catalog up like any other change
+    session = SessionLocal()
+    try:
+        report["catalog_version"] = bump_catalog_version(session)
+        session.commit()
+    finally:
+        session.close()
+    report["total_seconds"] = time.perf_counter() - started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with a synthetic catalog and carts")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--carts", type=int, default=100_000, help="open cart sessions, 1-5 lines each")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch", type=int, default=500_000, help="rows per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = seed(args.products, args.carts, args.seed, args.batch)
+    for label in ("products", "cart_lines"):
+        if label in report:
+            rows, seconds = report[label]
+            print(f"{label:>10}: {rows:>9} rows in {seconds:6.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    print(f"   indexes: rebuilt in {report['index_seconds']:.2f}s, ANALYZE + checkpoint {report['analyze_seconds']:.2f}s")
+    database = engine.url.database
+    size = f", {os.path.getsize(database) / 1e6:.0f} MB" if database and os.path.exists(database) else ""
+    print(f"     total: {report['total_seconds']:.2f}s{size}, catalog version {report['catalog_version']}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""Per-Action Span Tracing
+
+A trace starts at a page handler or UI callback (`@traced_action`) and
+collects nested spans from service methods (`@traced`), Pydantic
+conversions (`tracer.span()`) and every SQL statement, linked through a
+contextvar so concurrent actions on the event loop never mix. Only a
+sampled share of actions is recorded. A recorded action slower than
+TRACING_SLOW_MS is logged with its whole span tree, and every recorded
+action is appended to a per-process Chrome trace-event file that
+Perfetto, chrome://tracing or speedscope open as a flame chart.
+
+When tracing is disabled the decorators return the function unchanged
+and no SQL listeners are installed; `tracer.span()` is a flag check.
+"""
+
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_CHARS = 200
+
+class Span:
+    """One timed operation and the operations it called"""
+
+    __slots__ = ('name', 'category', 'attrs', 'start_ns', 'end_ns', 'children', 'error')
+
+    def __init__(self, name: str, category: str, attrs: Optional[Dict] = None):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    def finish(self):
+        self.end_ns = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e6
+
+    def walk(self, depth: int = 0):
+        """(depth, span) for this span and all descendants, depth first"""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+# Marks an action that was not sampled, so nothing below it records spans
+_UNSAMPLED = Span('unsampled', 'none')
+_current: ContextVar[Optional[Span]] = ContextVar('trace_span', default=None)
+
+class _NoSpan:
+    """Shared do-nothing context manager for untraced code paths"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def format_tree(root: Span) -> str:
+    """Indented span tree with durations, for the slow log"""
+    lines = []
+    for depth, span in root.walk():
+        label = span.name
+        if span.attrs and 'statement' in span.attrs:
+            label = f"{label} {span.attrs['statement']}"
+        if span.error:
+            label = f"{label} !{span.error}"
+        lines.append(f"{'  ' * depth}{span.duration_ms:9.2f} ms  {label}")
+    return '\n'.join(lines)
+
+class ChromeTraceExporter:
+    """Appends traces to a Chrome trace-event JSON file, one track per action
+
+    The file is a JSON array left open at the end, which trace viewers
+    accept, so each trace is a plain append.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self.exported = 0
+
+    def export(self, root: Span, trace_id: int):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write('[\n')
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': trace_id,
+                   'args': {'name': f"{root.name} #{trace_id}"}}]
+        for _, span in root.walk():
+            events.append({
+                'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid, 'tid': trace_id,
+                'ts': span.start_ns / 1000, 'dur': ((span.end_ns or root.end_ns) - span.start_ns) / 1000,
+                'args': dict(span.attrs or {}, **({'error': span.error} if span.error else {})),
+            })
+        self._file.write(''.join(json.dumps(item, separators=(',', ':')) + ',\n' for item in events))
+        self._file.flush()
+        self.exported += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class Tracer:
+    """Sampled action traces with a slow log and a flame chart exporter"""
+
+    def __init__(self, enabled: bool, sample_rate: float = 1.0, slow_ms: float = 500.0,
+                 export_path: Optional[str] = None, recent: int = 20):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.exporter = ChromeTraceExporter(export_path) if export_path else None
+        self._ids = itertools.count(1)
+        self.recorded = 0
+        self.unsampled = 0
+        self.slow = 0
+        self.recent_slow = deque(maxlen=recent)
+        if enabled:
+            event.listen(Engine, 'before_cursor_execute', self._before_sql)
+            event.listen(Engine, 'after_cursor_execute', self._after_sql)
+            event.listen(Engine, 'handle_error', self._sql_error)
+
+    def action(self, name: str, **attrs):
+        """Context manager for a page handler or UI callback
+
+        Starts a sampled trace, or nests as a span inside one already running.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return self._action(name, attrs)
+
+    def span(self, name: str, category: str = 'span', **attrs):
+        """Context manager for a span inside the running trace, if any"""
+        if not self.enabled:
+            return _NO_SPAN
+        parent = _current.get()
+        if parent is None or parent is _UNSAMPLED:
+            return _NO_SPAN
+        return self._span(parent, name, category, attrs)
+
+    @contextmanager
+    def _span(self, parent: Span, name: str, category: str, attrs: Dict):
+        span = Span(name, category, attrs or None)
+        parent.children.append(span)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            _current.reset(token)
+
+    @contextmanager
+    def _action(self, name: str, attrs: Dict):
+        parent = _current.get()
+        if parent is _UNSAMPLED:
+            yield None
+            return
+        if parent is not None:
+            with self._span(parent, name, 'action', attrs) as span:
+                yield span
+            return
+
+        if random.random() >= self.sample_rate:
+            self.unsampled += 1
+            token = _current.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+
+        root = Span(name, 'action', attrs or None)
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            root.finish()
+            _current.reset(token)
+            self._record(root)
+
+    def _record(self, root: Span):
+        """Slow log and export for a finished trace"""
+        self.recorded += 1
+        trace_id = next(self._ids)
+        duration_ms = root.duration_ms
+        if duration_ms >= self.slow_ms:
+            self.slow += 1
+            spans = sum(1 for _ in root.walk())
+            self.recent_slow.append({'name': root.name, 'trace_id': trace_id, 'ms': round(duration_ms, 2),
+                                     'spans': spans})
+            logger.warning(f"Slow action {root.name} ({duration_ms:.1f} ms, trace {trace_id}):\n{format_tree(root)}")
+        if self.exporter is not None:
+            try:
+                self.exporter.export(root, trace_id)
+            except OSError as e:
+                logger.error(f"Error exporting trace {trace_id}: {e}")
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is None or parent is _UNSAMPLED or context is None:
+            return
+        text = ' '.join(statement.split())
+        attrs = {'statement': text[:MAX_STATEMENT_CHARS]}
+        if executemany:
+            attrs['executemany'] = len(parameters)
+        span = Span('SQL', 'sql', attrs)
+        parent.children.append(span)
+        context._trace_span = span
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, '_trace_span', None)
+        if span is not None:
+            span.finish()
+            context._trace_span = None
+
+    def _sql_error(self, exception_context):
+        span = getattr(exception_context.execution_context, '_trace_span', None)
+        if span is not None:
+            span.error = type(exception_context.original_exception).__name__
+            span.finish()
+
+    def close(self):
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'slow_ms': self.slow_ms,
+            'recorded': self.recorded,
+            'unsampled': self.unsampled,
+            'slow': self.slow,
+            'exported': self.exporter.exported if self.exporter else 0,
+            'export_path': self.exporter.path if self.exporter else None,
+            'recent_slow': list(self.recent_slow),
+        }
+
+def _wrap(function, scope, name: str):
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with scope(name):
+                return await function(*args, **kwargs)
+    else:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with scope(name):
+                return function(*args, **kwargs)
+    return wrapper
+
+def traced(function):
+    """Record calls to a service method as spans of the running trace"""
+    if not tracer.enabled:
+        return function
+    return _wrap(function, tracer.span, function.__qualname__)
+
+def traced_action(function):
+    """Start a (sampled) trace at a page handler or UI callback"""
+    if not tracer.enabled:
+        return function
+    return _wrap(function, tracer.action, function.__qualname__)
+
+tracer = Tracer(
+    enabled=settings.TRACING_ENABLED,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+    slow_ms=settings.TRACING_SLOW_MS,
+    export_path=(os.path.join(settings.TRACING_EXPORT_DIR, f"trace-{os.getpid()}.json")
+                 if settings.TRACING_EXPORT_DIR else None),
+)
\ No newline at end of file
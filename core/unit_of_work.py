@@ -0,0 +1,189 @@
+"""Per-Event Unit of Work
+
+A UI event (one click) often calls several service methods in a row, and
+each of them used to open, commit and close its own session. Inside a unit
+of work those methods join one shared session instead: the identity map is
+shared, their commits only flush, and the unit commits once when the event
+handler returns. The current unit is held in a contextvar, so concurrent
+events on the event loop never see each other's unit.
+
+Services opt in by taking their session from `unit_session()`; outside a
+unit it returns a fresh session exactly like `get_session()`.
+"""
+
+import functools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.database import SessionLocal, get_session
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+
+class UnitOfWorkSession(Session):
+    """Session shared by the service calls of one unit of work
+
+    Service methods keep their usual commit/rollback/close calls: commit
+    flushes and expires loaded state, as a real commit would, but leaves the
+    transaction open; close is a no-op; rollback rolls back the whole unit.
+    """
+
+    def commit(self):
+        self.flush()
+        self.expire_all()
+
+    def close(self):
+        pass
+
+    def rollback(self):
+        unit = _current.get()
+        if unit is not None:
+            unit.rolled_back = True
+        super().rollback()
+
+    def finish(self, commit: bool):
+        """End the unit: commit or roll back for real, then close"""
+        try:
+            if commit:
+                super().commit()
+            else:
+                super().rollback()
+        finally:
+            super().close()
+
+UnitOfWorkSessionLocal = sessionmaker(class_=UnitOfWorkSession, **SessionLocal.kw)
+
+class UnitOfWork:
+    """Session and query accounting for one UI event"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.joins = 0
+        self.queries = 0
+        # Held for the event only, so ids of closed sessions cannot be reused
+        self.session_seen = set()
+        self.rolled_back = False
+        self.started = time.perf_counter()
+        self._session: Optional[UnitOfWorkSession] = None
+
+    def session(self) -> UnitOfWorkSession:
+        """The shared session, opened on first use"""
+        self.joins += 1
+        if self._session is None:
+            self._session = UnitOfWorkSessionLocal()
+        return self._session
+
+    @property
+    def sessions(self) -> int:
+        """Distinct sessions that ran a transaction during the unit"""
+        return len(self.session_seen)
+
+    def finish(self, commit: bool):
+        if self._session is not None:
+            self._session.finish(commit)
+
+    def summary(self) -> Dict:
+        return {
+            'name': self.name,
+            'sessions': self.sessions,
+            'queries': self.queries,
+            'joins': self.joins,
+            'rolled_back': self.rolled_back,
+            'ms': round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+class UnitOfWorkStats:
+    """Aggregate session and query counts per event"""
+
+    def __init__(self, recent: int = 50):
+        self.units = 0
+        self.failed = 0
+        self.sessions = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.recent = deque(maxlen=recent)
+
+    def record(self, unit: UnitOfWork, failed: bool):
+        summary = unit.summary()
+        self.units += 1
+        self.failed += failed
+        self.sessions += unit.sessions
+        self.queries += unit.queries
+        self.max_queries = max(self.max_queries, unit.queries)
+        self.recent.append(summary)
+        logger.debug(f"Unit of work {unit.name}: {unit.sessions} sessions, {unit.queries} queries")
+
+    def stats(self) -> Dict:
+        return {
+            'units': self.units,
+            'failed': self.failed,
+            'avg_sessions': round(self.sessions / self.units, 2) if self.units else 0.0,
+            'avg_queries': round(self.queries / self.units, 2) if self.units else 0.0,
+            'max_queries': self.max_queries,
+            'recent': list(self.recent),
+        }
+
+unit_of_work_stats = UnitOfWorkStats()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    unit = _current.get()
+    if unit is not None:
+        unit.queries += 1
+
+@event.listens_for(Session, "after_begin")
+def _count_session(session, transaction, connection):
+    unit = _current.get()
+    if unit is not None:
+        unit.session_seen.add(session)
+
+def current_unit() -> Optional[UnitOfWork]:
+    """The unit of work of the running event, if any"""
+    return _current.get()
+
+def unit_session() -> Session:
+    """The current unit of work's session, or a new session outside one"""
+    unit = _current.get()
+    if unit is None:
+        return get_session()
+    return unit.session()
+
+@asynccontextmanager
+async def unit_of_work_scope(name: str):
+    """Run the block as one unit of work; nested scopes join the outer one"""
+    if _current.get() is not None:
+        yield _current.get()
+        return
+
+    unit = UnitOfWork(name)
+    token = _current.set(unit)
+    failed = True
+    try:
+        yield unit
+        unit.finish(commit=True)
+        failed = False
+    except Exception as e:
+        logger.error(f"Error in unit of work {name}: {e}")
+        raise
+    finally:
+        if failed:
+            unit.finish(commit=False)
+        _current.reset(token)
+        unit_of_work_stats.record(unit, failed)
+
+def unit_of_work(method):
+    """Run an async UI event handler as one unit of work"""
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        async with unit_of_work_scope(method.__qualname__):
+            return await method(*args, **kwargs)
+    return wrapper
\ No newline at end of file
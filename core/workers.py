@@ -0,0 +1,146 @@
+"""Multi-Process Serving with a Sticky Front Proxy
+
+NiceGUI keeps each browser tab's client state in the process that rendered the
+page, so the page request and its websocket must land on the same worker.
+The supervisor starts ``WORKERS`` single-process NiceGUI servers on loopback
+ports and accepts public traffic on ``PORT``, routing every connection to a
+worker picked from a hash of the visitor's address.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_HEADER_BYTES = 65536
+CLIENT_ADDRESS_HEADERS = (b"fly-client-ip", b"x-real-ip", b"x-forwarded-for")
+
+def client_key(head: bytes, peer: Optional[Tuple]) -> str:
+    """Pick the stickiness key from forwarding headers or the peer address"""
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() in CLIENT_ADDRESS_HEADERS and value.strip():
+            return value.split(b",")[0].strip().decode("latin-1")
+    return peer[0] if peer else ""
+
+def pick_worker(key: str, worker_count: int) -> int:
+    """Map a client key to a stable worker index"""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % worker_count
+
+class StickyProxy:
+    """Byte-level TCP proxy that pins each visitor to one worker"""
+
+    def __init__(self, worker_ports: List[int]):
+        self.worker_ports = worker_ports
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Forward one client connection to its worker"""
+        upstream_writer = None
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.LimitOverrunError:
+                head = await reader.read(MAX_HEADER_BYTES)
+            except asyncio.IncompleteReadError as e:
+                head = e.partial
+            if not head:
+                return
+
+            index = pick_worker(client_key(head, writer.get_extra_info("peername")), len(self.worker_ports))
+            upstream_reader, upstream_writer = await asyncio.open_connection(
+                "127.0.0.1", self.worker_ports[index]
+            )
+            upstream_writer.write(head)
+            await asyncio.gather(
+                self._pipe(reader, upstream_writer),
+                self._pipe(upstream_reader, writer)
+            )
+        except (ConnectionError, OSError) as e:
+            logger.debug(f"Proxy connection closed: {e}")
+        finally:
+            for w in (writer, upstream_writer):
+                if w is not None:
+                    w.close()
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            if writer.can_write_eof():
+                try:
+                    writer.write_eof()
+                except OSError:
+                    pass
+
+    async def serve(self, host: str, port: int):
+        """Accept public connections until cancelled"""
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        logger.info(f"Sticky proxy on {host}:{port} -> workers {self.worker_ports}")
+        async with server:
+            await server.serve_forever()
+
+def spawn_worker(worker_id: int, port: int) -> subprocess.Popen:
+    """Start one single-process NiceGUI server on a loopback port"""
+    env = dict(os.environ)
+    env.update({
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WORKERS": "1",
+        "WORKER_ID": str(worker_id),
+        "DEBUG": "false",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.main"],
+        cwd=PROJECT_ROOT,
+        env=env
+    )
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_workers():
+    """Supervise the worker processes and run the sticky proxy in front of them"""
+    ports = [settings.WORKER_BASE_PORT + i for i in range(settings.WORKERS)]
+    processes = [spawn_worker(i + 1, port) for i, port in enumerate(ports)]
+    proxy = StickyProxy(ports)
+
+    async def supervise():
+        while True:
+            await asyncio.sleep(1.0)
+            for i, process in enumerate(processes):
+                if process.poll() is not None:
+                    logger.warning(f"Worker {i + 1} exited with {process.returncode}, restarting")
+                    processes[i] = spawn_worker(i + 1, ports[i])
+
+    async def serve():
+        await asyncio.gather(proxy.serve(settings.HOST, settings.PORT), supervise())
+
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
\ No newline at end of file
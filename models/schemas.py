@@ -1,9 +1,9 @@
 """Pydantic Models and Database Schemas"""
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, NamedTuple
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -21,9 +21,24 @@ class ProductDB(Base):
     category = Column(String(100), nullable=False, index=True)
     stock = Column(Integer, default=0)
     image_url = Column(String(500))
+    # "<width>x<height> #rrggbb", computed from the image when it is saved
+    image_placeholder = Column(String(32))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+# Storefront filter + sort indexes; SQLite appends the rowid (id) to every
+# index entry, so each one also serves the keyset tie-break on id
+Index("ix_products_category_price", ProductDB.category, ProductDB.price)
+Index("ix_products_category_created_at", ProductDB.category, ProductDB.created_at)
+Index("ix_products_category_in_stock", ProductDB.category, ProductDB.stock > 0)
+Index("ix_products_price", ProductDB.price)
+Index("ix_products_created_at", ProductDB.created_at)
+Index("ix_products_in_stock", ProductDB.stock > 0)
+# Only products still waiting for an image placeholder; serves the backfill's
+# DISTINCT read and its per-URL UPDATE and stays empty once it has caught up
+Index("ix_products_image_url_missing_placeholder", ProductDB.image_url,
+      sqlite_where=ProductDB.image_url.isnot(None) & ProductDB.image_placeholder.is_(None))
+
 class CartItemDB(Base):
     """Cart item database model"""
     __tablename__ = "cart_items"
@@ -37,6 +52,88 @@ class CartItemDB(Base):
     # Relationship
     product = relationship("ProductDB")
 
+# Cart line lookups filter on both columns (add, update, remove, checkout)
+Index("ix_cart_items_session_product", CartItemDB.session_id, CartItemDB.product_id)
+
+class StockReservationDB(Base):
+    """Stock held for a checkout until it is confirmed or expires"""
+    __tablename__ = "stock_reservations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(String(36), nullable=False, index=True)
+    session_id = Column(String(255), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_name = Column(String(255), nullable=False)
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OrderDB(Base):
+    """Order database model"""
+    __tablename__ = "orders"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255), nullable=False, index=True)
+    subtotal = Column(Float, nullable=False)
+    tax = Column(Float, nullable=False)
+    total = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationship
+    items = relationship("OrderItemDB")
+
+class OrderItemDB(Base):
+    """Order line database model"""
+    __tablename__ = "order_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_name = Column(String(255), nullable=False)
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+class CatalogVersionDB(Base):
+    """Catalog change-version database model (single row)"""
+    __tablename__ = "catalog_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CatalogStockChangeDB(Base):
+    """Stock levels set by a catalog version, so other workers can patch their caches"""
+    __tablename__ = "catalog_stock_changes"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False)
+    category = Column(String(100), nullable=False)
+    price = Column(Float, nullable=False)
+    old_stock = Column(Integer, nullable=False)
+    new_stock = Column(Integer, nullable=False)
+
+class MaintenanceLeaseDB(Base):
+    """Cross-process lease so a maintenance job runs in one worker at a time"""
+    __tablename__ = "maintenance_leases"
+    
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class AnalyticsEventDB(Base):
+    """Append-only storefront analytics event (no secondary indexes, to keep appends cheap)"""
+    __tablename__ = "analytics_events"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    product_id = Column(Integer, nullable=False)
+    session_id = Column(String(255), nullable=False)
+    quantity = Column(Integer, nullable=False, default=1)
+    source = Column(String(32))
+    created_at = Column(DateTime, nullable=False)
+
 # Pydantic Models
 class ProductBase(BaseModel):
     """Base product model"""
@@ -63,6 +160,7 @@ class ProductUpdate(BaseModel):
 class Product(ProductBase):
     """Product response model"""
     id: int
+    image_placeholder: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -89,10 +187,103 @@ class CartItem(CartItemBase):
     class Config:
         from_attributes = True
 
+class OrderItem(BaseModel):
+    """Order or reservation line model"""
+    product_id: int
+    product_name: str
+    price: float
+    quantity: int
+
+class Reservation(BaseModel):
+    """Checkout stock reservation model"""
+    reservation_id: str
+    session_id: str
+    items: List[OrderItem]
+    subtotal: float
+    tax: float
+    total: float
+    expires_at: datetime
+
+class Order(BaseModel):
+    """Order response model"""
+    id: int
+    session_id: str
+    items: List[OrderItem]
+    subtotal: float
+    tax: float
+    total: float
+    created_at: datetime
+
 class CartSummary(BaseModel):
     """Cart summary model"""
     items: List[CartItem]
     total_items: int
     subtotal: float
     tax: float
-    total: float
\ No newline at end of file
+    total: float
+
+# Lean read-path records
+# Built straight from selected columns of trusted DB rows: no ORM entity,
+# no Pydantic validation. Admin and write paths keep using Product.
+class ProductSummary(NamedTuple):
+    """Storefront product record"""
+    id: int
+    name: str
+    description: Optional[str]
+    price: float
+    category: str
+    stock: int
+    image_url: Optional[str]
+    image_placeholder: Optional[str] = None
+
+class ImagePlaceholder(NamedTuple):
+    """Intrinsic size and dominant color of a product image"""
+    width: int
+    height: int
+    color: str
+
+class StockChange(NamedTuple):
+    """Stock of one product before and after a checkout or released hold"""
+    product_id: int
+    category: str
+    price: float
+    old_stock: int
+    new_stock: int
+
+class CartLine(NamedTuple):
+    """Cart view line record"""
+    id: int
+    product_id: int
+    quantity: int
+    product_name: str
+    price: float
+
+class ProductPage(NamedTuple):
+    """One keyset-paginated page of storefront products"""
+    items: List[ProductSummary]
+    next_cursor: Optional[tuple]
+
+class CategoryFacet(NamedTuple):
+    """Per-category facet record"""
+    category: str
+    count: int
+    in_stock: int
+    min_price: float
+    max_price: float
+
+class Suggestion(NamedTuple):
+    """Search autocomplete suggestion record"""
+    product_id: int
+    name: str
+    category: str
+    price: float
+    stock: int
+
+class AnalyticsEvent(NamedTuple):
+    """Captured storefront analytics event"""
+    kind: str
+    product_id: int
+    session_id: str
+    quantity: int
+    source: Optional[str]
+    created_at: datetime
\ No newline at end of file
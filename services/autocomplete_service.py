@@ -0,0 +1,239 @@
+"""Search Autocomplete Service"""
+
+import heapq
+import logging
+import re
+import sys
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from models.schemas import ProductDB, StockChange, Suggestion
+from core.database import get_session
+from core.catalog_sync import catalog_sync, read_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Per-product limits that keep the index linear in catalog size
+MAX_TERM_LENGTH = 32
+MAX_WORDS = 12
+# Candidates examined per query before giving up on filling the limit
+MAX_SCAN = 20000
+
+_WORD = re.compile(r"\w+")
+_STOCK_CAP = (1 << 20) - 1
+_ID_MASK = (1 << 32) - 1
+
+def words_of(text: str) -> List[str]:
+    """Lowercased words, deduplicated in order"""
+    return list(dict.fromkeys(word[:MAX_TERM_LENGTH] for word in _WORD.findall(text.lower())))
+
+def rank_key(product: Suggestion) -> int:
+    """Sortable popularity key: in stock first, then by stock, then by id
+
+    Packed into one int so posting lists can be compact ``array('q')``.
+    """
+    stock = max(0, min(product.stock or 0, _STOCK_CAP))
+    return ((stock == 0) << 52) | ((_STOCK_CAP - stock) << 32) | product.product_id
+
+class AutocompleteService:
+    """In-memory prefix index over product names and categories
+
+    A sorted array of distinct words maps a prefix to a range of words with
+    two binary searches. Each word has a posting list of product rank keys
+    kept in popularity order, so the top suggestions are the head of a lazy
+    k-way merge rather than a sort of every match. Like the facets, the
+    index is built once from the database, patched by `ProductService`
+    write paths and rebuilt on the next query after a change made by
+    another worker. Results are memoised until the next change.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000, memo_size: int = 2048):
+        self.max_entries = max_entries
+        self.memo_size = memo_size
+        self._terms: List[str] = []
+        self._postings: Dict[str, array] = {}
+        self._products: Dict[int, Suggestion] = {}
+        self._words: Dict[int, Tuple[str, ...]] = {}
+        self._entries = 0
+        self._version: Optional[int] = None
+        self._memo: "OrderedDict[tuple, List[Suggestion]]" = OrderedDict()
+        self.truncated = 0
+        catalog_sync.subscribe(self._on_catalog_changed)
+
+    def _on_catalog_changed(self, version: int):
+        """Invalidate unless the change was already applied locally"""
+        if version != self._version:
+            self._version = None
+
+    def _rebuild(self):
+        """Rebuild the index from the products table"""
+        session = get_session()
+        try:
+            version = read_catalog_version(session)
+            rows = session.query(
+                ProductDB.id, ProductDB.name, ProductDB.category, ProductDB.price, ProductDB.stock
+            ).all()
+        finally:
+            session.close()
+
+        self._products = {}
+        self._words = {}
+        self._entries = 0
+        self.truncated = 0
+        postings: Dict[str, List[int]] = {}
+        for row in rows:
+            product = Suggestion._make(row)
+            key = rank_key(product)
+            for word in self._index(product):
+                postings.setdefault(word, []).append(key)
+        self._postings = {word: array('q', sorted(keys)) for word, keys in postings.items()}
+        self._terms = sorted(self._postings)
+        self._version = version
+        self._memo.clear()
+
+    def _index(self, product: Suggestion) -> Tuple[str, ...]:
+        """Record a product and return its words, trimmed once the index is full"""
+        words = words_of(f"{product.name} {product.category}")[:MAX_WORDS]
+        room = self.max_entries - self._entries
+        if len(words) > room:
+            # Keep the leading name words and the category
+            self.truncated += 1
+            words = list(dict.fromkeys(words[:max(room - 1, 1)] + words_of(product.category)))
+        words = tuple(sys.intern(word) for word in words)
+        self._products[product.product_id] = product
+        self._words[product.product_id] = words
+        self._entries += len(words)
+        return words
+
+    def _add(self, product: Suggestion):
+        key = rank_key(product)
+        for word in self._index(product):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array('q')
+                insort(self._terms, word)
+            insort(postings, key)
+
+    def _remove(self, product_id: int):
+        product = self._products.pop(product_id, None)
+        if product is None:
+            return
+        key = rank_key(product)
+        words = self._words.pop(product_id)
+        self._entries -= len(words)
+        for word in words:
+            postings = self._postings[word]
+            index = bisect_left(postings, key)
+            if index < len(postings) and postings[index] == key:
+                del postings[index]
+            if not postings:
+                del self._postings[word]
+                del self._terms[bisect_left(self._terms, word)]
+
+    def _apply(self, version: int, change):
+        """Apply a local delta if it is the next version, otherwise go stale"""
+        if self._version is None:
+            return
+        if version != self._version + 1:
+            self._version = None
+            return
+        change()
+        self._version = version
+        self._memo.clear()
+
+    def record_created(self, version: int, product: Suggestion):
+        """Index a newly created product"""
+        self._apply(version, lambda: self._add(product))
+
+    def record_updated(self, version: int, product: Suggestion):
+        """Re-index an updated product"""
+        def change():
+            self._remove(product.product_id)
+            self._add(product)
+        self._apply(version, change)
+
+    def record_stock_many(self, version: int, changes: List[StockChange]):
+        """Re-rank products whose stock changed in one version"""
+        def change():
+            for stock in changes:
+                product = self._products.get(stock.product_id)
+                if product is not None:
+                    self._remove(stock.product_id)
+                    self._add(product._replace(stock=stock.new_stock))
+        self._apply(version, change)
+
+    def record_deleted(self, version: int, product_id: int):
+        """Drop a deleted product from the index"""
+        self._apply(version, lambda: self._remove(product_id))
+
+    async def ensure_built(self):
+        """Build the index now if it is missing or stale"""
+        if self._version is None:
+            try:
+                self._rebuild()
+            except Exception as e:
+                logger.error(f"Error building autocomplete index: {e}")
+                raise
+
+    async def suggest(self, query: str, limit: int = 8) -> List[Suggestion]:
+        """Most popular products with a word starting with each word of the query"""
+        words = words_of(query)
+        if not words:
+            return []
+        await self.ensure_built()
+
+        key = (tuple(words), limit)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+        # The longest query word drives the lookup; the others filter
+        driver = max(words, key=len)
+        others = [word for word in words if word != driver]
+        low = bisect_left(self._terms, driver)
+        high = bisect_left(self._terms, driver + "\U0010ffff", low)
+
+        result: List[Suggestion] = []
+        seen = set()
+        merged = heapq.merge(*(self._postings[term] for term in self._terms[low:high]))
+        for scanned, rank in enumerate(merged):
+            if len(result) >= limit or scanned >= MAX_SCAN:
+                break
+            product_id = rank & _ID_MASK
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            if others and not all(
+                any(word.startswith(other) for word in self._words[product_id]) for other in others
+            ):
+                continue
+            result.append(self._products[product_id])
+
+        self._memo[key] = result
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Index size and approximate memory use"""
+        memory = (
+            sys.getsizeof(self._terms)
+            + sum(sys.getsizeof(term) for term in self._terms)
+            + sys.getsizeof(self._postings)
+            + sum(sys.getsizeof(postings) for postings in self._postings.values())
+            + sys.getsizeof(self._products)
+            + sum(sys.getsizeof(product) + sys.getsizeof(product.name) for product in self._products.values())
+            + sys.getsizeof(self._words)
+            + sum(sys.getsizeof(words) for words in self._words.values())
+        )
+        return {
+            'products': len(self._products),
+            'terms': len(self._terms),
+            'entries': self._entries,
+            'max_entries': self.max_entries,
+            'truncated_products': self.truncated,
+            'memoised_queries': len(self._memo),
+            'memory_bytes': memory,
+        }
\ No newline at end of file
@@ -1,9 +1,12 @@
 """Cart Service Layer"""
 
-from typing import List
+from typing import Dict, List
+from sqlalchemy import case, insert, update
 from sqlalchemy.orm import Session
-from models.schemas import CartItem, CartItemCreate, CartItemDB, ProductDB, CartSummary
-from core.database import get_session
+from models.schemas import CartItem, CartItemCreate, CartItemDB, ProductDB, CartSummary, CartLine
+from core.unit_of_work import unit_session
+from core.admission import admission_controlled
+from core.tracing import traced, tracer
 from app.config import settings
 import uuid
 import logging
@@ -18,15 +21,14 @@ class CartService:
         # In production, this would be tied to user sessions
         self.session_id = str(uuid.uuid4())
     
-    async def get_cart_items(self) -> List[CartItem]:
-        """Get all items in cart"""
-        session = get_session()
-        try:
-            cart_items = session.query(CartItemDB, ProductDB).join(
-                ProductDB, CartItemDB.product_id == ProductDB.id
-            ).filter(CartItemDB.session_id == self.session_id).all()
-            
-            result = []
+    def _cart_items(self, session: Session) -> List[CartItem]:
+        """Load this cart's items within the given session"""
+        cart_items = session.query(CartItemDB, ProductDB).join(
+            ProductDB, CartItemDB.product_id == ProductDB.id
+        ).filter(CartItemDB.session_id == self.session_id).all()
+        
+        result = []
+        with tracer.span('pydantic CartItem', 'pydantic', rows=len(cart_items)):
             for cart_item, product in cart_items:
                 result.append(CartItem(
                     id=cart_item.id,
@@ -37,17 +39,48 @@ class CartService:
                     price=product.price,
                     created_at=cart_item.created_at
                 ))
-            
-            return result
+        
+        return result
+    
+    @traced
+    async def get_cart_items(self) -> List[CartItem]:
+        """Get all items in cart"""
+        session = unit_session()
+        try:
+            return self._cart_items(session)
         except Exception as e:
             logger.error(f"Error getting cart items: {e}")
             raise
         finally:
             session.close()
     
+    @traced
+    async def get_cart_lines(self) -> List[CartLine]:
+        """Get lean cart view lines"""
+        session = unit_session()
+        try:
+            rows = session.query(
+                CartItemDB.id,
+                CartItemDB.product_id,
+                CartItemDB.quantity,
+                ProductDB.name,
+                ProductDB.price
+            ).join(
+                ProductDB, CartItemDB.product_id == ProductDB.id
+            ).filter(CartItemDB.session_id == self.session_id).all()
+            
+            return [CartLine._make(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting cart lines: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    @admission_controlled
     async def add_to_cart(self, product_id: int, quantity: int = 1) -> CartItem:
         """Add item to cart"""
-        session = get_session()
+        session = unit_session()
         try:
             # Check if item already exists in cart
             existing_item = session.query(CartItemDB).filter(
@@ -101,9 +134,11 @@ class CartService:
         finally:
             session.close()
     
+    @traced
+    @admission_controlled
     async def update_quantity(self, product_id: int, quantity: int) -> bool:
         """Update item quantity in cart"""
-        session = get_session()
+        session = unit_session()
         try:
             cart_item = session.query(CartItemDB).filter(
                 CartItemDB.product_id == product_id,
@@ -127,9 +162,11 @@ class CartService:
         finally:
             session.close()
     
+    @traced
+    @admission_controlled
     async def remove_from_cart(self, product_id: int) -> bool:
         """Remove item from cart"""
-        session = get_session()
+        session = unit_session()
         try:
             cart_item = session.query(CartItemDB).filter(
                 CartItemDB.product_id == product_id,
@@ -149,9 +186,11 @@ class CartService:
         finally:
             session.close()
     
+    @traced
+    @admission_controlled
     async def clear_cart(self) -> bool:
         """Clear all items from cart"""
-        session = get_session()
+        session = unit_session()
         try:
             session.query(CartItemDB).filter(
                 CartItemDB.session_id == self.session_id
@@ -165,10 +204,118 @@ class CartService:
         finally:
             session.close()
     
-    async def get_cart_summary(self) -> CartSummary:
-        """Get cart summary with totals"""
-        cart_items = await self.get_cart_items()
+    @traced
+    @admission_controlled
+    async def add_items(self, quantities: Dict[int, int]) -> CartSummary:
+        """Add several products at once (product_id -> quantity to add)
+        
+        Existing lines are incremented and new lines inserted in one
+        transaction; returns the updated cart summary.
+        """
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        session = unit_session()
+        try:
+            if quantities:
+                known = {row.id for row in session.query(ProductDB.id).filter(
+                    ProductDB.id.in_(quantities)
+                )}
+                unknown = sorted(set(quantities) - known)
+                if unknown:
+                    raise ValueError(f"Unknown product ids: {unknown}")
+                
+                existing = {}
+                for line in session.query(CartItemDB.id, CartItemDB.product_id, CartItemDB.quantity).filter(
+                    CartItemDB.session_id == self.session_id,
+                    CartItemDB.product_id.in_(quantities)
+                ):
+                    existing.setdefault(line.product_id, line)
+                
+                if existing:
+                    session.execute(update(CartItemDB), [
+                        {"id": line.id, "quantity": line.quantity + quantities[product_id]}
+                        for product_id, line in existing.items()
+                    ])
+                new_lines = [
+                    {"product_id": product_id, "quantity": quantity, "session_id": self.session_id}
+                    for product_id, quantity in quantities.items() if product_id not in existing
+                ]
+                if new_lines:
+                    session.execute(insert(CartItemDB), new_lines)
+            
+            summary = self._summarize(self._cart_items(session))
+            session.commit()
+            return summary
+        except ValueError:
+            session.rollback()
+            raise
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error adding items to cart: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    @admission_controlled
+    async def set_quantities(self, quantities: Dict[int, int]) -> CartSummary:
+        """Set quantities for several lines at once (product_id -> quantity)
         
+        A quantity of zero or less removes the line; products not in the
+        cart are ignored. Returns the updated cart summary.
+        """
+        updates = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        removals = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+        session = unit_session()
+        try:
+            if updates:
+                session.query(CartItemDB).filter(
+                    CartItemDB.session_id == self.session_id,
+                    CartItemDB.product_id.in_(updates)
+                ).update(
+                    {CartItemDB.quantity: case(updates, value=CartItemDB.product_id)},
+                    synchronize_session=False
+                )
+            if removals:
+                session.query(CartItemDB).filter(
+                    CartItemDB.session_id == self.session_id,
+                    CartItemDB.product_id.in_(removals)
+                ).delete(synchronize_session=False)
+            
+            summary = self._summarize(self._cart_items(session))
+            session.commit()
+            return summary
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error setting cart quantities: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    @admission_controlled
+    async def remove_items(self, product_ids: List[int]) -> CartSummary:
+        """Remove several products from the cart and return the updated summary"""
+        session = unit_session()
+        try:
+            if product_ids:
+                session.query(CartItemDB).filter(
+                    CartItemDB.session_id == self.session_id,
+                    CartItemDB.product_id.in_(product_ids)
+                ).delete(synchronize_session=False)
+            
+            summary = self._summarize(self._cart_items(session))
+            session.commit()
+            return summary
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error removing items from cart: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _summarize(cart_items: List[CartItem]) -> CartSummary:
+        """Build a cart summary with totals from cart items"""
         total_items = sum(item.quantity for item in cart_items)
         subtotal = sum(item.price * item.quantity for item in cart_items)
         tax = subtotal * settings.TAX_RATE
@@ -180,4 +327,9 @@ class CartService:
             subtotal=subtotal,
             tax=tax,
             total=total
-        )
\ No newline at end of file
+        )
+    
+    @traced
+    async def get_cart_summary(self) -> CartSummary:
+        """Get cart summary with totals"""
+        return self._summarize(await self.get_cart_items())
\ No newline at end of file
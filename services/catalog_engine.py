@@ -0,0 +1,654 @@
+"""Columnar Catalog Engine
+
+The storefront reads the catalog in three ways: filter by category and
+price, sort, and count. This module keeps the catalog as NumPy columns
+(ids, float64 prices, int32 stock, dictionary-encoded categories and
+creation times) so those reads are answered from memory with vectorized
+operations instead of SQLite queries.
+
+Every sort option has a rank index: the row positions in sort order plus
+the sort keys in that order. A page is found by a binary search to the
+cursor, then the filters are evaluated on growing slices of the rank index
+until the page is full, so a listing never touches rows far past the page.
+
+All state lives in NumPy arrays, including product text (one UTF-8 heap),
+so the whole catalog can be published as a snapshot file that other worker
+processes map instead of loading it from the database
+(see `services.catalog_snapshot`).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models.schemas import ProductDB, ProductSummary, ProductPage, CategoryFacet, StockChange
+from core.database import get_session
+from core.catalog_sync import catalog_sync, read_catalog_version
+from services.facet_service import _category_order
+from services.catalog_snapshot import map_snapshot, read_snapshot_meta, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+# Rows examined by the first slice of a page scan; later slices grow 4x
+FIRST_SLICE = 256
+
+def _micros(created_at: Optional[datetime]) -> float:
+    return (created_at - _EPOCH) / timedelta(microseconds=1) if created_at else 0.0
+
+def _datetime(micros: float) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+def _text_fields(record: ProductSummary) -> Tuple[Optional[str], ...]:
+    return (record.name, record.description, record.image_url, record.image_placeholder)
+
+class _RankIndex:
+    """Rows in one sort order, with ascending (key, tie) arrays for binary search
+
+    Descending sorts store negated keys and ids, so every index is ascending.
+    """
+
+    __slots__ = ('keys', 'ties', 'rows')
+
+    def __init__(self, keys: np.ndarray, ties: np.ndarray, rows: np.ndarray):
+        self.keys = keys
+        self.ties = ties
+        self.rows = rows
+
+    @classmethod
+    def build(cls, keys: np.ndarray, ties: np.ndarray, rows: np.ndarray) -> "_RankIndex":
+        order = np.lexsort((ties, keys))
+        return cls(keys[order], ties[order], rows[order].astype(np.int32))
+
+    def position(self, key: float, tie: float, after: bool = False) -> int:
+        """Index of (key, tie) in the order, or of the first entry after it"""
+        low = int(np.searchsorted(self.keys, key, 'left'))
+        high = int(np.searchsorted(self.keys, key, 'right'))
+        return low + int(np.searchsorted(self.ties[low:high], tie, 'right' if after else 'left'))
+
+    def insert(self, key: float, tie: float, row: int):
+        at = self.position(key, tie)
+        self.keys = np.insert(self.keys, at, key)
+        self.ties = np.insert(self.ties, at, tie)
+        self.rows = np.insert(self.rows, at, row)
+
+    def move(self, old: Tuple[float, float], new: Tuple[float, float], row: int):
+        """Reposition one entry, shifting only the entries between its old and new place"""
+        start = self.position(*old)
+        end = self.position(*new)
+        if end > start:
+            end -= 1
+        for name, value in (('keys', new[0]), ('ties', new[1]), ('rows', row)):
+            values = getattr(self, name)
+            if end > start:
+                values[start:end] = values[start + 1:end + 1]
+            elif end < start:
+                values[end + 1:start + 1] = values[end:start]
+            values[end] = value
+
+    def remove(self, key: float, tie: float):
+        at = self.position(key, tie)
+        if at < len(self.keys) and self.keys[at] == key and self.ties[at] == tie:
+            self.keys = np.delete(self.keys, at)
+            self.ties = np.delete(self.ties, at)
+            self.rows = np.delete(self.rows, at)
+
+class _Texts:
+    """Name, description, image URL and image placeholder per row as
+    (offset, length) refs into one UTF-8 heap
+
+    A length of -1 stands for NULL. Text written by patches goes to an
+    in-memory tail; the heap is only rewritten by the next snapshot.
+    """
+
+    __slots__ = ('refs', 'heap', 'tail')
+
+    FIELDS = 4
+
+    def __init__(self, refs: np.ndarray, heap: np.ndarray):
+        self.refs = refs
+        self.heap = heap
+        self.tail = bytearray()
+
+    @staticmethod
+    def _pack(heap: bytearray, texts: Tuple[Optional[str], ...], base: int) -> List[int]:
+        refs = []
+        for text in texts:
+            if text is None:
+                refs += [0, -1]
+            else:
+                encoded = text.encode()
+                refs += [base + len(heap), len(encoded)]
+                heap += encoded
+        return refs
+
+    @classmethod
+    def encode(cls, texts: Iterable[Tuple[Optional[str], ...]]) -> "_Texts":
+        heap = bytearray()
+        refs = [cls._pack(heap, row, 0) for row in texts]
+        return cls(np.array(refs, dtype=np.int64).reshape(-1, 2 * cls.FIELDS), np.frombuffer(bytes(heap), dtype=np.uint8))
+
+    def get(self, row: int) -> Tuple[Optional[str], ...]:
+        refs = self.refs[row].tolist()
+        values = []
+        for offset, length in zip(refs[0::2], refs[1::2]):
+            if length < 0:
+                values.append(None)
+            elif offset >= len(self.heap):
+                offset -= len(self.heap)
+                values.append(self.tail[offset:offset + length].decode())
+            else:
+                values.append(self.heap[offset:offset + length].tobytes().decode())
+        return tuple(values)
+
+    def set(self, row: int, texts: Tuple[Optional[str], ...]):
+        self.refs[row] = self._pack(self.tail, texts, len(self.heap))
+
+    def append(self, texts: Tuple[Optional[str], ...]):
+        self.refs = np.append(self.refs, [self._pack(self.tail, texts, len(self.heap))], axis=0)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        heap = np.concatenate([self.heap, np.frombuffer(bytes(self.tail), dtype=np.uint8)])
+        return {'text_refs': self.refs, 'text_heap': heap}
+
+    @property
+    def nbytes(self) -> int:
+        return self.refs.nbytes + self.heap.nbytes + len(self.tail)
+
+class CatalogColumns:
+    """The catalog as column arrays plus one rank index per sort option"""
+
+    # Sort option -> (rank key, tie-break) as ascending values; matches SORT_OPTIONS
+    SORTS = ('featured', 'price_asc', 'price_desc', 'newest', 'in_stock')
+
+    def __init__(self, ids: np.ndarray, price: np.ndarray, stock: np.ndarray, codes: np.ndarray,
+                 created: np.ndarray, alive: np.ndarray, categories: List[str], texts: _Texts,
+                 indexes: Optional[Dict[str, _RankIndex]] = None):
+        self.ids = ids
+        self.price = price
+        self.stock = stock
+        self.codes = codes
+        self.created = created
+        self.alive = alive
+        self.categories: List[str] = list(categories)
+        self.category_codes: Dict[str, int] = {category: code for code, category in enumerate(self.categories)}
+        self.texts = texts
+        self._facets: Optional[List[CategoryFacet]] = None
+        if indexes is None:
+            rows = np.flatnonzero(alive)
+            indexes = {sort: _RankIndex.build(*self._keys(sort, rows), rows) for sort in self.SORTS}
+        self.indexes = indexes
+
+    @classmethod
+    def from_records(cls, records: List[ProductSummary], created: np.ndarray) -> "CatalogColumns":
+        """Columns for the given records, in order"""
+        count = len(records)
+        categories = sorted({record.category for record in records}, key=_category_order)
+        category_codes = {category: code for code, category in enumerate(categories)}
+        return cls(
+            ids=np.fromiter((record.id for record in records), dtype=np.int64, count=count),
+            price=np.fromiter((record.price for record in records), dtype=np.float64, count=count),
+            stock=np.fromiter((record.stock or 0 for record in records), dtype=np.int32, count=count),
+            codes=np.fromiter((category_codes[record.category] for record in records), dtype=np.int16, count=count),
+            created=created.astype(np.float64),
+            alive=np.ones(count, dtype=bool),
+            categories=categories,
+            texts=_Texts.encode(_text_fields(record) for record in records),
+        )
+
+    @classmethod
+    def from_arrays(cls, categories: List[str], arrays: Dict[str, np.ndarray]) -> "CatalogColumns":
+        """Columns over existing arrays (e.g. a mapped snapshot), without copying them"""
+        return cls(
+            ids=arrays['ids'], price=arrays['price'], stock=arrays['stock'], codes=arrays['codes'],
+            created=arrays['created'], alive=arrays['alive'], categories=categories,
+            texts=_Texts(arrays['text_refs'], arrays['text_heap']),
+            indexes={
+                sort: _RankIndex(arrays[f'{sort}.keys'], arrays[f'{sort}.ties'], arrays[f'{sort}.rows'])
+                for sort in cls.SORTS
+            },
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every array, by name, for writing a snapshot"""
+        arrays = {
+            'ids': self.ids, 'price': self.price, 'stock': self.stock, 'codes': self.codes,
+            'created': self.created, 'alive': self.alive, **self.texts.arrays(),
+        }
+        for sort, index in self.indexes.items():
+            arrays.update({f'{sort}.keys': index.keys, f'{sort}.ties': index.ties, f'{sort}.rows': index.rows})
+        return arrays
+
+    def record(self, row: int) -> ProductSummary:
+        name, description, image_url, image_placeholder = self.texts.get(row)
+        return ProductSummary(
+            int(self.ids[row]), name, description, float(self.price[row]),
+            self.categories[self.codes[row]], int(self.stock[row]), image_url, image_placeholder
+        )
+
+    def row_of(self, product_id: int) -> Optional[int]:
+        """Row of a live product, found through the id-ordered featured index"""
+        index = self.indexes['featured']
+        at = index.position(float(product_id), float(product_id))
+        if at < len(index.keys) and index.keys[at] == product_id:
+            return int(index.rows[at])
+        return None
+
+    def _keys(self, sort: str, rows) -> Tuple:
+        """Ascending (key, tie) values for the given rows (array or single row)"""
+        ids = self.ids[rows].astype(np.float64)
+        if sort == 'featured':
+            return ids, ids
+        if sort == 'price_asc':
+            return self.price[rows], ids
+        if sort == 'price_desc':
+            return -self.price[rows], -ids
+        if sort == 'newest':
+            return -self.created[rows], -ids
+        return -(self.stock[rows] > 0).astype(np.float64), -ids
+
+    def cursor_of(self, sort: str, row: int) -> tuple:
+        """Keyset cursor in the same form as ProductService.browse_products"""
+        product_id = int(self.ids[row])
+        if sort == 'featured':
+            return (product_id, product_id)
+        if sort in ('price_asc', 'price_desc'):
+            return (float(self.price[row]), product_id)
+        if sort == 'newest':
+            return (_datetime(self.created[row]), product_id)
+        return (bool(self.stock[row] > 0), product_id)
+
+    def cursor_keys(self, sort: str, cursor: tuple) -> Tuple[float, float]:
+        """Ascending (key, tie) for a keyset cursor"""
+        value, product_id = cursor
+        if sort in ('featured', 'price_asc'):
+            return float(value), float(product_id)
+        if sort == 'price_desc':
+            return -float(value), -float(product_id)
+        if sort == 'newest':
+            return -_micros(value), -float(product_id)
+        return -float(bool(value)), -float(product_id)
+
+    def _code(self, category: str) -> int:
+        if category not in self.category_codes:
+            self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return self.category_codes[category]
+
+    def _append(self, record: ProductSummary, created: float) -> int:
+        row = len(self.ids)
+        self.texts.append(_text_fields(record))
+        self.ids = np.append(self.ids, record.id)
+        self.price = np.append(self.price, record.price)
+        self.stock = np.append(self.stock, np.int32(record.stock or 0))
+        self.created = np.append(self.created, created)
+        self.codes = np.append(self.codes, np.int16(self._code(record.category)))
+        self.alive = np.append(self.alive, True)
+        return row
+
+    def _unindex(self, row: int):
+        for sort, index in self.indexes.items():
+            index.remove(*(float(value) for value in self._keys(sort, row)))
+
+    def _index(self, row: int):
+        for sort, index in self.indexes.items():
+            index.insert(*(float(value) for value in self._keys(sort, row)), row)
+
+    def add(self, record: ProductSummary, created_at: Optional[datetime]):
+        self._facets = None
+        self._index(self._append(record, _micros(created_at)))
+
+    def update(self, record: ProductSummary):
+        """Patch a row in place; the creation time never changes"""
+        row = self.row_of(record.id)
+        if row is None:
+            return
+        self._facets = None
+        old = {sort: tuple(float(value) for value in self._keys(sort, row)) for sort in self.indexes}
+        self.texts.set(row, _text_fields(record))
+        self.price[row] = record.price
+        self.stock[row] = record.stock or 0
+        self.codes[row] = self._code(record.category)
+        for sort, index in self.indexes.items():
+            index.move(old[sort], tuple(float(value) for value in self._keys(sort, row)), row)
+
+    def set_stock(self, product_id: int, stock: int):
+        """Patch only a row's stock, moving it in the indexes that rank by stock"""
+        row = self.row_of(product_id)
+        if row is None:
+            return
+        self._facets = None
+        old = {sort: tuple(float(value) for value in self._keys(sort, row)) for sort in self.indexes}
+        self.stock[row] = stock or 0
+        for sort, index in self.indexes.items():
+            new = tuple(float(value) for value in self._keys(sort, row))
+            if new != old[sort]:
+                index.move(old[sort], new, row)
+
+    def remove(self, product_id: int):
+        """Drop a row from every rank index; the column slot stays as a tombstone"""
+        row = self.row_of(product_id)
+        if row is None:
+            return
+        self._facets = None
+        self._unindex(row)
+        self.alive[row] = False
+
+    def browse(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: str = "featured",
+        limit: int = 24,
+        cursor: Optional[tuple] = None
+    ) -> ProductPage:
+        """Filter, sort and keyset-paginate; same contract as ProductService.browse_products"""
+        if sort not in self.indexes:
+            raise ValueError(f"Unknown sort option: {sort}")
+        index = self.indexes[sort]
+        code = None
+        if category and category != "All":
+            code = self.category_codes.get(category)
+            if code is None:
+                return ProductPage(items=[], next_cursor=None)
+
+        start = 0 if cursor is None else index.position(*self.cursor_keys(sort, cursor), after=True)
+        end = len(index.rows)
+        # Price sorts can jump straight to the price range
+        if sort == 'price_asc':
+            if min_price is not None:
+                start = max(start, int(np.searchsorted(index.keys, min_price, 'left')))
+            if max_price is not None:
+                end = int(np.searchsorted(index.keys, max_price, 'right'))
+        elif sort == 'price_desc':
+            if max_price is not None:
+                start = max(start, int(np.searchsorted(index.keys, -max_price, 'left')))
+            if min_price is not None:
+                end = int(np.searchsorted(index.keys, -min_price, 'right'))
+
+        found: List[np.ndarray] = []
+        wanted = limit + 1
+        size = max(FIRST_SLICE, wanted * 4)
+        while start < end and wanted > 0:
+            rows = index.rows[start:min(start + size, end)]
+            mask = None
+            if code is not None:
+                mask = self.codes[rows] == code
+            if min_price is not None and sort not in ('price_asc', 'price_desc'):
+                above = self.price[rows] >= min_price
+                mask = above if mask is None else mask & above
+            if max_price is not None and sort not in ('price_asc', 'price_desc'):
+                below = self.price[rows] <= max_price
+                mask = below if mask is None else mask & below
+            hits = rows if mask is None else rows[mask]
+            found.append(hits[:wanted])
+            wanted -= len(found[-1])
+            start += size
+            size *= 4
+
+        rows = np.concatenate(found) if found else np.empty(0, dtype=np.int32)
+        items = [self.record(row) for row in rows[:limit].tolist()]
+        next_cursor = self.cursor_of(sort, int(rows[limit - 1])) if len(rows) > limit else None
+        return ProductPage(items=items, next_cursor=next_cursor)
+
+    def facets(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[CategoryFacet]:
+        """Per-category counts, in-stock counts and price ranges, optionally within a price range"""
+        index = self.indexes['price_asc']
+        start = 0 if min_price is None else int(np.searchsorted(index.keys, min_price, 'left'))
+        end = len(index.rows) if max_price is None else int(np.searchsorted(index.keys, max_price, 'right'))
+        whole = start == 0 and end == len(index.rows)
+        if whole and self._facets is not None:
+            return list(self._facets)
+        size = len(self.categories)
+        if whole:
+            # Whole catalog: count straight off the columns, skipping tombstones
+            counts = np.bincount(self.codes, weights=self.alive, minlength=size)
+            in_stock = np.bincount(self.codes, weights=self.alive & (self.stock > 0), minlength=size)
+        else:
+            rows = index.rows[start:end]
+            codes = self.codes[rows]
+            counts = np.bincount(codes, minlength=size)
+            in_stock = np.bincount(codes, weights=self.stock[rows] > 0, minlength=size)
+        present = np.flatnonzero(counts)
+        # Rows are in price order, so each category's cheapest and dearest
+        # products are the first and last of its rows in the range
+        in_range = index.rows[start:end]
+        low = self._first_price(in_range, present)
+        high = self._first_price(in_range[::-1], present)
+        facets = [
+            CategoryFacet(self.categories[code], int(counts[code]), int(in_stock[code]), low[code], high[code])
+            for code in present.tolist()
+        ]
+        if whole:
+            self._facets = facets
+        return list(facets)
+
+    def _first_price(self, rows: np.ndarray, present: np.ndarray) -> Dict[int, float]:
+        """Price of the first of the given rows in each present category, read in growing slices"""
+        prices: Dict[int, float] = {}
+        position, size = 0, FIRST_SLICE
+        while len(prices) < len(present) and position < len(rows):
+            chunk = rows[position:position + size]
+            codes, first = np.unique(self.codes[chunk], return_index=True)
+            for code, at in zip(codes.tolist(), first.tolist()):
+                prices.setdefault(code, float(self.price[chunk[at]]))
+            position += size
+            size *= 4
+        return prices
+
+    def memory_bytes(self) -> int:
+        columns = (self.ids, self.price, self.stock, self.created, self.codes, self.alive)
+        indexes = sum(
+            index.keys.nbytes + index.ties.nbytes + index.rows.nbytes for index in self.indexes.values()
+        )
+        return sum(column.nbytes for column in columns) + indexes + self.texts.nbytes
+
+class CatalogEngine:
+    """Columnar catalog kept in step with the products table
+
+    Like the facets, the columns are built once, patched by `ProductService`
+    write paths and rebuilt on the next read after a change made by another
+    worker. With a snapshot path, the process that builds or patches the
+    columns publishes them as a snapshot file and maps it back; other
+    workers map the file when its version matches the database instead of
+    reading the catalog, and keep serving their current mapping for up to
+    ``grace`` seconds while the writer publishes a newer one.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, source: str = "", grace: float = 2.0):
+        self.snapshot_path = snapshot_path
+        self.source = source
+        self.grace = grace
+        self._columns: Optional[CatalogColumns] = None
+        self._version: Optional[int] = None
+        self._stale_since: Optional[float] = None
+        # Bumped on every invalidation, so a load that raced a change is not trusted
+        self._changes = 0
+        self._loading: Optional[asyncio.Future] = None
+        self.rebuilds = 0
+        self.snapshot_maps = 0
+        self.snapshot_writes = 0
+        self.mapped_version: Optional[int] = None
+        catalog_sync.subscribe(self._on_catalog_changed)
+
+    def _on_catalog_changed(self, version: int):
+        """Invalidate unless the change was already applied locally"""
+        if version != self._version:
+            self._version = None
+            self._changes += 1
+            self._stale_since = time.monotonic()
+
+    def _rebuild(self) -> Tuple[CatalogColumns, int]:
+        """Columns and their version, built from the products table"""
+        session = get_session()
+        try:
+            version = read_catalog_version(session)
+            rows = session.query(
+                ProductDB.id, ProductDB.name, ProductDB.description, ProductDB.price,
+                ProductDB.category, ProductDB.stock, ProductDB.image_url, ProductDB.image_placeholder,
+                ProductDB.created_at
+            ).all()
+        finally:
+            session.close()
+
+        records = [ProductSummary._make(row[:-1]) for row in rows]
+        created = np.fromiter((_micros(row.created_at) for row in rows), dtype=np.float64, count=len(rows))
+        self.rebuilds += 1
+        return CatalogColumns.from_records(records, created), version
+
+    def _map(self, version: int) -> Optional[CatalogColumns]:
+        """Columns mapped from the snapshot file if it holds exactly this catalog version"""
+        meta = read_snapshot_meta(self.snapshot_path)
+        if meta is None or meta.get('source') != self.source or meta.get('version') != version:
+            return None
+        meta, arrays = map_snapshot(self.snapshot_path)
+        # The file may have been replaced between reading its header and mapping it
+        if meta.get('source') != self.source or meta.get('version') != version:
+            return None
+        self.snapshot_maps += 1
+        return CatalogColumns.from_arrays(meta['categories'], arrays)
+
+    def _publish(self, columns: CatalogColumns, version: int) -> Tuple[CatalogColumns, Optional[int]]:
+        """Write columns as the shared snapshot; returns them mapped back and the mapped version"""
+        meta = read_snapshot_meta(self.snapshot_path)
+        if meta is None or meta.get('source') != self.source or meta.get('version', -1) < version:
+            write_snapshot(
+                self.snapshot_path,
+                {'version': version, 'source': self.source, 'categories': columns.categories},
+                columns.arrays()
+            )
+            self.snapshot_writes += 1
+        # Otherwise another worker already published this version (map it) or a newer one
+        mapped = self._map(version)
+        return (columns, None) if mapped is None else (mapped, version)
+
+    def _load(self) -> Optional[Tuple[CatalogColumns, int, Optional[int]]]:
+        """(columns, version, mapped version) at the database's catalog version
+
+        Runs in a worker thread and never touches the live columns. Returns
+        None to keep serving the current columns for now.
+        """
+        if not self.snapshot_path:
+            columns, version = self._rebuild()
+            return columns, version, None
+
+        session = get_session()
+        try:
+            version = read_catalog_version(session)
+        finally:
+            session.close()
+        mapped = self._map(version)
+        if mapped is not None:
+            return mapped, version, version
+        if self._columns is not None and self._stale_since is not None \
+                and time.monotonic() - self._stale_since < self.grace:
+            # The writing worker is about to publish this version
+            return None
+        columns, version = self._rebuild()
+        columns, mapped_version = self._publish(columns, version)
+        return columns, version, mapped_version
+
+    async def _refresh(self):
+        """Bring the columns up to the database's catalog version off the event loop"""
+        changes = self._changes
+        loaded = await asyncio.to_thread(self._load)
+        if loaded is None:
+            return
+        columns, version, mapped_version = loaded
+        self._columns = columns
+        self.mapped_version = mapped_version
+        # A change seen while loading may not be in these columns: serve them, but load again
+        self._version = version if self._changes == changes else None
+
+    def _apply(self, version: int, change, publish: bool = True):
+        """Apply a local delta if it is the next version, otherwise go stale"""
+        if self._version is None:
+            return
+        if version != self._version + 1:
+            self._version = None
+            self._changes += 1
+            return
+        change(self._columns)
+        self._version = version
+        if publish and self.snapshot_path:
+            try:
+                self._columns, self.mapped_version = self._publish(self._columns, version)
+            except Exception as e:
+                # The patched columns keep serving this worker; others rebuild
+                logger.error(f"Error publishing catalog snapshot: {e}")
+
+    def record_created(self, version: int, product: ProductSummary, created_at: Optional[datetime]):
+        """Add a newly created product"""
+        self._apply(version, lambda columns: columns.add(product, created_at))
+
+    def record_updated(self, version: int, product: ProductSummary):
+        """Patch an updated product"""
+        self._apply(version, lambda columns: columns.update(product))
+
+    def record_stock_many(self, version: int, changes: List[StockChange]):
+        """Patch the stock of several products changed in one version
+
+        Not republished: every worker applies stock changes from the stock
+        log itself, and the next edit or rebuild rewrites the snapshot.
+        """
+        def change(columns: CatalogColumns):
+            for stock in changes:
+                columns.set_stock(stock.product_id, stock.new_stock)
+        self._apply(version, change, publish=False)
+
+    def record_deleted(self, version: int, product_id: int):
+        """Drop a deleted product"""
+        self._apply(version, lambda columns: columns.remove(product_id))
+
+    async def columns(self) -> CatalogColumns:
+        """The current columns, refreshed first if missing or stale
+
+        Stale columns keep being served while a single refresh runs in a
+        worker thread; only the very first build is waited for.
+        """
+        if self._version is None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._refresh())
+                self._loading.add_done_callback(self._loaded)
+            if self._columns is None:
+                try:
+                    await asyncio.shield(self._loading)
+                except Exception as e:
+                    logger.error(f"Error building catalog columns: {e}")
+                    raise
+        return self._columns
+
+    def _loaded(self, loading: asyncio.Future):
+        self._loading = None
+        # A failed first build is reported to the reads waiting for it
+        if not loading.cancelled() and loading.exception() is not None and self._columns is not None:
+            logger.error(f"Error refreshing catalog columns: {loading.exception()}")
+
+    async def browse(self, **filters) -> ProductPage:
+        """Filter, sort and paginate from memory (see CatalogColumns.browse)"""
+        return (await self.columns()).browse(**filters)
+
+    async def facets(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[CategoryFacet]:
+        """Category facets from memory, optionally within a price range"""
+        return (await self.columns()).facets(min_price, max_price)
+
+    def stats(self) -> Dict[str, object]:
+        """Row count, memory use, rebuilds and snapshot state"""
+        columns = self._columns
+        return {
+            'version': self._version,
+            'rows': 0 if columns is None else int(columns.alive.sum()),
+            'tombstones': 0 if columns is None else int((~columns.alive).sum()),
+            'categories': 0 if columns is None else len(columns.categories),
+            'column_bytes': 0 if columns is None else columns.memory_bytes(),
+            'rebuilds': self.rebuilds,
+            'snapshot_path': self.snapshot_path,
+            'mapped_version': self.mapped_version,
+            'snapshot_maps': self.snapshot_maps,
+            'snapshot_writes': self.snapshot_writes,
+        }
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Catalog Snapshot Files
+
+A versioned binary image of the columnar catalog that worker processes map
+into memory instead of each loading the catalog from the database.
+
+Layout:
+    0   magic (8 bytes)
+    8   metadata offset, metadata length (two little-endian uint64)
+    64  arrays, each starting on a 64-byte boundary
+    ... metadata: UTF-8 JSON with the catalog version, the database it was
+        built from, categories and the offset, dtype and shape of each array
+
+Files are written to a temporary name, fsynced and renamed over the old
+snapshot, so readers only ever see a complete file. Readers map it
+copy-on-write: the arrays are shared page cache until a process patches
+them, and processes that already mapped the old file keep reading it.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.engine.url import make_url
+
+# Bumped whenever the array layout changes, so older files are rewritten, never mapped
+MAGIC = b"APCATv2\0"
+_HEADER = struct.Struct("<QQ")
+_ALIGN = 64
+
+def default_snapshot_path(database_url: str) -> Optional[str]:
+    """Snapshot file next to a SQLite database file; None for other databases"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:" \
+            or url.database.startswith("file:"):
+        return None
+    return f"{url.database}.catalog"
+
+def write_snapshot(path: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> int:
+    """Atomically write arrays and metadata to path; returns the file size"""
+    sections = {}
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as out:
+            out.write(MAGIC + bytes(_ALIGN - len(MAGIC)))
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                offset = out.tell()
+                out.write(memoryview(array).cast("B"))
+                sections[name] = [offset, array.dtype.str, list(array.shape)]
+                out.write(bytes(-out.tell() % _ALIGN))
+
+            meta_offset = out.tell()
+            encoded = json.dumps({**meta, "sections": sections}).encode()
+            out.write(encoded)
+            size = out.tell()
+            out.seek(len(MAGIC))
+            out.write(_HEADER.pack(meta_offset, len(encoded)))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return size
+
+def _read_meta(buffer) -> Dict[str, Any]:
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not a catalog snapshot")
+    meta_offset, meta_length = _HEADER.unpack_from(buffer, len(MAGIC))
+    return json.loads(bytes(buffer[meta_offset:meta_offset + meta_length]))
+
+def read_snapshot_meta(path: str) -> Optional[Dict[str, Any]]:
+    """Metadata of the snapshot at path, without mapping it; None if missing or unreadable"""
+    try:
+        with open(path, "rb") as snapshot:
+            header = snapshot.read(len(MAGIC) + _HEADER.size)
+            meta_offset, meta_length = _HEADER.unpack_from(header, len(MAGIC))
+            if header[:len(MAGIC)] != MAGIC:
+                return None
+            snapshot.seek(meta_offset)
+            return json.loads(snapshot.read(meta_length))
+    except (OSError, ValueError, struct.error):
+        return None
+
+def map_snapshot(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Map a snapshot copy-on-write and return its metadata and zero-copy arrays"""
+    with open(path, "rb") as snapshot:
+        mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_COPY)
+    meta = _read_meta(mapped)
+    arrays = {}
+    for name, (offset, dtype, shape) in meta.pop("sections").items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape)) if shape else 1
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return meta, arrays
\ No newline at end of file
@@ -0,0 +1,366 @@
+"""Checkout Service Layer"""
+
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.schemas import (
+    CartItemDB, ProductDB, StockReservationDB, OrderDB, OrderItemDB,
+    OrderItem, Reservation, Order, StockChange
+)
+from core.database import get_session
+from core.catalog_sync import catalog_sync, bump_catalog_version, log_stock_changes
+from core.replicas import replica_router
+from core.admission import cart_admission, AdmissionRejected
+from services.product_service import ProductService
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CheckoutError(Exception):
+    """Checkout could not be completed"""
+
+class OutOfStockError(CheckoutError):
+    """One or more cart lines could not be reserved"""
+
+    def __init__(self, product_names: List[str]):
+        self.product_names = product_names
+        super().__init__(f"Not enough stock for: {', '.join(product_names)}")
+
+class ReservationExpiredError(CheckoutError):
+    """The reservation expired or was already used"""
+
+def _is_contention(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+class CheckoutService:
+    """Reserves stock for a cart and turns reservations into orders
+
+    Stock is taken with a conditional ``UPDATE ... WHERE stock >= :q`` per
+    line, so concurrent checkouts on one SKU can never oversell. Every step
+    is one short write-first transaction; under SQLite write contention the
+    lock wait is kept short and retried with jittered backoff on the event
+    loop instead of blocking it for the full busy timeout.
+
+    Every stock change bumps the catalog version in the same transaction,
+    since the storefront shows stock counts, and is patched into the
+    product service's caches after the commit.
+    """
+
+    def __init__(self, product_service: Optional[ProductService] = None):
+        self.product_service = product_service
+
+    async def _run(self, work: Callable[[Session], T]) -> T:
+        """Run one write transaction, retrying on lock contention"""
+        attempt = 0
+        while True:
+            session = get_session()
+            sqlite = session.get_bind().dialect.name == "sqlite"
+            try:
+                if sqlite:
+                    # Take the write lock up front with a short wait so reads
+                    # inside the transaction can never hit a stale snapshot
+                    session.execute(text(f"PRAGMA busy_timeout={settings.CHECKOUT_BUSY_TIMEOUT_MS}"))
+                    session.execute(text("BEGIN IMMEDIATE"))
+                result = work(session)
+                session.commit()
+                return result
+            except OperationalError as e:
+                session.rollback()
+                if not _is_contention(e) or attempt >= settings.CHECKOUT_MAX_RETRIES:
+                    raise
+                delay = min(settings.CHECKOUT_RETRY_BASE_DELAY * (2 ** attempt), settings.CHECKOUT_RETRY_MAX_DELAY)
+                attempt += 1
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                if sqlite:
+                    session.execute(text(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}"))
+                session.close()
+
+    @staticmethod
+    def _take_stock(session: Session, product_id: int, quantity: int) -> bool:
+        """Conditionally decrement stock; False if not enough is left"""
+        result = session.execute(
+            update(ProductDB)
+            .where(ProductDB.id == product_id, ProductDB.stock >= quantity)
+            .values(stock=ProductDB.stock - quantity)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def _return_stock(session: Session, product_id: int, quantity: int):
+        session.execute(
+            update(ProductDB)
+            .where(ProductDB.id == product_id)
+            .values(stock=ProductDB.stock + quantity)
+        )
+
+    @staticmethod
+    def _stock_levels(session: Session, product_ids: List[int]) -> Dict[int, tuple]:
+        """(id, category, price, stock) per product"""
+        rows = session.query(ProductDB.id, ProductDB.category, ProductDB.price, ProductDB.stock).filter(
+            ProductDB.id.in_(product_ids)
+        ).all()
+        return {row.id: row for row in rows}
+
+    def _stock_changed(self, session: Session, before: Dict[int, tuple]) -> tuple:
+        """Bump the catalog version and log the new stock levels; (version, changes)
+
+        The log lets other workers patch their caches for this version
+        instead of rebuilding them.
+        """
+        after = self._stock_levels(session, list(before))
+        changes = [
+            StockChange(product_id, row.category, row.price, row.stock or 0, after[product_id].stock or 0)
+            for product_id, row in before.items() if product_id in after
+        ]
+        version = bump_catalog_version(session)
+        log_stock_changes(session, version, changes)
+        return version, changes
+
+    def _record(self, change: Optional[tuple]):
+        """Let every cache see a committed stock change"""
+        if change is None:
+            return
+        version, changes = change
+        if self.product_service is not None:
+            self.product_service.record_stock_changes(version, changes)
+        replica_router.record_write(version)
+        catalog_sync.mark_changed(version)
+
+    @staticmethod
+    def _cart_lines(session: Session, session_id: str) -> list:
+        """(product_id, name, price, quantity, stock) per cart line, in product id order"""
+        return session.query(
+            CartItemDB.product_id, ProductDB.name, ProductDB.price, CartItemDB.quantity, ProductDB.stock
+        ).join(
+            ProductDB, CartItemDB.product_id == ProductDB.id
+        ).filter(CartItemDB.session_id == session_id).order_by(CartItemDB.product_id).all()
+
+    def _take_lines(self, session: Session, lines: list) -> tuple:
+        """Take stock for every line; returns the stock change"""
+        before = self._stock_levels(session, [line.product_id for line in lines])
+        # Lines are taken in product id order so concurrent checkouts
+        # acquire rows consistently
+        failed = [line.name for line in lines
+                  if not self._take_stock(session, line.product_id, line.quantity)]
+        if failed:
+            raise OutOfStockError(failed)
+        return self._stock_changed(session, before)
+
+    @staticmethod
+    def _place_order(session: Session, session_id: str, lines: list) -> Order:
+        """Insert an order for the given lines and remove them from the cart"""
+        subtotal = sum(line.price * line.quantity for line in lines)
+        tax = subtotal * settings.TAX_RATE
+        order = OrderDB(session_id=session_id, subtotal=subtotal, tax=tax, total=subtotal + tax)
+        session.add(order)
+        session.flush()
+        items = [
+            OrderItem(product_id=line.product_id, product_name=line.product_name,
+                      price=line.price, quantity=line.quantity)
+            for line in lines
+        ]
+        session.execute(insert(OrderItemDB), [dict(item.dict(), order_id=order.id) for item in items])
+        session.query(CartItemDB).filter(
+            CartItemDB.session_id == session_id,
+            CartItemDB.product_id.in_([line.product_id for line in lines])
+        ).delete(synchronize_session=False)
+
+        return Order(
+            id=order.id,
+            session_id=session_id,
+            items=items,
+            subtotal=subtotal,
+            tax=tax,
+            total=subtotal + tax,
+            created_at=order.created_at
+        )
+
+    async def _precheck(self, session_id: str):
+        """Fail fast without the write lock when the cart cannot be filled
+
+        Stock read here is only advisory; the conditional update decides.
+        Once a flash-sale SKU sells out, later checkouts stop competing for
+        the write lock.
+        """
+        session = get_session()
+        try:
+            lines = self._cart_lines(session, session_id)
+        finally:
+            session.close()
+        if not lines:
+            raise CheckoutError("Cart is empty")
+
+        short = [line.name for line in lines if (line.stock or 0) < line.quantity]
+        # Expired holds may be sitting on the stock we need
+        if short and await self.release_expired() == 0:
+            raise OutOfStockError(short)
+
+    async def reserve_cart(self, session_id: str, admission_key: Optional[str] = None) -> Reservation:
+        """Reserve stock for every line of a cart in one transaction
+
+        UI callers pass their browser client's id as ``admission_key`` so each
+        shopper is rate limited on their own; session_id is the fallback.
+        A hold the cart still has from an earlier checkout is returned first,
+        so checking out again replaces it rather than holding stock twice.
+        """
+        reservation_id = str(uuid.uuid4())
+        expires_at = datetime.utcnow() + timedelta(seconds=settings.RESERVATION_TTL_SECONDS)
+
+        def work(session: Session) -> tuple:
+            lines = self._cart_lines(session, session_id)
+            if not lines:
+                raise CheckoutError("Cart is empty")
+            change = self._take_lines(session, lines)
+            session.execute(insert(StockReservationDB), [
+                {
+                    "reservation_id": reservation_id,
+                    "session_id": session_id,
+                    "product_id": line.product_id,
+                    "product_name": line.name,
+                    "price": line.price,
+                    "quantity": line.quantity,
+                    "expires_at": expires_at,
+                }
+                for line in lines
+            ])
+            return lines, change
+
+        try:
+            async with cart_admission.admit(admission_key or session_id):
+                await self._release(StockReservationDB.session_id == session_id)
+                await self._precheck(session_id)
+                lines, change = await self._run(work)
+        except (CheckoutError, AdmissionRejected):
+            raise
+        except Exception as e:
+            logger.error(f"Error reserving cart {session_id}: {e}")
+            raise
+
+        self._record(change)
+
+        items = [OrderItem(product_id=line.product_id, product_name=line.name,
+                           price=line.price, quantity=line.quantity) for line in lines]
+        subtotal = sum(item.price * item.quantity for item in items)
+        tax = subtotal * settings.TAX_RATE
+        return Reservation(
+            reservation_id=reservation_id,
+            session_id=session_id,
+            items=items,
+            subtotal=subtotal,
+            tax=tax,
+            total=subtotal + tax,
+            expires_at=expires_at
+        )
+
+    async def confirm(self, reservation_id: str) -> Order:
+        """Turn a live reservation into an order and clear the cart"""
+        def work(session: Session) -> Order:
+            held = session.query(StockReservationDB).filter(
+                StockReservationDB.reservation_id == reservation_id,
+                StockReservationDB.expires_at > datetime.utcnow()
+            ).all()
+            if not held:
+                raise ReservationExpiredError("Reservation expired, please check out again")
+            session.query(StockReservationDB).filter(
+                StockReservationDB.id.in_([line.id for line in held])
+            ).delete(synchronize_session=False)
+            return self._place_order(session, held[0].session_id, held)
+
+        try:
+            return await self._run(work)
+        except CheckoutError:
+            raise
+        except Exception as e:
+            logger.error(f"Error confirming reservation {reservation_id}: {e}")
+            raise
+
+    async def checkout(self, session_id: str, admission_key: Optional[str] = None) -> Order:
+        """Take stock and place the order in a single transaction, without a hold
+
+        ``admission_key`` selects the rate limit bucket, as for reserve_cart.
+        """
+        def work(session: Session) -> tuple:
+            lines = self._cart_lines(session, session_id)
+            if not lines:
+                raise CheckoutError("Cart is empty")
+            change = self._take_lines(session, lines)
+            order_lines = [
+                OrderItem(product_id=line.product_id, product_name=line.name,
+                          price=line.price, quantity=line.quantity)
+                for line in lines
+            ]
+            return self._place_order(session, session_id, order_lines), change
+
+        try:
+            async with cart_admission.admit(admission_key or session_id):
+                await self._precheck(session_id)
+                order, change = await self._run(work)
+        except (CheckoutError, AdmissionRejected):
+            raise
+        except Exception as e:
+            logger.error(f"Error checking out cart {session_id}: {e}")
+            raise
+
+        self._record(change)
+        return order
+
+    async def _release(self, *criteria) -> int:
+        """Delete matching reservations and return their stock"""
+        def work(session: Session) -> tuple:
+            held = session.query(
+                StockReservationDB.id, StockReservationDB.product_id, StockReservationDB.quantity
+            ).filter(*criteria).all()
+            if not held:
+                return 0, None
+            session.query(StockReservationDB).filter(
+                StockReservationDB.id.in_([row.id for row in held])
+            ).delete(synchronize_session=False)
+
+            before = self._stock_levels(session, list({row.product_id for row in held}))
+            for row in held:
+                self._return_stock(session, row.product_id, row.quantity)
+            return len(held), self._stock_changed(session, before)
+
+        released, change = await self._run(work)
+        self._record(change)
+        return released
+
+    async def release(self, reservation_id: str) -> int:
+        """Cancel a reservation and return its stock"""
+        try:
+            return await self._release(StockReservationDB.reservation_id == reservation_id)
+        except Exception as e:
+            logger.error(f"Error releasing reservation {reservation_id}: {e}")
+            raise
+
+    async def release_expired(self, limit: int = 500) -> int:
+        """Return stock held by up to ``limit`` expired reservation lines"""
+        try:
+            session = get_session()
+            try:
+                ids = [row.id for row in session.query(StockReservationDB.id).filter(
+                    StockReservationDB.expires_at <= datetime.utcnow()
+                ).limit(limit).all()]
+            finally:
+                session.close()
+            if not ids:
+                return 0
+            return await self._release(StockReservationDB.id.in_(ids))
+        except Exception as e:
+            logger.error(f"Error releasing expired reservations: {e}")
+            raise
\ No newline at end of file
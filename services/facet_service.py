@@ -0,0 +1,164 @@
+"""Category Facet Service"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional
+from models.schemas import ProductDB, CategoryFacet, StockChange
+from core.database import get_session
+from core.catalog_sync import catalog_sync, read_catalog_version
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Categories offered even before any product exists in them
+DEFAULT_CATEGORIES = ['iPhone', 'iPad', 'Mac', 'Watch', 'AirPods', 'Accessories']
+
+def _category_order(category: str):
+    """Default categories first in store order, then the rest by name"""
+    if category in DEFAULT_CATEGORIES:
+        return (DEFAULT_CATEGORIES.index(category), category)
+    return (len(DEFAULT_CATEGORIES), category)
+
+class _CategoryState:
+    """Running aggregates for one category"""
+
+    __slots__ = ('count', 'in_stock', 'prices')
+
+    def __init__(self):
+        self.count = 0
+        self.in_stock = 0
+        self.prices: List[float] = []  # sorted, for min/max under removal
+
+class FacetService:
+    """Per-category counts and price ranges, maintained incrementally
+
+    The aggregates are built once from the database and then patched by
+    `ProductService` write paths. A catalog change that did not go through
+    this process (another worker) marks them stale, and the next read
+    rebuilds them once.
+    """
+
+    def __init__(self):
+        self._categories: Dict[str, _CategoryState] = {}
+        self._version: Optional[int] = None
+        self._snapshot: Optional[List[CategoryFacet]] = None
+        catalog_sync.subscribe(self._on_catalog_changed)
+
+    def _on_catalog_changed(self, version: int):
+        """Invalidate unless the change was already applied locally"""
+        if version != self._version:
+            self._version = None
+
+    def _rebuild(self):
+        """Rebuild all aggregates from the products table"""
+        session = get_session()
+        try:
+            version = read_catalog_version(session)
+            rows = session.query(ProductDB.category, ProductDB.price, ProductDB.stock).all()
+        finally:
+            session.close()
+
+        categories: Dict[str, _CategoryState] = {}
+        for category, price, stock in rows:
+            state = categories.setdefault(category, _CategoryState())
+            state.count += 1
+            state.in_stock += 1 if (stock or 0) > 0 else 0
+            state.prices.append(price)
+        for state in categories.values():
+            state.prices.sort()
+
+        self._categories = categories
+        self._version = version
+        self._snapshot = None
+
+    def _add(self, category: str, price: float, stock: int):
+        state = self._categories.setdefault(category, _CategoryState())
+        state.count += 1
+        state.in_stock += 1 if (stock or 0) > 0 else 0
+        insort(state.prices, price)
+
+    def _remove(self, category: str, price: float, stock: int):
+        state = self._categories.get(category)
+        if state is None:
+            return
+        state.count -= 1
+        state.in_stock -= 1 if (stock or 0) > 0 else 0
+        index = bisect_left(state.prices, price)
+        if index < len(state.prices) and state.prices[index] == price:
+            del state.prices[index]
+        if state.count <= 0:
+            del self._categories[category]
+
+    def _apply(self, version: int, change):
+        """Apply a local delta if it is the next version, otherwise go stale"""
+        if self._version is None:
+            return
+        if version != self._version + 1:
+            self._version = None
+            return
+        change()
+        self._version = version
+        self._snapshot = None
+
+    def record_created(self, version: int, category: str, price: float, stock: int):
+        """Account for a newly created product"""
+        self._apply(version, lambda: self._add(category, price, stock))
+
+    def record_updated(self, version: int, old: tuple, new: tuple):
+        """Account for a product whose (category, price, stock) changed"""
+        def change():
+            self._remove(*old)
+            self._add(*new)
+        self._apply(version, change)
+
+    def record_stock_many(self, version: int, changes: List[StockChange]):
+        """Account for stock taken or returned in one version"""
+        def change():
+            for stock in changes:
+                self._remove(stock.category, stock.price, stock.old_stock)
+                self._add(stock.category, stock.price, stock.new_stock)
+        self._apply(version, change)
+
+    def record_deleted(self, version: int, category: str, price: float, stock: int):
+        """Account for a deleted product"""
+        self._apply(version, lambda: self._remove(category, price, stock))
+
+    async def get_facets(self) -> List[CategoryFacet]:
+        """Get per-category facets in navigation order"""
+        try:
+            if self._version is None:
+                self._rebuild()
+            if self._snapshot is not None:
+                return self._snapshot
+            self._snapshot = [
+                CategoryFacet(
+                    category=category,
+                    count=state.count,
+                    in_stock=state.in_stock,
+                    min_price=state.prices[0],
+                    max_price=state.prices[-1]
+                )
+                for category, state in sorted(
+                    self._categories.items(), key=lambda item: _category_order(item[0])
+                )
+            ]
+            return self._snapshot
+        except Exception as e:
+            logger.error(f"Error getting category facets: {e}")
+            raise
+
+    async def get_category_counts(self) -> Dict[str, int]:
+        """Get product counts per category"""
+        return {facet.category: facet.count for facet in await self.get_facets()}
+
+    async def get_categories(self) -> List[str]:
+        """Get default categories followed by any other known category"""
+        known = [facet.category for facet in await self.get_facets()]
+        return DEFAULT_CATEGORIES + [c for c in known if c not in DEFAULT_CATEGORIES]
+
+    async def get_category_options(self) -> Dict[str, str]:
+        """Get category selector options labelled with product counts"""
+        counts = await self.get_category_counts()
+        return {
+            category: f"{category} ({counts.get(category, 0)})"
+            for category in await self.get_categories()
+        }
\ No newline at end of file
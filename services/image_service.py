@@ -0,0 +1,270 @@
+"""Product Images and Placeholders
+
+Product cards give every image explicit dimensions and paint its dominant
+color in the image's place, so lazily loaded images neither shift the
+layout nor leave an empty box while they arrive. The placeholder is
+computed with Pillow once, when an image is uploaded or a product's image
+URL is saved, and stored with the product as "<width>x<height> #rrggbb":
+a few bytes inlined into the card as plain CSS, with no decoder needed in
+the browser. The storefront only ever reads it.
+
+Remote images are only fetched from public addresses: every connection,
+including one made for a redirect, goes to an address of the host that
+was checked to be globally routable, so an image URL cannot be used to
+reach loopback, private or link-local services from the server.
+"""
+
+import asyncio
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import os
+import socket
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from models.schemas import ImagePlaceholder
+
+logger = logging.getLogger(__name__)
+
+# Uploaded images are served from the upload directory under this path
+UPLOAD_ROUTE = '/images/products'
+# Image box of a product card; images are scaled down to fit, never up
+CARD_IMAGE_WIDTH = 300
+CARD_IMAGE_HEIGHT = 200
+CARD_BACKGROUND = (248, 249, 250)
+# The dominant color is taken from a thumbnail; more pixels do not change it
+SAMPLE_SIZE = 64
+PALETTE_COLORS = 8
+# EXIF orientations that turn the image by 90 degrees
+_ORIENTATION = 0x0112
+_ROTATED = {5, 6, 7, 8}
+
+def public_address(host: str, port: int) -> str:
+    """An address of host that is globally routable
+
+    Raises ValueError if the host resolves to any loopback, private,
+    link-local or otherwise non-public address.
+    """
+    addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        mapped = getattr(ip, 'ipv4_mapped', None)
+        if not ip.is_global or (mapped is not None and not mapped.is_global):
+            raise ValueError(f"{host} resolves to non-public address {address}")
+    if not addresses:
+        raise ValueError(f"{host} does not resolve")
+    return sorted(addresses)[0]
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        self.sock = socket.create_connection((public_address(self.host, self.port), self.port), self.timeout)
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        sock = socket.create_connection((public_address(self.host, self.port), self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, request):
+        return self.do_open(_PublicHTTPConnection, request)
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, request):
+        return self.do_open(_PublicHTTPSConnection, request, context=self._context)
+
+def _public_opener() -> urllib.request.OpenerDirector:
+    """http(s) only, no proxies, redirects checked like the first request"""
+    opener = urllib.request.OpenerDirector()
+    for handler in (_PublicHTTPHandler(), _PublicHTTPSHandler(), urllib.request.HTTPRedirectHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener
+
+def encode_placeholder(placeholder: ImagePlaceholder) -> str:
+    return f"{placeholder.width}x{placeholder.height} {placeholder.color}"
+
+def parse_placeholder(value: Optional[str]) -> Optional[ImagePlaceholder]:
+    """Placeholder from its stored form; None if missing or malformed"""
+    if not value:
+        return None
+    try:
+        size, color = value.split(' ')
+        width, height = (int(part) for part in size.split('x'))
+    except ValueError:
+        return None
+    if width <= 0 or height <= 0 or len(color) != 7 or not color.startswith('#'):
+        return None
+    return ImagePlaceholder(width, height, color)
+
+def dominant_color(image: Image.Image) -> str:
+    """Most common color of a small palette, with transparency over the card background"""
+    sample = image.copy()
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    if sample.mode != 'RGB':
+        sample = sample.convert('RGBA')
+        background = Image.new('RGBA', sample.size, CARD_BACKGROUND + (255,))
+        sample = Image.alpha_composite(background, sample).convert('RGB')
+    quantized = sample.quantize(colors=PALETTE_COLORS)
+    _, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+def compute_placeholder(data: bytes) -> ImagePlaceholder:
+    """Displayed size and dominant color of encoded image bytes
+
+    Raises ValueError if the bytes are not an image Pillow can read.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if image.getexif().get(_ORIENTATION) in _ROTATED:
+                width, height = height, width
+            # JPEGs are decoded straight at a fraction of their size
+            image.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+            color = dominant_color(image)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unreadable image: {e}")
+    return ImagePlaceholder(width, height, color)
+
+def fitted_size(placeholder: ImagePlaceholder) -> Tuple[int, int]:
+    """Size the image is displayed at inside the card image box"""
+    scale = min(1.0, CARD_IMAGE_WIDTH / placeholder.width, CARD_IMAGE_HEIGHT / placeholder.height)
+    return max(1, round(placeholder.width * scale)), max(1, round(placeholder.height * scale))
+
+def card_image(image_url: str, alt: str, placeholder: Optional[str], eager: bool) -> Tuple[Dict[str, str], Optional[str]]:
+    """(img attributes, placeholder color) for a product card image
+
+    Cards above the fold load eagerly at high priority; all others are left
+    to the browser's native lazy loading. With a stored placeholder the
+    image gets its displayed width and height, and the color fills exactly
+    that area until the image has loaded.
+    """
+    attributes = {'src': image_url, 'alt': alt, 'loading': 'eager' if eager else 'lazy', 'decoding': 'async'}
+    if eager:
+        attributes['fetchpriority'] = 'high'
+    parsed = parse_placeholder(placeholder)
+    if parsed is None:
+        return attributes, None
+    width, height = fitted_size(parsed)
+    attributes['width'] = str(width)
+    attributes['height'] = str(height)
+    return attributes, parsed.color
+
+class ImageService:
+    """Stores uploaded product images and computes their placeholders"""
+
+    def __init__(self, upload_dir: str, max_bytes: int, max_dimension: int = 1600,
+                 fetch_timeout: float = 5.0, max_entries: int = 4096):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.fetch_timeout = fetch_timeout
+        self.max_entries = max_entries
+        self._opener = _public_opener()
+        # Image URL -> stored placeholder, or None if the image is unusable
+        self._placeholders: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.uploads = 0
+        self.computed = 0
+        self.failures = 0
+        self.cache_hits = 0
+
+    def _remember(self, image_url: str, placeholder: Optional[str]):
+        self._placeholders[image_url] = placeholder
+        self._placeholders.move_to_end(image_url)
+        if len(self._placeholders) > self.max_entries:
+            self._placeholders.popitem(last=False)
+
+    def _read(self, image_url: str) -> bytes:
+        """Bytes of an uploaded or remote image, at most max_bytes"""
+        if image_url.startswith(UPLOAD_ROUTE + '/'):
+            path = os.path.join(self.upload_dir, os.path.basename(image_url.split('?')[0]))
+            with open(path, 'rb') as image_file:
+                data = image_file.read(self.max_bytes + 1)
+        elif image_url.startswith(('http://', 'https://')):
+            request = urllib.request.Request(image_url, headers={'User-Agent': 'apple-store-placeholders'})
+            with self._opener.open(request, timeout=self.fetch_timeout) as response:
+                data = response.read(self.max_bytes + 1)
+        else:
+            raise ValueError("not an uploaded or http(s) image")
+        if len(data) > self.max_bytes:
+            raise ValueError(f"larger than {self.max_bytes} bytes")
+        return data
+
+    def _placeholder_for(self, image_url: str) -> str:
+        return encode_placeholder(compute_placeholder(self._read(image_url)))
+
+    async def placeholder_for(self, image_url: Optional[str]) -> Optional[str]:
+        """Stored placeholder for an image URL; None if the image cannot be read"""
+        if not image_url:
+            return None
+        if image_url in self._placeholders:
+            self.cache_hits += 1
+            self._placeholders.move_to_end(image_url)
+            return self._placeholders[image_url]
+        try:
+            placeholder = await asyncio.to_thread(self._placeholder_for, image_url)
+            self.computed += 1
+        except Exception as e:
+            # Unusable images are remembered too, so they are not fetched again
+            self.failures += 1
+            logger.warning(f"No image placeholder for {image_url}: {e}")
+            placeholder = None
+        self._remember(image_url, placeholder)
+        return placeholder
+
+    def _store(self, data: bytes) -> Tuple[str, str]:
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.max_dimension, self.max_dimension))
+                placeholder = ImagePlaceholder(image.width, image.height, dominant_color(image))
+                out = io.BytesIO()
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    image.save(out, 'PNG', optimize=True)
+                    extension = '.png'
+                else:
+                    image.convert('RGB').save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+                    extension = '.jpg'
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ValueError(f"Unreadable image: {e}")
+
+        encoded = out.getvalue()
+        # Content-addressed, so a re-upload of the same image is the same file
+        name = hashlib.sha256(encoded).hexdigest()[:16] + extension
+        path = os.path.join(self.upload_dir, name)
+        if not os.path.exists(path):
+            os.makedirs(self.upload_dir, exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as image_file:
+                image_file.write(encoded)
+            os.replace(temporary, path)
+        return f"{UPLOAD_ROUTE}/{name}", encode_placeholder(placeholder)
+
+    async def save_upload(self, data: bytes) -> Tuple[str, str]:
+        """Store an uploaded image; returns (image URL, placeholder)
+
+        The image is turned upright, scaled down to max_dimension and
+        re-encoded (JPEG, or PNG if it has transparency). Raises ValueError
+        if it is too large or not an image.
+        """
+        image_url, placeholder = await asyncio.to_thread(self._store, data)
+        self.uploads += 1
+        self._remember(image_url, placeholder)
+        return image_url, placeholder
+
+    def stats(self) -> Dict:
+        return {
+            'uploads': self.uploads,
+            'computed': self.computed,
+            'failures': self.failures,
+            'cache_hits': self.cache_hits,
+            'cached_urls': len(self._placeholders),
+        }
\ No newline at end of file
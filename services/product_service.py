@@ -1,31 +1,274 @@
 """Product Service Layer"""
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, literal_column, tuple_
 from sqlalchemy.orm import Session
-from models.schemas import Product, ProductCreate, ProductUpdate, ProductDB
+from models.schemas import Product, ProductCreate, ProductUpdate, ProductDB, ProductSummary, ProductPage, StockChange, Suggestion
 from core.database import get_session
+from core.catalog_sync import catalog_sync, bump_catalog_version, read_catalog_version
+from core.replicas import replica_router
+from core.tracing import traced, tracer
+from services.facet_service import FacetService
+from services.autocomplete_service import AutocompleteService
+from services.catalog_engine import CatalogEngine
+from services.catalog_snapshot import default_snapshot_path
+from services.image_service import ImageService
+from app.config import settings
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Columns needed by the storefront; row order matches ProductSummary
+SUMMARY_COLUMNS = (
+    ProductDB.id,
+    ProductDB.name,
+    ProductDB.description,
+    ProductDB.price,
+    ProductDB.category,
+    ProductDB.stock,
+    ProductDB.image_url,
+    ProductDB.image_placeholder,
+)
+
+# Storefront sort options: sort key expression and whether it is descending.
+# id breaks ties in the same direction so each order matches one index scan.
+# The in-stock expression must render "stock > 0" inline, not as a bound
+# parameter, or SQLite will not match it to the expression indexes.
+SORT_OPTIONS = {
+    "featured": (ProductDB.id, False),
+    "price_asc": (ProductDB.price, False),
+    "price_desc": (ProductDB.price, True),
+    "newest": (ProductDB.created_at, True),
+    "in_stock": (ProductDB.stock > literal_column("0"), True),
+}
+
 class ProductService:
     """Service for managing products"""
     
+    def __init__(self):
+        # Per-process catalog cache, invalidated through catalog_sync so
+        # writes made by any worker process reach every worker
+        self._all_products: Optional[List[Product]] = None
+        self._storefront: Optional[List[ProductSummary]] = None
+        self._storefront_by_id: Optional[Dict[int, ProductSummary]] = None
+        # Catalog version the storefront records were read at
+        self._storefront_version: Optional[int] = None
+        self.facets = FacetService()
+        self.autocomplete = AutocompleteService(max_entries=settings.AUTOCOMPLETE_MAX_ENTRIES)
+        self.images = ImageService(
+            settings.UPLOAD_DIR, settings.MAX_FILE_SIZE,
+            max_dimension=settings.IMAGE_MAX_DIMENSION, fetch_timeout=settings.IMAGE_FETCH_TIMEOUT
+        )
+        # Storefront listings from in-memory columns instead of SQLite,
+        # shared between workers through a mapped snapshot file
+        self.catalog = None
+        if settings.CATALOG_ENGINE_ENABLED:
+            snapshot_path = None
+            if settings.CATALOG_SNAPSHOT_ENABLED:
+                snapshot_path = settings.CATALOG_SNAPSHOT_PATH or default_snapshot_path(settings.DATABASE_URL)
+            self.catalog = CatalogEngine(
+                snapshot_path=snapshot_path, source=settings.DATABASE_URL, grace=settings.CATALOG_SNAPSHOT_GRACE
+            )
+        catalog_sync.subscribe(self._on_catalog_changed)
+        catalog_sync.subscribe_stock(self.record_stock_changes)
+    
+    def _on_catalog_changed(self, version: int):
+        """Drop cached catalog state after a change in any worker"""
+        self._all_products = None
+        if version != self._storefront_version:
+            self._storefront = None
+            self._storefront_by_id = None
+            self._storefront_version = None
+    
+    @staticmethod
+    def _summary(db_product: ProductDB) -> ProductSummary:
+        return ProductSummary(*(getattr(db_product, column.key) for column in SUMMARY_COLUMNS))
+    
+    @staticmethod
+    def _suggestion(db_product: ProductDB) -> Suggestion:
+        return Suggestion(db_product.id, db_product.name, db_product.category, db_product.price, db_product.stock)
+    
+    def record_stock_changes(self, version: int, changes: List[StockChange]):
+        """Patch the catalog caches for stock taken or returned by checkout
+        
+        Called by the writing worker after its commit, and by catalog_sync in
+        every other worker, so no worker rebuilds its caches for a checkout.
+        """
+        self.facets.record_stock_many(version, changes)
+        self.autocomplete.record_stock_many(version, changes)
+        if self.catalog is not None:
+            self.catalog.record_stock_many(version, changes)
+        if self._storefront_version is None:
+            return
+        if version != self._storefront_version + 1:
+            self._on_catalog_changed(version)
+            return
+        for change in changes:
+            product = self._storefront_by_id.get(change.product_id)
+            if product is not None:
+                self._storefront_by_id[change.product_id] = product._replace(stock=change.new_stock)
+        # The list is recreated from the patched records when next asked for
+        self._storefront = None
+        self._storefront_version = version
+    
+    @traced
+    async def get_storefront_products(self) -> List[ProductSummary]:
+        """Get lean storefront records for all products"""
+        if self._storefront is None and self._storefront_by_id is not None:
+            self._storefront = list(self._storefront_by_id.values())
+        if self._storefront is not None:
+            return list(self._storefront)
+        
+        session = replica_router.read_session(max_lag=0)
+        try:
+            version = read_catalog_version(session)
+            rows = session.query(*SUMMARY_COLUMNS).all()
+            self._storefront = [ProductSummary._make(row) for row in rows]
+            self._storefront_by_id = {product.id: product for product in self._storefront}
+            self._storefront_version = version
+            return list(self._storefront)
+        except Exception as e:
+            logger.error(f"Error getting storefront products: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    async def get_storefront_products_by_ids(self, product_ids: Iterable[int]) -> List[ProductSummary]:
+        """Get cached storefront records for the given ids, in the given order"""
+        if self._storefront_by_id is None:
+            await self.get_storefront_products()
+        return [self._storefront_by_id[product_id] for product_id in product_ids
+                if product_id in self._storefront_by_id]
+    
+    @traced
+    async def get_storefront_products_by_category(self, category: str) -> List[ProductSummary]:
+        """Get lean storefront records for a category"""
+        session = replica_router.read_session()
+        try:
+            rows = session.query(*SUMMARY_COLUMNS).filter(ProductDB.category == category).all()
+            return [ProductSummary._make(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting storefront products by category {category}: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    async def browse_products(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: str = "featured",
+        limit: int = 24,
+        cursor: Optional[tuple] = None
+    ) -> ProductPage:
+        """Filter, sort and keyset-paginate storefront products
+        
+        Pass the returned ``next_cursor`` back as ``cursor`` for the next page.
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"Unknown sort option: {sort}")
+        if self.catalog is not None:
+            return await self.catalog.browse(
+                category=category, min_price=min_price, max_price=max_price,
+                sort=sort, limit=limit, cursor=cursor
+            )
+        key, descending = SORT_OPTIONS[sort]
+        
+        session = replica_router.read_session()
+        try:
+            query = session.query(*SUMMARY_COLUMNS, key)
+            if category and category != "All":
+                query = query.filter(ProductDB.category == category)
+            if min_price is not None:
+                query = query.filter(ProductDB.price >= min_price)
+            if max_price is not None:
+                query = query.filter(ProductDB.price <= max_price)
+            
+            if cursor is not None:
+                position = tuple_(key, ProductDB.id)
+                query = query.filter(position < tuple_(*cursor) if descending else position > tuple_(*cursor))
+            
+            if descending:
+                query = query.order_by(key.desc(), ProductDB.id.desc())
+            else:
+                query = query.order_by(key, ProductDB.id)
+            
+            rows = query.limit(limit + 1).all()
+            items = [ProductSummary._make(row[:-1]) for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = rows[limit - 1]
+                next_cursor = (last[-1], last.id)
+            return ProductPage(items=items, next_cursor=next_cursor)
+        except Exception as e:
+            logger.error(f"Error browsing products: {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    async def search_storefront_products(self, query: str, limit: Optional[int] = None,
+                                         offset: int = 0) -> List[ProductSummary]:
+        """Search lean storefront records by name or description, in id order
+        
+        With a limit, only that page of matches is read from the database.
+        """
+        session = replica_router.read_session()
+        try:
+            matches = session.query(*SUMMARY_COLUMNS).filter(
+                ProductDB.name.contains(query) |
+                ProductDB.description.contains(query)
+            ).order_by(ProductDB.id)
+            if limit is not None:
+                matches = matches.limit(limit).offset(offset)
+            return [ProductSummary._make(row) for row in matches.all()]
+        except Exception as e:
+            logger.error(f"Error searching storefront products with query '{query}': {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
+    async def count_storefront_matches(self, query: str) -> int:
+        """Number of products whose name or description contains query"""
+        session = replica_router.read_session()
+        try:
+            return session.query(func.count(ProductDB.id)).filter(
+                ProductDB.name.contains(query) |
+                ProductDB.description.contains(query)
+            ).scalar()
+        except Exception as e:
+            logger.error(f"Error counting storefront products matching '{query}': {e}")
+            raise
+        finally:
+            session.close()
+    
+    @traced
     async def get_all_products(self) -> List[Product]:
         """Get all products"""
-        session = get_session()
+        if self._all_products is not None:
+            return list(self._all_products)
+        
+        session = replica_router.read_session(max_lag=0)
         try:
             products = session.query(ProductDB).all()
-            return [Product.from_orm(product) for product in products]
+            with tracer.span('pydantic Product', 'pydantic', rows=len(products)):
+                self._all_products = [Product.from_orm(product) for product in products]
+            return list(self._all_products)
         except Exception as e:
             logger.error(f"Error getting products: {e}")
             raise
         finally:
             session.close()
     
+    @traced
     async def get_product_by_id(self, product_id: int) -> Optional[Product]:
         """Get product by ID"""
-        session = get_session()
+        session = replica_router.read_session()
         try:
             product = session.query(ProductDB).filter(ProductDB.id == product_id).first()
             return Product.from_orm(product) if product else None
@@ -35,26 +278,39 @@ class ProductService:
         finally:
             session.close()
     
+    @traced
     async def get_products_by_category(self, category: str) -> List[Product]:
         """Get products by category"""
-        session = get_session()
+        session = replica_router.read_session()
         try:
             products = session.query(ProductDB).filter(ProductDB.category == category).all()
-            return [Product.from_orm(product) for product in products]
+            with tracer.span('pydantic Product', 'pydantic', rows=len(products)):
+                return [Product.from_orm(product) for product in products]
         except Exception as e:
             logger.error(f"Error getting products by category {category}: {e}")
             raise
         finally:
             session.close()
     
+    @traced
     async def create_product(self, product_data: ProductCreate) -> Product:
         """Create a new product"""
+        # Read the image before opening the session; it may be remote
+        placeholder = await self.images.placeholder_for(product_data.image_url)
         session = get_session()
         try:
-            db_product = ProductDB(**product_data.dict())
+            db_product = ProductDB(**product_data.dict(), image_placeholder=placeholder)
             session.add(db_product)
+            session.flush()
+            version = bump_catalog_version(session)
             session.commit()
             session.refresh(db_product)
+            self.facets.record_created(version, db_product.category, db_product.price, db_product.stock)
+            self.autocomplete.record_created(version, self._suggestion(db_product))
+            if self.catalog is not None:
+                self.catalog.record_created(version, self._summary(db_product), db_product.created_at)
+            replica_router.record_write(version)
+            catalog_sync.mark_changed(version)
             return Product.from_orm(db_product)
         except Exception as e:
             session.rollback()
@@ -63,20 +319,34 @@ class ProductService:
         finally:
             session.close()
     
+    @traced
     async def update_product(self, product_id: int, product_data: ProductUpdate) -> Optional[Product]:
         """Update a product"""
+        update_data = product_data.dict(exclude_unset=True)
+        if 'image_url' in update_data:
+            update_data['image_placeholder'] = await self.images.placeholder_for(update_data['image_url'])
         session = get_session()
         try:
             db_product = session.query(ProductDB).filter(ProductDB.id == product_id).first()
             if not db_product:
                 return None
             
-            update_data = product_data.dict(exclude_unset=True)
+            old_facet = (db_product.category, db_product.price, db_product.stock)
             for field, value in update_data.items():
                 setattr(db_product, field, value)
             
+            session.flush()
+            version = bump_catalog_version(session)
             session.commit()
             session.refresh(db_product)
+            self.facets.record_updated(
+                version, old_facet, (db_product.category, db_product.price, db_product.stock)
+            )
+            self.autocomplete.record_updated(version, self._suggestion(db_product))
+            if self.catalog is not None:
+                self.catalog.record_updated(version, self._summary(db_product))
+            replica_router.record_write(version)
+            catalog_sync.mark_changed(version)
             return Product.from_orm(db_product)
         except Exception as e:
             session.rollback()
@@ -85,6 +355,7 @@ class ProductService:
         finally:
             session.close()
     
+    @traced
     async def delete_product(self, product_id: int) -> bool:
         """Delete a product"""
         session = get_session()
@@ -93,8 +364,17 @@ class ProductService:
             if not db_product:
                 return False
             
+            old_facet = (db_product.category, db_product.price, db_product.stock)
             session.delete(db_product)
+            session.flush()
+            version = bump_catalog_version(session)
             session.commit()
+            self.facets.record_deleted(version, *old_facet)
+            self.autocomplete.record_deleted(version, product_id)
+            if self.catalog is not None:
+                self.catalog.record_deleted(version, product_id)
+            replica_router.record_write(version)
+            catalog_sync.mark_changed(version)
             return True
         except Exception as e:
             session.rollback()
@@ -103,15 +383,75 @@ class ProductService:
         finally:
             session.close()
     
+    @traced
+    async def backfill_image_placeholders(self, deadline: float, batch_size: int = 50) -> Dict:
+        """Store placeholders for product images saved without one
+        
+        Products sharing an image URL are filled by one UPDATE. Every
+        batch_size placeholders are committed in their own short transaction
+        and catalog version, and the deadline is checked before each image,
+        so a large backlog is worked off over several runs.
+        """
+        session = get_session()
+        try:
+            image_urls = [row[0] for row in session.query(ProductDB.image_url).filter(
+                ProductDB.image_url.isnot(None), ProductDB.image_placeholder.is_(None)
+            ).distinct()]
+        finally:
+            session.close()
+        
+        filled = stored = 0
+        batch = {}
+        for image_url in image_urls:
+            if time.monotonic() >= deadline:
+                break
+            placeholder = await self.images.placeholder_for(image_url)
+            if placeholder is not None:
+                batch[image_url] = placeholder
+            if len(batch) >= batch_size:
+                filled += self._store_placeholders(batch)
+                stored += len(batch)
+                batch = {}
+        if batch:
+            filled += self._store_placeholders(batch)
+            stored += len(batch)
+        return {"pending_urls": len(image_urls) - stored, "filled": filled}
+    
+    def _store_placeholders(self, placeholders: Dict[str, str]) -> int:
+        """Write one batch of placeholders in a catalog version of its own"""
+        session = get_session()
+        try:
+            filled = 0
+            for image_url, placeholder in placeholders.items():
+                filled += session.query(ProductDB).filter(
+                    ProductDB.image_url == image_url, ProductDB.image_placeholder.is_(None)
+                ).update(
+                    {ProductDB.image_placeholder: placeholder, ProductDB.updated_at: ProductDB.updated_at},
+                    synchronize_session=False
+                )
+            version = bump_catalog_version(session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error storing image placeholders: {e}")
+            raise
+        finally:
+            session.close()
+        replica_router.record_write(version)
+        catalog_sync.mark_changed(version)
+        return filled
+    
+    @traced
     async def search_products(self, query: str) -> List[Product]:
         """Search products by name or description"""
-        session = get_session()
+        session = replica_router.read_session()
         try:
             products = session.query(ProductDB).filter(
                 ProductDB.name.contains(query) | 
                 ProductDB.description.contains(query)
             ).all()
-            return [Product.from_orm(product) for product in products]
+            with tracer.span('pydantic Product', 'pydantic', rows=len(products)):
+                return [Product.from_orm(product) for product in products]
         except Exception as e:
             logger.error(f"Error searching products with query '{query}': {e}")
             raise
@@ -0,0 +1,301 @@
+"""Recommendation Service Layer
+
+"Frequently bought together" neighbours computed from basket co-occurrence.
+A basket is one cart (cart_items grouped by session_id) or one placed order
+(order_items grouped by order_id), since checkout moves cart lines into
+orders. The whole table is rebuilt on a schedule and served from memory.
+Baskets are read in chunks up to the job's deadline; a read that runs past
+it is kept and resumed by the next run, which then builds the table.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from models.schemas import CartItemDB, OrderItemDB
+from core.database import get_session
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on basket pairs materialised at once while counting
+PAIR_CHUNK = 1_000_000
+
+def _ranks(sizes: np.ndarray) -> np.ndarray:
+    """0..size-1 for each consecutive group of the given sizes"""
+    return np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+def _pair_keys(items: np.ndarray, starts: np.ndarray, sizes: np.ndarray, n: int) -> np.ndarray:
+    """Encode every unordered item pair (a < b) of the given baskets as a * n + b"""
+    element_start = np.repeat(starts, sizes)
+    element_size = np.repeat(sizes, sizes)
+    # Each element pairs with every position of its own basket
+    left = np.repeat(element_start + _ranks(sizes), element_size)
+    right = np.repeat(element_start, element_size) + _ranks(element_size)
+    # Items are sorted within a basket, so position order is item order
+    keep = left < right
+    return items[left[keep]] * n + items[right[keep]]
+
+def _merge_counts(keys: np.ndarray, counts: np.ndarray, more_keys: np.ndarray, more_counts: np.ndarray):
+    """Merge a sorted, unique chunk count table into the running table"""
+    positions = np.searchsorted(keys, more_keys)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == more_keys[found]
+    # Existing pairs are counted in place; only new pairs grow the table
+    counts[positions[found]] += more_counts[found]
+    new = ~found
+    return np.insert(keys, positions[new], more_keys[new]), np.insert(counts, positions[new], more_counts[new])
+
+def co_occurrence_top_k(
+    baskets: np.ndarray,
+    products: np.ndarray,
+    top_k: int = 8,
+    min_count: int = 2,
+    max_basket: int = 50
+) -> Dict[int, Tuple[int, ...]]:
+    """Top-k co-occurring products per product
+
+    ``baskets`` and ``products`` are parallel integer arrays, one entry per
+    line. Unordered pairs are counted with a sort-based sparse count
+    (``np.unique`` over encoded pair keys) in bounded chunks, and neighbours
+    are ranked by count normalised by both products' basket counts, so best
+    sellers do not top every list. Baskets larger than ``max_basket`` (bulk
+    or bot carts) are ignored.
+    """
+    if len(products) == 0:
+        return {}
+    product_ids, item_index = np.unique(products, return_inverse=True)
+    n = len(product_ids)
+
+    # One entry per (basket, product), grouped by basket, items ascending
+    keys = np.unique(baskets.astype(np.int64) * n + item_index)
+    basket_of, items = keys // n, keys % n
+    del keys
+    starts = np.flatnonzero(np.r_[True, basket_of[1:] != basket_of[:-1]])
+    sizes = np.diff(np.r_[starts, len(items)])
+    del basket_of
+    kept = (sizes >= 2) & (sizes <= max_basket)
+    starts, sizes = starts[kept], sizes[kept]
+    if len(starts) == 0:
+        return {}
+
+    support = np.bincount(items[np.repeat(starts, sizes) + _ranks(sizes)], minlength=n)
+
+    # Count pairs chunk by chunk, merging into one sorted sparse table
+    pair_keys = np.empty(0, dtype=np.int64)
+    pair_counts = np.empty(0, dtype=np.int32)
+    cumulative_pairs = np.cumsum(sizes.astype(np.int64) ** 2)
+    low = 0
+    while low < len(starts):
+        done = cumulative_pairs[low - 1] if low else 0
+        high = max(int(np.searchsorted(cumulative_pairs, done + PAIR_CHUNK, side='right')), low + 1)
+        chunk, counts = np.unique(_pair_keys(items, starts[low:high], sizes[low:high], n), return_counts=True)
+        pair_keys, pair_counts = _merge_counts(pair_keys, pair_counts, chunk, counts.astype(np.int32))
+        low = high
+
+    frequent = pair_counts >= min_count
+    pair_keys, pair_counts = pair_keys[frequent], pair_counts[frequent]
+    if len(pair_keys) == 0:
+        return {}
+    # Both directions of each frequent pair
+    low_item, high_item = pair_keys // n, pair_keys % n
+    del pair_keys
+    left = np.concatenate([low_item, high_item])
+    right = np.concatenate([high_item, low_item])
+    pair_counts = np.concatenate([pair_counts, pair_counts])
+    score = pair_counts / np.sqrt(support[left].astype(np.float64) * support[right])
+
+    # Rank neighbours within each product and keep the best top_k
+    order = np.lexsort((right, -score, left))
+    left, right = left[order], right[order]
+    group_starts = np.flatnonzero(np.r_[True, left[1:] != left[:-1]])
+    best = _ranks(np.diff(np.r_[group_starts, len(left)])) < top_k
+    left, right = product_ids[left[best]], product_ids[right[best]]
+
+    splits = np.flatnonzero(left[1:] != left[:-1]) + 1
+    return {
+        int(group_left[0]): tuple(int(product_id) for product_id in group_right)
+        for group_left, group_right in zip(np.split(left, splits), np.split(right, splits))
+    }
+
+class _BasketLoad:
+    """(basket, product) lines read so far by a rebuild, resumable across runs"""
+
+    def __init__(self, signature: tuple):
+        # Carts and orders when the read began; recorded with the built table
+        self.signature = signature
+        self.session_codes: Dict[str, int] = {}
+        self.baskets: List[np.ndarray] = []
+        self.products: List[np.ndarray] = []
+        self.last_cart_id = 0
+        self.last_order_id = 0
+        self.carts_done = False
+        # Order baskets are numbered after the cart baskets
+        self.order_offset = 0
+        self.lines = 0
+        self.seconds = 0.0
+
+    def add(self, baskets: np.ndarray, products: np.ndarray):
+        self.baskets.append(baskets)
+        self.products.append(products)
+        self.lines += len(products)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.baskets:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(self.baskets), np.concatenate(self.products)
+
+class RecommendationService:
+    """Serves precomputed "frequently bought together" neighbours from memory"""
+
+    def __init__(self, top_k: int = 8, min_count: int = 2, max_basket: int = 50, chunk_size: int = 50000):
+        self.top_k = top_k
+        self.min_count = min_count
+        self.max_basket = max_basket
+        self.chunk_size = chunk_size
+        self._neighbors: Dict[int, Tuple[int, ...]] = {}
+        self._signature: Optional[tuple] = None
+        self._load: Optional[_BasketLoad] = None
+        self.stats: Dict[str, object] = {
+            'products': 0,
+            'lines': 0,
+            'rebuilds': 0,
+            'skipped_unchanged': 0,
+            'partial_runs': 0,
+            'last_load_ms': None,
+            'last_compute_ms': None,
+            'last_rebuilt_at': None,
+        }
+
+    def recommend(self, product_id: int, limit: Optional[int] = None) -> Tuple[int, ...]:
+        """Product ids often bought with product_id, best first"""
+        neighbors = self._neighbors.get(product_id, ())
+        return neighbors[:limit] if limit is not None else neighbors
+
+    def recommend_for_cart(self, product_ids: Iterable[int], limit: int = 4) -> List[int]:
+        """Product ids often bought with a cart's products, excluding the cart"""
+        in_cart = set(product_ids)
+        best: Dict[int, int] = {}
+        for product_id in in_cart:
+            for rank, neighbor in enumerate(self._neighbors.get(product_id, ())):
+                if neighbor not in in_cart and rank < best.get(neighbor, self.top_k):
+                    best[neighbor] = rank
+        return sorted(best, key=best.get)[:limit]
+
+    def _signature_now(self) -> tuple:
+        session = get_session()
+        try:
+            carts = session.query(func.count(CartItemDB.id), func.max(CartItemDB.id)).one()
+            orders = session.query(func.count(OrderItemDB.id), func.max(OrderItemDB.id)).one()
+            return tuple(carts) + tuple(orders)
+        finally:
+            session.close()
+
+    def _read_carts(self, load: _BasketLoad) -> bool:
+        """Read the next chunk of cart lines; False once all are read"""
+        session = get_session()
+        try:
+            rows = session.query(CartItemDB.id, CartItemDB.session_id, CartItemDB.product_id).filter(
+                CartItemDB.id > load.last_cart_id
+            ).order_by(CartItemDB.id).limit(self.chunk_size).all()
+        finally:
+            session.close()
+        if not rows:
+            return False
+        load.last_cart_id = rows[-1].id
+        load.add(
+            np.fromiter((load.session_codes.setdefault(row.session_id, len(load.session_codes)) for row in rows),
+                        dtype=np.int64, count=len(rows)),
+            np.fromiter((row.product_id for row in rows), dtype=np.int64, count=len(rows))
+        )
+        return True
+
+    def _read_orders(self, load: _BasketLoad) -> bool:
+        """Read the next chunk of order lines; False once all are read"""
+        session = get_session()
+        try:
+            rows = session.query(OrderItemDB.id, OrderItemDB.order_id, OrderItemDB.product_id).filter(
+                OrderItemDB.id > load.last_order_id
+            ).order_by(OrderItemDB.id).limit(self.chunk_size).all()
+        finally:
+            session.close()
+        if not rows:
+            return False
+        load.last_order_id = rows[-1].id
+        lines = np.array([(row.order_id, row.product_id) for row in rows], dtype=np.int64)
+        load.add(lines[:, 0] + load.order_offset, lines[:, 1])
+        return True
+
+    async def _load_baskets(self, load: _BasketLoad, deadline: Optional[float]) -> bool:
+        """Read (basket, product) lines in short keyset-paginated chunks
+
+        Each chunk is its own query, so the event loop is released between
+        chunks without holding a cursor open on the shared connection. Stops
+        between chunks once the deadline has passed, after at least one
+        chunk so every run makes progress; returns whether all lines are read.
+        """
+        read = False
+        while True:
+            if read and deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not load.carts_done:
+                if not self._read_carts(load):
+                    load.carts_done = True
+                    load.order_offset = len(load.session_codes)
+                    continue
+            elif not self._read_orders(load):
+                return True
+            read = True
+            await asyncio.sleep(0)
+
+    async def refresh(self, deadline: Optional[float] = None) -> Dict[str, object]:
+        """Rebuild the neighbour table if carts or orders changed since the last build
+
+        A read still unfinished at the deadline is resumed by the next call.
+        Lines changed meanwhile leave the signature stale, so the table built
+        from it is rebuilt again on the following run.
+        """
+        try:
+            if self._load is None:
+                signature = self._signature_now()
+                if signature == self._signature:
+                    self.stats['skipped_unchanged'] += 1
+                    return {'rebuilt': False}
+                self._load = _BasketLoad(signature)
+            load = self._load
+
+            start = time.perf_counter()
+            finished = await self._load_baskets(load, deadline)
+            load.seconds += time.perf_counter() - start
+            if not finished:
+                self.stats['partial_runs'] += 1
+                return {'rebuilt': False, 'partial': True, 'lines': load.lines}
+            self._load = None
+
+            baskets, products = load.arrays()
+            loaded = time.perf_counter()
+            # Counting is pure NumPy and runs off the event loop
+            neighbors = await asyncio.to_thread(
+                co_occurrence_top_k, baskets, products, self.top_k, self.min_count, self.max_basket
+            )
+            computed = time.perf_counter()
+        except Exception as e:
+            # Start the next read over rather than resume after a failure
+            self._load = None
+            logger.error(f"Error rebuilding recommendations: {e}")
+            raise
+
+        self._neighbors = neighbors
+        self._signature = load.signature
+        self.stats.update({
+            'products': len(neighbors),
+            'lines': len(products),
+            'rebuilds': self.stats['rebuilds'] + 1,
+            'last_load_ms': round(load.seconds * 1000, 1),
+            'last_compute_ms': round((computed - loaded) * 1000, 1),
+            'last_rebuilt_at': time.time(),
+        })
+        return {'rebuilt': True, 'products': len(neighbors), 'lines': len(products)}